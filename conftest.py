@@ -15,6 +15,12 @@ def is_port_open(port: int) -> bool:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(("localhost", port)) == 0
 
+def is_ready(url: str) -> bool:
+    try:
+        return requests.get(f"{url}/readyz", timeout=2).status_code == 200
+    except requests.RequestException:
+        return False
+
 @pytest.fixture(scope="session", autouse=True)
 def mcp_server():
     """
@@ -25,6 +31,9 @@ def mcp_server():
     
     # If already running (e.g. by user), just use it
     if is_port_open(port):
+        start_time = time.time()
+        while not is_ready(mcp_url) and time.time() - start_time < 30:
+            time.sleep(0.5)
         os.environ["MCP_SERVER_URL"] = mcp_url
         yield
         return
@@ -43,17 +52,15 @@ def mcp_server():
     
     proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     
-    # Wait for ready
+    # Wait for ready: /readyz only answers 200 once the server has warmed up and can run queries
     start_time = time.time()
     ready = False
-    while time.time() - start_time < 10:
-        try:
-            # The server exposes /mcp, but maybe we can just check if port is open now
-            if is_port_open(port):
-                ready = True
-                break
-        except Exception:
-            pass
+    while time.time() - start_time < 30:
+        if proc.poll() is not None:
+            break
+        if is_ready(mcp_url):
+            ready = True
+            break
         time.sleep(0.5)
         
     if not ready:
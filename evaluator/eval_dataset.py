@@ -0,0 +1,166 @@
+"""
+Offset-indexed, memory-mapped access to JSONL datasets.
+
+The first open scans the file once for line boundaries and caches them next to it in
+`<file>.idx` (invalidated when the file's size or mtime changes). After that, opening is
+O(1), rows are parsed only when accessed, and each process maps the file read-only and
+only touches the pages of the rows it reads, so workers that take one shard each stay
+flat in memory however large the dataset is.
+
+    ds = JsonlDataset("datasets/final_rft_sql_test_data.jsonl")
+    ds[3]                        # one parsed row
+    ds.shard(1, 4)               # second of four contiguous slices
+    ds.sample(100, seed=0)       # random subset
+    for obj in ds.shard(1, 4):   # lazy iteration
+        ...
+"""
+import os
+import mmap
+import json
+import random
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Union
+
+
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"JSONLIDX"
+
+
+def _scan(mm: mmap.mmap) -> "tuple[array, array]":
+    starts, ends = array("Q"), array("Q")
+    pos, size = 0, len(mm)
+    while pos < size:
+        nl = mm.find(b"\n", pos)
+        end = size if nl < 0 else nl
+        if mm[pos:end].strip():
+            starts.append(pos)
+            ends.append(end)
+        pos = end + 1
+    return starts, ends
+
+
+class JsonlDataset:
+    """
+    Random access to the non-blank lines of a JSONL file, parsed on demand.
+    """
+
+    def __init__(self, path: Union[str, Path], index_path: Optional[Union[str, Path]] = None):
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else self.path.with_name(self.path.name + ".idx")
+        self._mm: Optional[mmap.mmap] = None
+        self._pid = -1
+        self._starts, self._ends = self._load_index()
+
+    def _stamp(self) -> "tuple[int, int]":
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    def _load_index(self) -> "tuple[array, array]":
+        size, mtime = self._stamp()
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, isize, imtime, n = _HEADER.unpack(f.read(_HEADER.size))
+                if magic == _MAGIC and (isize, imtime) == (size, mtime):
+                    starts, ends = array("Q"), array("Q")
+                    starts.fromfile(f, n)
+                    ends.fromfile(f, n)
+                    return starts, ends
+        except (OSError, EOFError, struct.error):
+            pass
+        if size == 0:
+            return array("Q"), array("Q")
+        starts, ends = _scan(self._map())
+        try:
+            tmp = self.index_path.with_name(self.index_path.name + f".{os.getpid()}")
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, size, mtime, len(starts)))
+                starts.tofile(f)
+                ends.tofile(f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass  # read-only location: keep the in-memory index
+        return starts, ends
+
+    def _map(self) -> mmap.mmap:
+        # Re-map after fork so each worker has its own mapping
+        if self._mm is None or self._pid != os.getpid():
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._pid = os.getpid()
+        return self._mm
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def raw(self, i: int) -> bytes:
+        """
+        Bytes of row `i` (without the newline).
+        """
+        return self._map()[self._starts[i]:self._ends[i]]
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return json.loads(self.raw(i))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.view())
+
+    def view(self, indices: Optional[Sequence[int]] = None) -> "DatasetView":
+        return DatasetView(self, range(len(self)) if indices is None else indices)
+
+    def head(self, n: int) -> "DatasetView":
+        return self.view().head(n)
+
+    def shard(self, i: int, k: int) -> "DatasetView":
+        return self.view().shard(i, k)
+
+    def sample(self, n: int, seed: Optional[int] = None) -> "DatasetView":
+        return self.view().sample(n, seed)
+
+
+class DatasetView:
+    """
+    Lazy selection of rows from a JsonlDataset; further sharding/sampling composes.
+    """
+
+    def __init__(self, dataset: JsonlDataset, indices: Sequence[int]):
+        self.dataset = dataset
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return self.dataset[self.indices[i]]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in self.indices:
+            yield self.dataset[i]
+
+    def raw(self, i: int) -> bytes:
+        return self.dataset.raw(self.indices[i])
+
+    def head(self, n: int) -> "DatasetView":
+        return DatasetView(self.dataset, self.indices[:n])
+
+    def shard(self, i: int, k: int) -> "DatasetView":
+        """
+        The i-th (0-based) of k contiguous, near-equal slices.
+        """
+        if not 0 <= i < k:
+            raise ValueError(f"shard index {i} out of range for {k} shards")
+        n = len(self.indices)
+        return DatasetView(self.dataset, self.indices[i * n // k:(i + 1) * n // k])
+
+    def sample(self, n: int, seed: Optional[int] = None) -> "DatasetView":
+        picked = random.Random(seed).sample(range(len(self.indices)), min(n, len(self.indices)))
+        return DatasetView(self.dataset, [self.indices[j] for j in sorted(picked)])
+
+    def map(self, fn: Callable[[bytes, Dict[str, Any]], Any]) -> Iterator[Any]:
+        """
+        Lazily yield fn(raw_line, parsed_row) for each row.
+        """
+        for j in range(len(self.indices)):
+            raw = self.raw(j)
+            yield fn(raw, json.loads(raw))
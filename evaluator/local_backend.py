@@ -0,0 +1,121 @@
+"""
+In-process DuckDB execution backend for the evaluator.
+
+Selected with EVAL_BACKEND=local. The synthetic database is opened read-only once per
+process and queries run on cursors handed out by a small pool, so scoring a rollout does
+not pay an HTTP round-trip to the MCP server.
+"""
+import os
+import queue
+import datetime
+import decimal
+import threading
+import contextlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import duckdb
+
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[1] / "data" / "synthetic_openflights.db"
+
+
+def to_plain(v: Any) -> Any:
+    """
+    Map a DuckDB Python value onto the JSON-ish types the ground truth is stored as.
+    """
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, decimal.Decimal):
+        return float(v)
+    if isinstance(v, (datetime.date, datetime.time)):
+        return v.isoformat()
+    if isinstance(v, (list, tuple)):
+        return [to_plain(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): to_plain(x) for k, x in v.items()}
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return bytes(v).hex()
+    return str(v)
+
+
+class CursorPool:
+    """
+    Read-only DuckDB database with a bounded pool of reusable cursors.
+
+    Cursors share the parent connection's database instance, so concurrent callers
+    (threads) each run on their own cursor without reopening the file.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = str(db_path)
+        self.size = max(1, size)
+        self._con = duckdb.connect(self.db_path, read_only=True)
+        self._idle: "queue.LifoQueue[duckdb.DuckDBPyConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        try:
+            cur = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                cur = self._con.cursor()
+        try:
+            yield cur
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(cur)
+            else:
+                cur.close()
+
+    def execute(self, sql: str, max_rows: Optional[int] = None) -> Tuple[List[str], List[str], List[Tuple[Any, ...]]]:
+        """
+        Run `sql` and return (column names, DuckDB type names, rows), fetching at most `max_rows` rows.
+        """
+        with self.cursor() as cur:
+            res = cur.execute(sql)
+            if res.description is None:
+                return [], [], []
+            cols = [d[0] for d in res.description]
+            types = [str(d[1]) for d in res.description]
+            return cols, types, res.fetchall() if max_rows is None else res.fetchmany(max_rows)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._con.close()
+
+
+_pools: Dict[Tuple[int, str], CursorPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Optional[str] = None) -> CursorPool:
+    """
+    Return this process's pool for `db_path` (default: DB_PATH or data/synthetic_openflights.db).
+
+    Pools are keyed by PID so forked workers open their own handle instead of
+    inheriting the parent's.
+    """
+    path = str(db_path or os.getenv("DB_PATH") or DEFAULT_DB_PATH)
+    key = (os.getpid(), path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = CursorPool(path, size=int(os.getenv("EVAL_LOCAL_POOL_SIZE", "4")))
+                _pools[key] = pool
+    return pool
+
+
+def run_query(sql: str, db_path: Optional[str] = None, max_rows: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Execute `sql` in-process and return (at most `max_rows`) rows shaped like the MCP path's output.
+    """
+    cols, _, rows = get_pool(db_path).execute(sql, max_rows)
+    return [{k: to_plain(v) for k, v in zip(cols, r)} for r in rows]
@@ -0,0 +1,255 @@
+"""
+Pooled JSON-RPC client for the MCP server's streamable HTTP endpoint.
+
+One McpClient per server URL keeps a persistent connection pool, separate connect and
+read timeouts, retries transient failures (connection errors, 500/502/503/504) with
+full-jitter exponential backoff, and stops sending to a server that keeps failing
+(circuit breaker) until a cooldown has passed. A 429 from the server's admission control
+is retried after the Retry-After it names, for up to `max_busy_wait` seconds in total;
+requests carry an X-Client-Id so the server can share its capacity fairly between clients. Shared by the evaluator and
+scripts/benchmark_models.py.
+"""
+import os
+import json
+import time
+import random
+import socket
+import itertools
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class McpError(Exception):
+    """The server answered with a JSON-RPC error or an unusable response."""
+
+
+class McpToolError(McpError):
+    """The tool ran and reported an error (e.g. the SQL failed); retrying will not help."""
+
+
+class McpUnavailable(McpError):
+    """The server could not be reached, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; after `cooldown` seconds one trial call is let through.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 10.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                # half-open: allow a trial, and re-open immediately if it fails
+                self._opened_at = None
+                self._failures = self.threshold - 1
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+def retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+    """
+    The response's Retry-After (delta-seconds or HTTP date) in seconds, if it has a usable one.
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def rows_from_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rebuild row dicts from a `query_rows` payload (columns + column-major data).
+    """
+    cols = payload["columns"]
+    return [dict(zip(cols, r)) for r in zip(*payload["data"])]
+
+
+class McpClient:
+    HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 20.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        pool_size: int = 32,
+        breaker: Optional[CircuitBreaker] = None,
+        session_id: str = "stateless-eval",
+        client_id: Optional[str] = None,
+        max_busy_wait: float = 30.0,
+    ):
+        self.url = base_url.rstrip("/") + "/mcp/"
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session_id = session_id
+        self.client_id = client_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.max_busy_wait = max_busy_wait
+        self.headers = {**self.HEADERS, "X-Client-Id": self.client_id}
+        self._ids = itertools.count(1)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._session.post(self.url, headers=self.headers, json=payload, timeout=self.timeout, stream=True) as r:
+            r.raise_for_status()
+            if r.headers.get("content-type", "").startswith("application/json"):
+                return r.json()
+            # SSE: the response is the first non-empty `data:` event; json.loads takes the raw bytes
+            for line in r.iter_lines():
+                if line.startswith(b"data:"):
+                    body = line[5:].strip()
+                    if body:
+                        return json.loads(body)
+        raise McpError("No event-stream JSON found")
+
+    def request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one JSON-RPC request and return its `result`, retrying transient failures.
+        """
+        if not self.breaker.allow():
+            raise McpUnavailable(f"circuit open for {self.url}")
+        payload = {"id": str(next(self._ids)), "jsonrpc": "2.0", "method": method, "params": params}
+        attempt = 0
+        busy_waited = 0.0
+        while True:
+            try:
+                resp = self._post(payload)
+                self.breaker.record(True)
+                break
+            except (requests.ConnectionError, requests.HTTPError) as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status == 429:
+                    # Saturated, not failing: wait as told (plus jitter so clients don't return in step)
+                    hint = retry_after_seconds(e.response)
+                    delay = (self.backoff if hint is None else hint) * random.uniform(1.0, 1.5)
+                    if busy_waited + delay > self.max_busy_wait:
+                        self.breaker.record(True)
+                        raise McpUnavailable(f"server busy after waiting {busy_waited:.1f}s: {e}") from e
+                    time.sleep(delay)
+                    busy_waited += delay
+                    continue
+                transient = status is None or status in RETRY_STATUSES
+                if not transient or attempt >= self.retries:
+                    # a 4xx still proves the server is up
+                    self.breaker.record(not transient)
+                    raise McpUnavailable(str(e)) from e
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+                attempt += 1
+            except requests.RequestException as e:
+                # read timeouts: the query may still be running server-side, so don't resend it
+                self.breaker.record(False)
+                raise McpUnavailable(str(e)) from e
+        if "error" in resp:
+            raise McpError(str(resp["error"]))
+        return resp["result"]
+
+    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return self.request("tools/call", {"session": {"id": self.session_id}, "name": name, "arguments": arguments})
+
+    def query_rows(self, sql: str, **arguments: Any) -> Dict[str, Any]:
+        """
+        Run `sql` with the `query_rows` tool and return its columnar payload.
+        """
+        result = self.call_tool("query_rows", {"query": sql, **arguments})
+        if result.get("isError"):
+            raise McpToolError(result["content"][0]["text"])
+        return result["structuredContent"]
+
+    def query_pages(
+        self, sql: str, page_size: Optional[int] = None, max_rows: Optional[int] = None, database: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the columnar pages of `sql`'s result from the `query_page` tool, requesting each
+        page only when the previous one has been consumed; stops after `max_rows` rows.
+
+        Closing the generator early releases the server-side cursor.
+        """
+        cursor: Optional[str] = None
+        fetched = 0
+        try:
+            while max_rows is None or fetched < max_rows:
+                args: Dict[str, Any] = {"query": sql}
+                if database:
+                    args["database"] = database
+                if cursor:
+                    args["cursor"] = cursor
+                want = page_size if max_rows is None else min(page_size or max_rows, max_rows - fetched)
+                if want:
+                    args["page_size"] = want
+                result = self.call_tool("query_page", args)
+                if result.get("isError"):
+                    raise McpToolError(result["content"][0]["text"])
+                page = result["structuredContent"]
+                cursor = page["cursor"]
+                fetched += page["row_count"]
+                yield page
+                if not cursor:
+                    return
+        finally:
+            if cursor:
+                try:
+                    args = {"query": sql, "cursor": cursor, "close": True}
+                    if database:
+                        args["database"] = database
+                    self.call_tool("query_page", args)
+                except McpError:
+                    pass
+
+    def query_batch(
+        self, queries: List[Tuple[str, Optional[int]]], database: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run (sql, max_rows) pairs with the `query_batch` tool in one round-trip; returns, in order,
+        each query's columnar payload or {"error": message}.
+        """
+        items = [{"query": q} if n is None else {"query": q, "max_rows": n} for q, n in queries]
+        args: Dict[str, Any] = {"queries": items}
+        if database:
+            args["database"] = database
+        result = self.call_tool("query_batch", args)
+        if result.get("isError"):
+            raise McpToolError(result["content"][0]["text"])
+        return result["structuredContent"]["results"]
@@ -0,0 +1,148 @@
+"""
+Pre-execution checks for predicted SQL.
+
+Catches queries that cannot score before they cost an execution round-trip:
+
+1. parse: DuckDB's parser (json_serialize_sql) must accept the text, and every statement
+   must be a SELECT
+2. bind: EXPLAIN must resolve every table, column and function against the schema
+3. size: the planner's largest estimated cardinality must stay under `max_estimated_rows`
+
+Binding and estimates use the database file itself when it is readable (EXPLAIN plans
+without executing). Otherwise a schema-only, in-memory copy is built once from the MCP
+server's information_schema; empty tables carry no statistics, so the size check only
+applies in the first case.
+"""
+import re
+import json
+import math
+import threading
+import contextlib
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import duckdb
+
+from local_backend import get_pool
+
+
+_BIND_ERRORS = (duckdb.ParserException, duckdb.BinderException, duckdb.CatalogException)
+
+_EXPLAIN = "EXPLAIN (FORMAT JSON) "
+# "LINE 1: EXPLAIN (FORMAT JSON) <sql>" and the caret line under it, in DuckDB's error context
+_EXPLAIN_CONTEXT = re.compile(r"(LINE 1: )" + re.escape(_EXPLAIN) + r"(.*\n {8})" + " " * len(_EXPLAIN))
+
+_parser = threading.local()
+
+
+def _parser_con() -> duckdb.DuckDBPyConnection:
+    con = getattr(_parser, "con", None)
+    if con is None:
+        con = _parser.con = duckdb.connect(":memory:")
+    return con
+
+
+def _serialize(sql: str) -> dict:
+    return json.loads(_parser_con().execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0])
+
+
+def _written_statement_types(sql: str) -> List[str]:
+    """
+    Types of the statements in `sql`. Statements the parser adds itself (PIVOT creates an
+    enum type first) have no query text and are left out.
+    """
+    return [stmt.type.name for stmt in _parser_con().extract_statements(sql) if stmt.query.strip()]
+
+
+def _largest_estimate(node: Any) -> Tuple[int, int]:
+    """
+    (estimated output rows of `node`, largest estimate anywhere in its subtree).
+    Cross products carry no estimate of their own, so theirs is the product of their inputs.
+    """
+    children = [_largest_estimate(c) for c in node.get("children", [])]
+    est = (node.get("extra_info") or {}).get("Estimated Cardinality")
+    try:
+        own = int(str(est).replace(",", "")) if est is not None else None
+    except ValueError:
+        own = None
+    if own is None:
+        if node.get("name", "").strip() == "CROSS_PRODUCT":
+            own = math.prod(c[0] for c in children)
+        else:
+            own = max((c[0] for c in children), default=0)
+    return own, max([own, *(c[1] for c in children)])
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def schema_copy(columns: Iterable[Tuple[str, str, str, str]]) -> duckdb.DuckDBPyConnection:
+    """
+    Empty in-memory database with the given (schema, table, column, type) layout.
+    """
+    tables: dict = {}
+    for schema, table, column, dtype in columns:
+        tables.setdefault((schema, table), []).append(f"{_quote(column)} {dtype}")
+    con = duckdb.connect(":memory:")
+    for (schema, table), cols in tables.items():
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {_quote(schema)}")
+        con.execute(f"CREATE TABLE {_quote(schema)}.{_quote(table)} ({', '.join(cols)})")
+    return con
+
+
+class Preflight:
+    """
+    `check(sql)` returns None if the query may run, else the reason it was rejected.
+    """
+
+    def __init__(self, cursor: Callable[[], Any], max_estimated_rows: int = 0):
+        self._cursor = cursor
+        self.max_estimated_rows = max_estimated_rows
+
+    @classmethod
+    def for_db_file(cls, db_path: str, max_estimated_rows: int = 0) -> "Preflight":
+        return cls(get_pool(db_path).cursor, max_estimated_rows)
+
+    @classmethod
+    def for_schema(cls, columns: Iterable[Tuple[str, str, str, str]]) -> "Preflight":
+        con = schema_copy(columns)
+        lock = threading.Lock()
+
+        def cursor():
+            with lock:
+                cur = con.cursor()
+            return contextlib.closing(cur)
+
+        return cls(cursor)
+
+    def check(self, sql: str) -> Optional[str]:
+        tree = _serialize(sql)
+        if tree.get("error"):
+            if tree.get("error_type") == "parser":
+                return f"Preflight rejected: Parser Error: {tree.get('error_message')}"
+            # The serializer also refuses read-only queries it cannot represent (e.g. PIVOT)
+            try:
+                types = _written_statement_types(sql)
+            except duckdb.Error:
+                return None
+            if any(t != "SELECT" for t in types):
+                return "Preflight rejected: only read-only SELECT statements are allowed"
+            statements = len(types)
+        else:
+            statements = len(tree.get("statements", []))
+        if statements != 1:
+            return None
+        with self._cursor() as cur:
+            try:
+                rows = cur.execute(_EXPLAIN + sql).fetchall()
+            except _BIND_ERRORS as e:
+                # Report the error against the SQL as written, without the EXPLAIN prefix
+                return "Preflight rejected: " + _EXPLAIN_CONTEXT.sub(r"\1\2", str(e))
+            except duckdb.Error:
+                return None
+        if self.max_estimated_rows > 0:
+            est = max((_largest_estimate(n)[1] for n in json.loads(rows[0][1])), default=0)
+            if est > self.max_estimated_rows:
+                return f"Preflight rejected: estimated {est:,} rows exceeds limit of {self.max_estimated_rows:,}"
+        return None
+
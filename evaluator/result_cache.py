@@ -0,0 +1,163 @@
+"""
+Execution result cache for the evaluator.
+
+Rollouts for the same prompt often produce the same SQL modulo whitespace, comments or
+keyword case. Queries are keyed by a fingerprint of DuckDB's parse tree
+(json_serialize_sql, with source positions dropped), so all of those variants share one
+entry. Entries hold either the result rows with their canonical form or the SQL error,
+and are evicted LRU-first once either the entry or the byte budget is exceeded. The whole
+cache is dropped when the database version (file mtime/size) changes.
+
+Results fetched with a row limit that overflowed it are stored as `min_rows` only: that
+is enough to reject any ground truth with fewer rows without executing again.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import duckdb
+
+from result_compare import CanonicalResult
+
+
+_COMMENT_OR_LITERAL = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_QUERY_LOCATION = re.compile(r'"query_location":\d+,?')
+
+_parser = threading.local()
+
+
+def strip_comments(sql: str) -> str:
+    """
+    Remove -- and /* */ comments (but not comment markers inside quoted strings) and collapse whitespace.
+    """
+    out = _COMMENT_OR_LITERAL.sub(lambda m: m.group(0) if m.group(0)[0] in "'\"" else " ", sql)
+    return " ".join(out.split()).rstrip(";").strip()
+
+
+def sql_fingerprint(sql: str) -> str:
+    """
+    Stable key for `sql`: a hash of its DuckDB parse tree, or of the comment-stripped text if it does not parse.
+    """
+    text = strip_comments(sql)
+    con = getattr(_parser, "con", None)
+    if con is None:
+        con = _parser.con = duckdb.connect(":memory:")
+    try:
+        tree = con.execute("SELECT json_serialize_sql(?)", [text]).fetchone()[0]
+        if not tree.startswith('{"error":true'):
+            text = _QUERY_LOCATION.sub("", tree)
+    except duckdb.Error:
+        pass
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def db_version(path: str) -> Optional[Tuple[Any, ...]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def _approx_size(rows: List[Dict[str, Any]]) -> int:
+    size = 64
+    for r in rows:
+        size += 56 + 8 * len(r)
+        for v in r.values():
+            size += len(v) + 49 if isinstance(v, str) else 24
+    return size
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    rows: Optional[List[Dict[str, Any]]]
+    canonical: Optional[CanonicalResult]
+    error: Optional[str]
+    nbytes: int
+    min_rows: Optional[int] = None
+
+    @classmethod
+    def ok(cls, rows: List[Dict[str, Any]], canonical: CanonicalResult) -> "CachedResult":
+        return cls(rows, canonical, None, 2 * _approx_size(rows))
+
+    @classmethod
+    def failed(cls, error: str) -> "CachedResult":
+        return cls(None, None, error, 64 + len(error))
+
+    @classmethod
+    def overflow(cls, min_rows: int) -> "CachedResult":
+        return cls(None, None, None, 64, min_rows)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of CachedResult bounded by entry count and approximate bytes.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_version(self, version: Hashable) -> None:
+        """
+        Drop every entry if the database version differs from the one they were computed against.
+        """
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResult) -> None:
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,179 @@
+"""
+Hash-based comparison of SQL query results.
+
+Each result is canonicalized once into typed row tuples (floats rounded to FLOAT_DIGITS,
+integral floats equal to ints, NaN to a single sentinel) together with per-column and
+whole-result multiset hashes. Two results then compare in O(rows x columns):
+
+- default: rows are a multiset, columns may appear in any order (matched by content)
+- ordered=True: row order must match as well
+- by_name=True: columns are aligned by (case-insensitive) name instead of by content
+
+Hashes use Python's per-process hash(), so canonical results must not be persisted.
+"""
+import math
+import itertools
+from collections import Counter
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Tuple, Union
+
+
+FLOAT_DIGITS = 6
+# Upper bound on column orderings tried when several columns hold identical values
+MAX_COLUMN_PERMUTATIONS = 720
+
+_MASK = (1 << 64) - 1
+
+
+class _NaN:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "NaN"
+
+
+NAN = _NaN()
+
+
+def canon(v: Any) -> Any:
+    """
+    Map a result value onto a hashable canonical form.
+    """
+    if v is None or isinstance(v, (str, bool, int)):
+        return v
+    if isinstance(v, float):
+        if math.isnan(v):
+            return NAN
+        if math.isinf(v):
+            return v
+        r = round(v, FLOAT_DIGITS)
+        return int(r) if r == int(r) else r
+    if isinstance(v, (list, tuple)):
+        return tuple(canon(x) for x in v)
+    if isinstance(v, dict):
+        return tuple((str(k), canon(x)) for k, x in v.items())
+    return str(v)
+
+
+def _multiset_hash(items: Sequence[Any]) -> int:
+    h = 0
+    for x in items:
+        h = (h + hash(x)) & _MASK
+    return h
+
+
+@dataclass(frozen=True)
+class CanonicalResult:
+    """
+    Compiled form of a result. Build it once for values that are compared repeatedly
+    (e.g. ground truth across rollouts); the row multiset is counted lazily on first use.
+    """
+
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple[Any, ...], ...]
+    col_hashes: Tuple[int, ...]
+    row_hash: int
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    @cached_property
+    def row_counts(self) -> Counter:
+        return Counter(self.rows)
+
+
+def canonicalize(rows: Sequence[Mapping[str, Any]]) -> CanonicalResult:
+    """
+    Canonicalize a list of row dicts (all sharing the first row's columns).
+    """
+    if not rows:
+        return CanonicalResult((), (), (), 0)
+    columns = tuple(rows[0].keys())
+    canon_rows = tuple(tuple(map(canon, r.values())) for r in rows)
+    return _build(columns, canon_rows)
+
+
+def canonicalize_columnar(columns: Sequence[str], data: Sequence[Sequence[Any]]) -> CanonicalResult:
+    """
+    Canonicalize column-major data, as returned by the `query_rows` MCP tool.
+    """
+    canon_cols = [list(map(canon, col)) for col in data]
+    return _build(tuple(columns), tuple(zip(*canon_cols)))
+
+
+def _build(columns: Tuple[str, ...], rows: Tuple[Tuple[Any, ...], ...]) -> CanonicalResult:
+    col_hashes = tuple(_multiset_hash([r[i] for r in rows]) for i in range(len(columns)))
+    return CanonicalResult(columns, rows, col_hashes, _multiset_hash(rows))
+
+
+def _column_maps(exp: CanonicalResult, act: CanonicalResult) -> Iterator[Tuple[int, ...]]:
+    """
+    Yield candidate mappings (expected column i -> actual column m[i]), identity first.
+    Columns can only map onto columns with the same multiset of values.
+    """
+    groups: Dict[int, Tuple[List[int], List[int]]] = {}
+    for i, h in enumerate(exp.col_hashes):
+        groups.setdefault(h, ([], []))[0].append(i)
+    for j, h in enumerate(act.col_hashes):
+        if h not in groups:
+            return
+        groups[h][1].append(j)
+    if any(len(e) != len(a) for e, a in groups.values()):
+        return
+    keys = list(groups)
+    choices = [itertools.permutations(groups[h][1]) for h in keys]
+    for n, combo in enumerate(itertools.product(*choices)):
+        if n >= MAX_COLUMN_PERMUTATIONS:
+            return
+        m = [0] * len(exp.columns)
+        for h, perm in zip(keys, combo):
+            for i, j in zip(groups[h][0], perm):
+                m[i] = j
+        yield tuple(m)
+
+
+def _name_map(exp: CanonicalResult, act: CanonicalResult) -> Union[Tuple[int, ...], None]:
+    act_idx = {c.lower(): j for j, c in enumerate(act.columns)}
+    if len(act_idx) != len(act.columns):
+        return None
+    try:
+        return tuple(act_idx[c.lower()] for c in exp.columns)
+    except KeyError:
+        return None
+
+
+def _rows_equal(exp: CanonicalResult, act: CanonicalResult, m: Tuple[int, ...], ordered: bool) -> bool:
+    if m == tuple(range(len(m))):
+        if ordered:
+            return exp.rows == act.rows
+        return exp.row_hash == act.row_hash and exp.row_counts == act.row_counts
+    projected = [tuple(r[j] for j in m) for r in act.rows]
+    if ordered:
+        return list(exp.rows) == projected
+    return exp.row_counts == Counter(projected)
+
+
+def results_match(
+    expected: Union[CanonicalResult, Sequence[Mapping[str, Any]]],
+    actual: Union[CanonicalResult, Sequence[Mapping[str, Any]]],
+    *,
+    ordered: bool = False,
+    by_name: bool = False,
+) -> bool:
+    """
+    True if `actual` holds the same rows as `expected` (see module docstring for modes).
+    """
+    exp = expected if isinstance(expected, CanonicalResult) else canonicalize(expected)
+    act = actual if isinstance(actual, CanonicalResult) else canonicalize(actual)
+    if exp.row_count != act.row_count:
+        return False
+    if exp.row_count == 0:
+        return True
+    if len(exp.columns) != len(act.columns):
+        return False
+    if by_name:
+        m = _name_map(exp, act)
+        return m is not None and _rows_equal(exp, act, m, ordered)
+    return any(_rows_equal(exp, act, m, ordered) for m in _column_maps(exp, act))
@@ -1,14 +1,29 @@
 import os
-import json
-import math
-from typing import Any, Dict, List
+import sys
+import asyncio
+import threading
+import time
+import atexit
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
 
-import requests
 from eval_protocol.models import EvaluateResult, EvaluationRow
 from eval_protocol.pytest import evaluation_test
 from eval_protocol.pytest.default_single_turn_rollout_process import SingleTurnRolloutProcessor
 
+# Helper modules live next to this file; make them importable however the evaluator is loaded
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from eval_dataset import JsonlDataset  # noqa: E402
+from mcp_client import McpClient, McpError, McpToolError, McpUnavailable, rows_from_columnar  # noqa: E402
+from preflight import Preflight  # noqa: E402
+from result_cache import CachedResult, ResultCache, db_version, sql_fingerprint  # noqa: E402
+from result_compare import CanonicalResult, canon, canonicalize, results_match  # noqa: E402
+from stage_timer import NULL_TIMER, StageTimer, TimingRecorder, serve_prometheus  # noqa: E402
+
 
 def _parse_duckdb_ascii(table: str) -> List[Dict[str, Any]]:
     lines = [ln for ln in table.strip().split("\n") if ln.strip() and not ln.startswith("+")]
@@ -45,57 +60,381 @@ def _parse_duckdb_ascii(table: str) -> List[Dict[str, Any]]:
     return out
 
 
+_CLIENTS: Dict[str, McpClient] = {}
+
+
+def _mcp_client(mcp_url: str) -> McpClient:
+    """
+    Process-wide pooled client per server URL, shared by concurrent evaluations.
+    """
+    client = _CLIENTS.get(mcp_url)
+    if client is None:
+        client = _CLIENTS.setdefault(
+            mcp_url,
+            McpClient(
+                mcp_url,
+                connect_timeout=float(os.getenv("MCP_CONNECT_TIMEOUT", "5")),
+                read_timeout=float(os.getenv("MCP_READ_TIMEOUT", "20")),
+                retries=int(os.getenv("MCP_RETRIES", "2")),
+                pool_size=int(os.getenv("EVAL_HTTP_POOL", "32")),
+                client_id=os.getenv("EVAL_CLIENT_ID") or None,
+                max_busy_wait=float(os.getenv("MCP_MAX_BUSY_WAIT_S", "30")),
+            ),
+        )
+    return client
+
+
+def _mcp_database() -> Optional[str]:
+    # MCP_DATABASE selects one of the server's databases (DATABASES / DB_DIR); unset = its default
+    return os.getenv("MCP_DATABASE") or None
+
+
+def _from_payload(
+    payload: Dict[str, Any], max_rows: Optional[int], timer: Any = NULL_TIMER
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], bool]:
+    if "elapsed_ms" in payload:
+        timer.split("transport", "server", payload["elapsed_ms"] / 1000)
+    if payload.get("truncated") and (max_rows is None or payload["row_count"] < max_rows):
+        # Cut off by the server's row cap (QUERY_MAX_ROWS), so it cannot match any ground truth
+        return None, f"Query limit exceeded (rows): more than {payload['row_count']} rows", True
+    with timer.stage("decode"):
+        return rows_from_columnar(payload), None, True
+
+
+# Admission rejections depend on the server's load, not on the SQL: the same query can succeed
+# on the next call, so they are neither cached nor a valid score
+_LOAD_LIMITS = ("Query limit exceeded (queue)", "Query limit exceeded (batch)")
+
+
+def _tool_error(msg: str) -> Tuple[None, str, bool]:
+    # Limits enforced by the server's governor keep their own "Query limit exceeded (...)" reason.
+    # Of those only the row cap is a property of the SQL; timeouts and memory depend on load,
+    # so, as in the server's own cache, they are not cached
+    if msg.startswith("Query limit exceeded"):
+        return None, msg, msg.startswith("Query limit exceeded (rows)")
+    return None, f"MCP error: {msg}", True
+
+
+def _fetch_pages(
+    client: McpClient, sql_query: str, max_rows: int, page_rows: int, timer: Any = NULL_TIMER
+) -> List[Dict[str, Any]]:
+    # Decode each page as it arrives; the next one is only requested after that
+    rows: List[Dict[str, Any]] = []
+    pages = client.query_pages(sql_query, page_size=page_rows, max_rows=max_rows, database=_mcp_database())
+    try:
+        while True:
+            with timer.stage("transport"):
+                page = next(pages, None)
+            if page is None:
+                return rows
+            timer.split("transport", "server", page.get("elapsed_ms", 0) / 1000)
+            with timer.stage("decode"):
+                rows.extend(rows_from_columnar(page))
+    finally:
+        pages.close()
+
+
+def _execute_mcp(
+    sql_query: str, mcp_url: str, max_rows: Optional[int] = None, timer: Any = NULL_TIMER
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], bool]:
+    try:
+        page_rows = int(os.getenv("EVAL_MCP_PAGE_ROWS", "1000"))
+        if max_rows is not None and 0 < page_rows < max_rows:
+            # Large fetches go through `query_page`, a page at a time instead of one huge response
+            return _fetch_pages(_mcp_client(mcp_url), sql_query, max_rows, page_rows, timer), None, True
+        args: Dict[str, Any] = {} if max_rows is None else {"max_rows": max_rows}
+        if _mcp_database():
+            args["database"] = _mcp_database()
+        with timer.stage("transport"):
+            payload = _mcp_client(mcp_url).query_rows(sql_query, **args)
+        return _from_payload(payload, max_rows, timer)
+    except McpToolError as e:
+        return _tool_error(str(e))
+    except McpUnavailable as e:
+        return None, f"MCP request failed: {e}", False
+    except McpError as e:
+        return None, f"MCP error: {e}", False
+    except Exception as e:
+        return None, f"MCP request failed: {e}", False
+
+
+def _execute_mcp_batch(
+    queries: List[Tuple[str, Optional[int]]], mcp_url: str
+) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[str], bool]]:
+    """
+    _execute_mcp for many (sql, max_rows) pairs in one `query_batch` round-trip. When the
+    server rejects the batch as a whole (e.g. its queue is full), which says nothing about
+    the SQL, each query is run on its own instead.
+    """
+    try:
+        results = _mcp_client(mcp_url).query_batch(queries, database=_mcp_database())
+    except McpToolError:
+        return [_execute_mcp(sql, mcp_url, max_rows) for sql, max_rows in queries]
+    except McpUnavailable as e:
+        return [(None, f"MCP request failed: {e}", False)] * len(queries)
+    except Exception as e:
+        return [(None, f"MCP error: {e}", False)] * len(queries)
+    return [
+        _tool_error(r["error"]) if "error" in r else _from_payload(r, max_rows)
+        for r, (_, max_rows) in zip(results, queries)
+    ]
+
+
+def _execute_local(
+    sql_query: str, max_rows: Optional[int] = None
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], bool]:
+    import duckdb
+    from local_backend import run_query
+
+    try:
+        return run_query(sql_query, max_rows=max_rows), None, True
+    except duckdb.Error as e:
+        return None, f"Local query failed: {e}", True
+    except Exception as e:
+        return None, f"Local query failed: {e}", False
+
+
+_PREFLIGHT: Dict[Tuple[Any, ...], Preflight] = {}
+
+
+def _preflight(backend: str, mcp_url: Optional[str]) -> Optional[Preflight]:
+    """
+    Pre-execution checker for the current target (EVAL_PREFLIGHT=0 disables it).
+
+    Uses DB_PATH when the file is readable; otherwise, or when MCP_DATABASE names one of the
+    server's databases, a schema-only copy built from the server's information_schema. None if
+    neither is available.
+    """
+    from local_backend import DEFAULT_DB_PATH
+
+    if os.getenv("EVAL_PREFLIGHT", "1") == "0":
+        return None
+    db_path = os.getenv("DB_PATH") or str(DEFAULT_DB_PATH)
+    database = _mcp_database() if backend == "mcp" else None
+    key = (backend, mcp_url, db_path, database)
+    pf = _PREFLIGHT.get(key)
+    if pf is not None:
+        return pf
+    max_est = int(os.getenv("EVAL_MAX_ESTIMATED_ROWS", "50000000"))
+    try:
+        if os.path.exists(db_path) and database is None:
+            pf = Preflight.for_db_file(db_path, max_est)
+        elif backend == "mcp" and mcp_url:
+            payload = _mcp_client(mcp_url).query_rows(
+                "SELECT table_schema, table_name, column_name, data_type FROM information_schema.columns",
+                **({"database": database} if database else {}),
+            )
+            if payload.get("truncated"):
+                return None
+            pf = Preflight.for_schema(zip(*payload["data"]))
+        else:
+            return None
+    except Exception:
+        return None
+    return _PREFLIGHT.setdefault(key, pf)
+
+
+def _execute(
+    sql_query: str, backend: str, mcp_url: Optional[str], max_rows: Optional[int] = None, timer: Any = NULL_TIMER
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], bool]:
+    """
+    Run the query on the selected backend (fetching at most `max_rows` rows), unless preflight
+    already knows it cannot succeed. Returns (rows, error, cacheable): cacheable is False for
+    transport failures.
+    """
+    with timer.stage("preflight"):
+        pf = _preflight(backend, mcp_url)
+        reason = pf.check(sql_query) if pf is not None else None
+    if reason is not None:
+        return None, reason, True
+    if backend == "local":
+        with timer.stage("execute"):
+            return _execute_local(sql_query, max_rows)
+    return _execute_mcp(sql_query, mcp_url, max_rows, timer)
+
+
+_CACHE: Optional[ResultCache] = None
+
+
+def _result_cache() -> Optional[ResultCache]:
+    """
+    Process-wide result cache; EVAL_CACHE=0 disables it, EVAL_CACHE_ENTRIES / EVAL_CACHE_BYTES bound it.
+    """
+    global _CACHE
+    if os.getenv("EVAL_CACHE", "1") == "0":
+        return None
+    if _CACHE is None:
+        _CACHE = ResultCache(
+            max_entries=int(os.getenv("EVAL_CACHE_ENTRIES", "4096")),
+            max_bytes=int(os.getenv("EVAL_CACHE_BYTES", str(64 * 1024 * 1024))),
+        )
+    return _CACHE
+
+
+def _cache_version(backend: str, mcp_url: Optional[str]) -> Optional[Tuple[Any, ...]]:
+    # Results belong to one execution target; the DB file's mtime/size is included when it is visible
+    from local_backend import DEFAULT_DB_PATH
+
+    version = db_version(os.getenv("DB_PATH") or str(DEFAULT_DB_PATH))
+    if backend == "local":
+        return None if version is None else ("local", *version)
+    database = _mcp_database()
+    if database is not None:
+        # a named server-side database: the local file says nothing about its version
+        return ("mcp", mcp_url, database)
+    return ("mcp", mcp_url, *(version or ()))
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Hit/miss/eviction counters of the evaluator's result cache (empty if disabled).
+    """
+    cache = _result_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _fetch_limit(expected: CanonicalResult) -> Optional[int]:
+    # A prediction with more rows than the ground truth cannot match: fetch one extra row at most
+    return expected.row_count + 1 if os.getenv("EVAL_BOUNDED_FETCH", "1") != "0" else None
+
+
+def _cached_entry(
+    cache: Optional[ResultCache],
+    sql_query: str,
+    expected: CanonicalResult,
+    backend: str,
+    mcp_url: Optional[str],
+    timer: Any = NULL_TIMER,
+) -> Tuple[Optional[str], Optional[CachedResult]]:
+    """
+    (cache key, usable cached entry) for `sql_query`; both None when there is no cache to use.
+    """
+    if cache is None:
+        return None, None
+    version = _cache_version(backend, mcp_url)
+    if version is None:
+        return None, None
+    with timer.stage("fingerprint"):
+        key = sql_fingerprint(sql_query)
+    with timer.stage("cache"):
+        cache.check_version(version)
+        entry = cache.get(key)
+    if entry is not None and entry.min_rows is not None and entry.min_rows <= expected.row_count:
+        # only known to be "large"; not large enough to rule this ground truth out
+        entry = None
+    return key, entry
+
+
+_TIMINGS = TimingRecorder()
+_TIMINGS_EXPORT: Dict[str, Any] = {}
+_TIMINGS_LOCK = threading.Lock()
+
+
+def _new_timer() -> Any:
+    """
+    A StageTimer when EVAL_TIMINGS=1, else the shared no-op timer. The first enabled call also
+    starts the optional exports: EVAL_TIMINGS_PORT serves Prometheus text on /metrics, and
+    EVAL_TIMINGS_FILE receives the JSON summary when the process exits.
+    """
+    if os.getenv("EVAL_TIMINGS", "0") != "1":
+        return NULL_TIMER
+    if not _TIMINGS_EXPORT:
+        with _TIMINGS_LOCK:
+            if not _TIMINGS_EXPORT:
+                port = os.getenv("EVAL_TIMINGS_PORT")
+                if port:
+                    _TIMINGS_EXPORT["server"] = serve_prometheus(_TIMINGS, int(port))
+                path = os.getenv("EVAL_TIMINGS_FILE")
+                if path:
+                    atexit.register(lambda: Path(path).write_text(_TIMINGS.to_json()))
+                _TIMINGS_EXPORT["started"] = True
+    return StageTimer()
+
+
+def timing_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-stage latency summary (count, mean, p50/p95/p99, max in ms) of every evaluation so far with EVAL_TIMINGS=1.
+    """
+    return _TIMINGS.snapshot()
+
+
 def evaluate(messages: List[Dict[str, str]], ground_truth: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """
+    Execute the last assistant message as SQL and score 1 if its result matches ground_truth.
+
+    EVAL_BACKEND selects where the SQL runs: `mcp` (default) posts it to MCP_SERVER_URL,
+    `local` runs it in-process on a read-only DuckDB handle to DB_PATH.
+    Pass ordered=True to require matching row order, by_name=True to align columns by name.
+    Queries that cannot parse, bind or stay under EVAL_MAX_ESTIMATED_ROWS are rejected before
+    execution (see preflight.py). Results and SQL errors are cached per normalized query (see result_cache.py).
+    Callers scoring the same row repeatedly can pass compiled_ground_truth=canonicalize(ground_truth).
+    With EVAL_TIMINGS=1 the result carries "timings", milliseconds per stage (see stage_timer.py).
+    """
+    timer = kwargs.pop("timer", None) or _new_timer()
+    t0 = time.perf_counter()
+    res = _evaluate(messages, ground_truth, timer, **kwargs)
+    if timer.enabled:
+        timer.add("total", time.perf_counter() - t0)
+        res["timings"] = timer.as_ms()
+        _TIMINGS.observe(timer.stages)
+    return res
+
+
+def _evaluate(
+    messages: List[Dict[str, str]], ground_truth: List[Dict[str, Any]], timer: Any, **kwargs
+) -> Dict[str, Any]:
+    backend = os.getenv("EVAL_BACKEND", "mcp").strip().lower()
     mcp_url = os.getenv("MCP_SERVER_URL")
-    if not mcp_url:
+    if backend == "mcp" and not mcp_url:
         return {"score": 0, "is_score_valid": False, "reason": "MCP_SERVER_URL not set"}
+    if backend not in ("mcp", "local"):
+        return {"score": 0, "is_score_valid": False, "reason": f"Unknown EVAL_BACKEND: {backend}"}
     if not messages or "content" not in messages[-1]:
         return {"score": 0, "reason": "No assistant output"}
     sql_query = (messages[-1]["content"] or "").strip()
     if not sql_query:
         return {"score": 0, "reason": "Empty assistant output"}
-    headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-    payload = {
-        "id": "eval-1",
-        "jsonrpc": "2.0",
-        "method": "tools/call",
-        "params": {"session": {"id": "stateless-eval"}, "name": "query", "arguments": {"query": sql_query}},
-    }
-    try:
-        with requests.post(f"{mcp_url}/mcp/", headers=headers, json=payload, timeout=20, stream=True) as r:
-            r.raise_for_status()
-            resp = None
-            for line in r.iter_lines():
-                if line:
-                    txt = line.decode("utf-8")
-                    if txt.startswith("data:"):
-                        js = txt[5:].strip()
-                        if js:
-                            resp = json.loads(js)
-                            break
-        if not resp:
-            return {"score": 0, "reason": "No event-stream JSON found"}
-        if "error" in resp:
-            return {"score": 0, "reason": f"MCP error: {resp['error']}"}
-        ascii_table = resp["result"]["content"][0]["text"]
-        pred = _parse_duckdb_ascii(ascii_table)
-    except Exception as e:
-        return {"score": 0, "reason": f"MCP request failed: {e}"}
 
     if not isinstance(ground_truth, list):
         return {"score": 0, "is_score_valid": False, "reason": "ground_truth was not a list"}
+    expected = kwargs.get("compiled_ground_truth")
+    if expected is None:
+        with timer.stage("canonicalize"):
+            expected = canonicalize(ground_truth)
+    fetch_limit = _fetch_limit(expected)
 
-    def norm(v: Any) -> str:
-        if v is None:
-            return "None"
-        if isinstance(v, float) and not (math.isinf(v) or math.isnan(v)) and v == int(v):
-            v = int(v)
-        return str(v)
+    cache = _result_cache()
+    # evaluate_batch passes the (key, entry) it already looked up, so the cache is checked once
+    lookup = kwargs.get("cache_lookup")
+    key, entry = lookup or _cached_entry(cache, sql_query, expected, backend, mcp_url, timer)
+    if entry is None:
+        # evaluate_batch may already have run this query in a query_batch round-trip
+        pred, err, cacheable = kwargs.get("prefetched") or _execute(sql_query, backend, mcp_url, fetch_limit, timer)
+        if err is not None:
+            if key is not None and cacheable:
+                cache.put(key, CachedResult.failed(err))
+            if err.startswith(_LOAD_LIMITS):
+                return {"score": 0, "is_score_valid": False, "reason": err}
+            return {"score": 0, "reason": err}
+        if fetch_limit is not None and len(pred) >= fetch_limit:
+            entry = CachedResult.overflow(len(pred))
+        else:
+            with timer.stage("canonicalize"):
+                entry = CachedResult.ok(pred, canonicalize(pred))
+        if key is not None:
+            cache.put(key, entry)
+    if entry.error is not None:
+        return {"score": 0, "reason": entry.error}
+    if entry.min_rows is not None:
+        n = expected.row_count
+        return {"score": 0, "reason": f"mismatch: prediction returned more than {n} rows (ground truth has {n})"}
+    pred = entry.rows
 
     try:
-        gt_vals = sorted([sorted(map(norm, r.values())) for r in ground_truth])
-        pr_vals = sorted([sorted(map(norm, r.values())) for r in pred])
-        ok = gt_vals == pr_vals
+        ordered = bool(kwargs.get("ordered", False))
+        by_name = bool(kwargs.get("by_name", False))
+        with timer.stage("compare"):
+            ok = results_match(expected, entry.canonical, ordered=ordered, by_name=by_name)
         return {"score": 1 if ok else 0, "reason": "match" if ok else f"mismatch: gt={ground_truth} pred={pred}"}
     except Exception as e:
         return {"score": 0, "reason": f"compare error: {e}"}
@@ -123,20 +462,180 @@ def _coerce_messages_for_eval(row_messages: List[Any]) -> List[Dict[str, str]]:
     return out
 
 
-def _load_eval_rows(max_rows: int = 5) -> List[EvaluationRow]:
+# row_id -> compiled ground truth; rows are deep-copied per rollout, so identity can't be the key
+_COMPILED_GROUND_TRUTH: Dict[str, CanonicalResult] = {}
+
+
+def _compiled_ground_truth(row: EvaluationRow) -> Optional[CanonicalResult]:
+    """
+    Canonical form of row.ground_truth, compiled on first use per row_id and reused afterwards.
+    """
+    gt = row.ground_truth
+    if not isinstance(gt, list):
+        return None
+    row_id = row.input_metadata.row_id if row.input_metadata else None
+    compiled = _COMPILED_GROUND_TRUTH.get(row_id) if row_id else None
+    # Guard against a row_id being reused for different data: cheap size and first-row check
+    if compiled is not None and compiled.row_count == len(gt):
+        if not gt or compiled.rows[0] == tuple(map(canon, gt[0].values())):
+            return compiled
+    compiled = canonicalize(gt)
+    if row_id:
+        _COMPILED_GROUND_TRUTH[row_id] = compiled
+    return compiled
+
+
+def _eval_row_from_line(raw: bytes, obj: Dict[str, Any]) -> EvaluationRow:
+    er = EvaluationRow(messages=obj.get("messages", []), ground_truth=obj.get("ground_truth"))
+    # Content-derived row_id, so the compiled ground truth is found again after the row is copied
+    er.input_metadata.row_id = "sql-" + hashlib.sha1(raw).hexdigest()[:16]
+    _compiled_ground_truth(er)
+    return er
+
+
+def iter_eval_rows(
+    shard: Optional[Tuple[int, int]] = None,
+    sample: Optional[int] = None,
+    seed: Optional[int] = None,
+    ds_path: Optional[Path] = None,
+) -> Iterator[EvaluationRow]:
+    """
+    Lazily build EvaluationRows from the test split (or `ds_path`), optionally restricted to
+    shard (i, k) and/or a random sample of `sample` rows. Only the rows yielded are read.
+    """
     root = Path(__file__).resolve().parents[1]
-    ds_path = root / "datasets" / "final_rft_sql_test_data.jsonl"
-    rows: List[EvaluationRow] = []
+    ds_path = ds_path or root / "datasets" / "final_rft_sql_test_data.jsonl"
     if not ds_path.exists():
-        return rows
-    with open(ds_path, "r") as f:
-        for i, line in enumerate(f):
-            if i >= max_rows:
-                break
-            obj = json.loads(line)
-            er = EvaluationRow(messages=obj.get("messages", []), ground_truth=obj.get("ground_truth"))
-            rows.append(er)
-    return rows
+        return iter(())
+    view = JsonlDataset(ds_path).view()
+    if shard is not None:
+        view = view.shard(*shard)
+    if sample is not None:
+        view = view.sample(sample, seed)
+    return view.map(_eval_row_from_line)
+
+
+def _load_eval_rows(max_rows: int = 5) -> List[EvaluationRow]:
+    return list(itertools.islice(iter_eval_rows(), max_rows))
+
+
+def _score_row(
+    row: EvaluationRow,
+    prefetched: Optional[Tuple[Any, ...]] = None,
+    cache_lookup: Optional[Tuple[Optional[str], Optional[CachedResult]]] = None,
+) -> EvaluationRow:
+    """
+    Score one rolled-out row in place: run its SQL and set row.evaluation_result.
+    `prefetched` is the row's (rows, error, cacheable) execution result if it is already known,
+    `cache_lookup` the (key, entry) of a result-cache lookup already made for its SQL.
+    """
+    if not row.messages or row.ground_truth is None:
+        row.evaluation_result = EvaluateResult(
+            score=0.0, reason="Missing messages or ground_truth", is_score_valid=False
+        )
+        return row
+
+    # Ensure MCP server URL default for local dev if not set
+    if os.getenv("EVAL_BACKEND", "mcp").strip().lower() == "mcp" and not os.getenv("MCP_SERVER_URL"):
+        os.environ["MCP_SERVER_URL"] = "http://127.0.0.1:8080"
+
+    timer = _new_timer()
+    with timer.stage("coerce"):
+        msgs = _coerce_messages_for_eval(row.messages)
+    res = evaluate(
+        messages=msgs,
+        ground_truth=row.ground_truth if isinstance(row.ground_truth, list) else [],
+        compiled_ground_truth=_compiled_ground_truth(row),
+        timer=timer,
+        prefetched=prefetched,
+        cache_lookup=cache_lookup,
+    )
+    score = float(res.get("score", 0))
+    reason = res.get("reason")
+    is_valid = bool(res.get("is_score_valid", True))
+    row.evaluation_result = EvaluateResult(score=score, reason=reason, is_score_valid=is_valid)
+    if "timings" in res:
+        row.execution_metadata.extra = {**(row.execution_metadata.extra or {}), "eval_timings_ms": res["timings"]}
+    return row
+
+
+def _plan_batch(
+    rows: Sequence[EvaluationRow],
+) -> Tuple[
+    Dict[int, Tuple[Any, ...]],
+    Dict[Tuple[str, Optional[int]], List[int]],
+    Dict[int, Tuple[Optional[str], Optional[CachedResult]]],
+]:
+    """
+    Split rows for one query_batch round-trip: ({row index: result already known from preflight},
+    {(sql, max_rows): row indexes that need it executed}, {row index: its result-cache lookup}).
+    Rows the result cache can answer, that evaluate() rejects before executing, or that fetch
+    more than EVAL_MCP_PAGE_ROWS rows (paged by _execute_mcp instead), are left out of the first two.
+    """
+    page_rows = int(os.getenv("EVAL_MCP_PAGE_ROWS", "1000"))
+    mcp_url = os.environ["MCP_SERVER_URL"]
+    cache = _result_cache()
+    known: Dict[int, Tuple[Any, ...]] = {}
+    pending: Dict[Tuple[str, Optional[int]], List[int]] = {}
+    lookups: Dict[int, Tuple[Optional[str], Optional[CachedResult]]] = {}
+    for i, row in enumerate(rows):
+        if not row.messages or not isinstance(row.ground_truth, list):
+            continue
+        msgs = _coerce_messages_for_eval(row.messages)
+        sql_query = ((msgs[-1].get("content") if msgs else None) or "").strip()
+        if not sql_query:
+            continue
+        expected = _compiled_ground_truth(row)
+        fetch_limit = _fetch_limit(expected)
+        if fetch_limit is not None and 0 < page_rows < fetch_limit:
+            continue
+        lookups[i] = _cached_entry(cache, sql_query, expected, "mcp", mcp_url)
+        if lookups[i][1] is not None:
+            continue
+        pf = _preflight("mcp", mcp_url)
+        reason = pf.check(sql_query) if pf is not None else None
+        if reason is not None:
+            known[i] = (None, reason, True)
+        else:
+            pending.setdefault((sql_query, fetch_limit), []).append(i)
+    return known, pending, lookups
+
+
+async def evaluate_batch(rows: Sequence[EvaluationRow], concurrency: int = 8) -> List[EvaluationRow]:
+    """
+    Score many rows concurrently, with at most `concurrency` queries in flight.
+
+    Each row goes through the same path as test_sql_rft_local, on a worker thread sharing
+    the keep-alive HTTP session, so scores are identical to sequential scoring. Results
+    come back in input order. From sync code: asyncio.run(evaluate_batch(rows)).
+
+    With the MCP backend, the SQL of all rows is first sent in `query_batch` calls of up to
+    EVAL_MCP_BATCH_SIZE queries (distinct queries only) instead of one request per row;
+    EVAL_MCP_BATCH=0 turns that off.
+    """
+    loop = asyncio.get_running_loop()
+    prefetched: Dict[int, Tuple[Any, ...]] = {}
+    lookups: Dict[int, Tuple[Optional[str], Optional[CachedResult]]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="sql-eval") as pool:
+        if os.getenv("EVAL_BACKEND", "mcp").strip().lower() == "mcp" and os.getenv("EVAL_MCP_BATCH", "1") != "0":
+            if not os.getenv("MCP_SERVER_URL"):
+                os.environ["MCP_SERVER_URL"] = "http://127.0.0.1:8080"
+            prefetched, pending, lookups = await loop.run_in_executor(pool, _plan_batch, rows)
+            queries = list(pending)
+            size = max(1, int(os.getenv("EVAL_MCP_BATCH_SIZE", "64")))
+            chunks = [queries[i:i + size] for i in range(0, len(queries), size)]
+            mcp_url = os.environ["MCP_SERVER_URL"]
+            batches = await asyncio.gather(
+                *(loop.run_in_executor(pool, _execute_mcp_batch, chunk, mcp_url) for chunk in chunks)
+            )
+            for chunk, results in zip(chunks, batches):
+                for query, result in zip(chunk, results):
+                    for i in pending[query]:
+                        prefetched[i] = result
+        scored = (
+            loop.run_in_executor(pool, _score_row, r, prefetched.get(i), lookups.get(i)) for i, r in enumerate(rows)
+        )
+        return list(await asyncio.gather(*scored))
 
 
 @evaluation_test(
@@ -158,22 +657,6 @@ def test_sql_rft_local(row: EvaluationRow) -> EvaluationRow:
     Local evaluation test: uses SingleTurnRolloutProcessor to have the model produce SQL,
     then evaluates via MCP server against ground_truth.
     Run with: pytest evaluator/sql_rft_evaluator.py -vs
-    Environment: export MCP_SERVER_URL=http://127.0.0.1:8080
+    Environment: export MCP_SERVER_URL=http://127.0.0.1:8080 (or EVAL_BACKEND=local to skip the server)
     """
-    if not row.messages or row.ground_truth is None:
-        row.evaluation_result = EvaluateResult(
-            score=0.0, reason="Missing messages or ground_truth", is_score_valid=False
-        )
-        return row
-
-    # Ensure MCP server URL default for local dev if not set
-    if not os.getenv("MCP_SERVER_URL"):
-        os.environ["MCP_SERVER_URL"] = "http://127.0.0.1:8080"
-
-    msgs = _coerce_messages_for_eval(row.messages)
-    res = evaluate(messages=msgs, ground_truth=row.ground_truth if isinstance(row.ground_truth, list) else [])
-    score = float(res.get("score", 0))
-    reason = res.get("reason")
-    is_valid = bool(res.get("is_score_valid", True))
-    row.evaluation_result = EvaluateResult(score=score, reason=reason, is_score_valid=is_valid)
-    return row
+    return _score_row(row)
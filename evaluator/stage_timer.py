@@ -0,0 +1,196 @@
+"""
+Per-stage latency instrumentation for the evaluator.
+
+Enabled with EVAL_TIMINGS=1. Every evaluate() call then gets a StageTimer, and the code
+paths it goes through wrap their work in `timer.stage(name)`:
+
+    coerce        message extraction / <think> stripping (_score_row only)
+    fingerprint   SQL normalization for the result cache
+    cache         result cache lookup
+    preflight     parse / bind / estimate checks
+    transport     MCP HTTP round-trip, excluding server execution
+    server        query execution as reported by the MCP server (elapsed_ms)
+    decode        columnar payload -> row dicts
+    execute       in-process execution (EVAL_BACKEND=local)
+    canonicalize  canonical form of the prediction
+    compare       result comparison
+    total         the whole evaluate() call
+
+The per-row breakdown (milliseconds) is returned with the result, and each row is folded
+into the process-wide TimingRecorder, which reports count / mean / p50 / p95 / p99 / max
+per stage as JSON or Prometheus text. When disabled, `stage()` returns one shared no-op
+context manager, so the instrumented code pays a method call per stage and nothing else.
+"""
+import json
+import math
+import time
+import random
+import threading
+import contextlib
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ContextManager, Dict, Iterator
+
+
+class StageTimer:
+    """
+    Wall-clock seconds per stage for one evaluation; repeated stages accumulate.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def split(self, src: str, dst: str, seconds: float) -> None:
+        """
+        Attribute `seconds` of stage `src` to stage `dst` instead (e.g. server time inside the HTTP call).
+        """
+        seconds = min(seconds, self.stages.get(src, 0.0))
+        self.stages[src] = self.stages.get(src, 0.0) - seconds
+        self.add(dst, seconds)
+
+    def as_ms(self) -> Dict[str, float]:
+        return {k: round(v * 1000, 3) for k, v in self.stages.items()}
+
+
+class _NullTimer:
+    enabled = False
+    stages: Dict[str, float] = {}
+    _NULL = contextlib.nullcontext()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        return self._NULL
+
+    def add(self, name: str, seconds: float) -> None:
+        pass
+
+    def split(self, src: str, dst: str, seconds: float) -> None:
+        pass
+
+    def as_ms(self) -> Dict[str, float]:
+        return {}
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = array("d")
+
+
+class TimingRecorder:
+    """
+    Thread-safe per-stage latency distribution.
+
+    Keeps exact count/sum/max and a uniform reservoir of at most `max_samples` durations per
+    stage for the percentiles, so memory stays bounded on arbitrarily long runs.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, max_samples: int = 100_000):
+        self.max_samples = max_samples
+        self._stages: Dict[str, _Stage] = {}
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def observe(self, stages: Dict[str, float]) -> None:
+        with self._lock:
+            for name, seconds in stages.items():
+                st = self._stages.get(name)
+                if st is None:
+                    st = self._stages[name] = _Stage()
+                st.count += 1
+                st.total += seconds
+                st.max = max(st.max, seconds)
+                if len(st.samples) < self.max_samples:
+                    st.samples.append(seconds)
+                else:
+                    j = self._rng.randrange(st.count)
+                    if j < self.max_samples:
+                        st.samples[j] = seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, sum_ms}}
+        """
+        with self._lock:
+            stages = {name: (st.count, st.total, st.max, sorted(st.samples)) for name, st in self._stages.items()}
+        out: Dict[str, Dict[str, float]] = {}
+        for name, (count, total, peak, samples) in sorted(stages.items()):
+            row: Dict[str, float] = {"count": count, "mean_ms": round(total / count * 1000, 3)}
+            for q in self.QUANTILES:
+                row[f"p{round(q * 100)}_ms"] = round(_quantile(samples, q) * 1000, 3)
+            row["max_ms"] = round(peak * 1000, 3)
+            row["sum_ms"] = round(total * 1000, 3)
+            out[name] = row
+        return out
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, metric: str = "sql_eval_stage_seconds") -> str:
+        """
+        Prometheus text exposition: one summary with a `stage` label, in seconds.
+        """
+        lines = [f"# HELP {metric} Evaluator latency per stage.", f"# TYPE {metric} summary"]
+        for name, row in self.snapshot().items():
+            for q in self.QUANTILES:
+                lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} {row[f"p{round(q * 100)}_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {row["sum_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _quantile(sorted_samples: Any, q: float) -> float:
+    # nearest-rank
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[max(0, math.ceil(q * len(sorted_samples)) - 1)]
+
+
+def serve_prometheus(recorder: TimingRecorder, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve `recorder` as Prometheus text on http://host:port/metrics from a daemon thread.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = recorder.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="eval-timings", daemon=True).start()
+    return httpd
@@ -0,0 +1,183 @@
+"""
+Admission control for the MCP endpoint.
+
+An RFT job can fan out hundreds of evaluator calls at once. Accepting all of them makes
+every request slow until they all hit the client timeout. AdmissionControl is an ASGI
+middleware that lets at most `max_inflight` requests run in this worker and parks the
+rest in per-client FIFO queues (at most `max_queue` in total and `max_client_queue` per
+client). When a request finishes, its slot goes to the head of the next client's queue
+in round-robin order, so one client's burst cannot starve the others.
+
+A request that cannot be queued, or that waits longer than `max_wait_s`, is answered at
+once with 429 and a Retry-After estimated from the recent request duration and the
+current backlog. So under overload, a request's latency is bounded by `max_wait_s` plus
+its own execution time.
+
+Clients are told apart by the X-Client-Id header, then Mcp-Session-Id, then the peer
+address.
+"""
+import os
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+import anyio
+from starlette.responses import JSONResponse
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self) -> None:
+        self.event = anyio.Event()
+        self.granted = False
+
+
+class AdmissionControl:
+    """
+    Bounded, per-client fair admission in front of an ASGI app (one instance per worker process).
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        max_inflight: int = 8,
+        max_queue: int = 64,
+        max_client_queue: int = 16,
+        max_wait_s: float = 5.0,
+    ):
+        self.app = app
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_client_queue = max_client_queue
+        self.max_wait_s = max_wait_s
+        self.inflight = 0
+        self.queued = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._avg_s = 0.05
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @classmethod
+    def from_env(cls, app: Any, pool_size: int = 4) -> Any:
+        """
+        ADMISSION=0 returns `app` unwrapped; ADMISSION_MAX_INFLIGHT (default 2 x pool_size),
+        ADMISSION_MAX_QUEUE, ADMISSION_CLIENT_QUEUE and ADMISSION_MAX_WAIT_S bound it.
+        """
+        if os.environ.get("ADMISSION", "1") == "0":
+            return app
+        return cls(
+            app,
+            max_inflight=int(os.environ.get("ADMISSION_MAX_INFLIGHT", str(2 * pool_size))),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+            max_client_queue=int(os.environ.get("ADMISSION_CLIENT_QUEUE", "16")),
+            max_wait_s=float(os.environ.get("ADMISSION_MAX_WAIT_S", "5")),
+        )
+
+    @staticmethod
+    def client_id(scope: Dict[str, Any]) -> str:
+        headers = dict(scope.get("headers") or [])
+        for name in (b"x-client-id", b"mcp-session-id"):
+            if headers.get(name):
+                return headers[name].decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "-"
+
+    def retry_after(self) -> int:
+        # Seconds until the current backlog should have drained, at the recent request duration
+        backlog = self.inflight + self.queued
+        return max(1, min(30, math.ceil(self._avg_s * backlog / max(self.max_inflight, 1))))
+
+    async def _reject(self, scope: Dict[str, Any], receive: Any, send: Any, reason: str) -> None:
+        self.rejected += 1
+        retry = self.retry_after()
+        response = JSONResponse(
+            {"error": f"server busy: {reason}", "retry_after": retry},
+            status_code=429,
+            headers={"Retry-After": str(retry)},
+        )
+        await response(scope, receive, send)
+
+    async def _acquire(self, client: str) -> Optional[str]:
+        """
+        Take an in-flight slot (None) or give the reason the request is turned away.
+        """
+        if self.inflight < self.max_inflight and not self.queued:
+            self.inflight += 1
+            return None
+        queue = self._queues.get(client)
+        if self.queued >= self.max_queue:
+            return f"{self.queued} requests queued"
+        if queue is not None and len(queue) >= self.max_client_queue:
+            return f"{len(queue)} requests queued for this client"
+        if queue is None:
+            queue = self._queues[client] = deque()
+        waiter = _Waiter()
+        queue.append(waiter)
+        self.queued += 1
+        try:
+            with anyio.move_on_after(self.max_wait_s):
+                await waiter.event.wait()
+        except BaseException:
+            # cancelled while queued (e.g. the client went away): pass on a slot it was just given
+            if waiter.granted:
+                self._release()
+            else:
+                self._forget(client, queue, waiter)
+            raise
+        if waiter.granted:
+            return None
+        self._forget(client, queue, waiter)
+        self.timed_out += 1
+        return f"waited {self.max_wait_s:g}s"
+
+    def _forget(self, client: str, queue: Deque[_Waiter], waiter: _Waiter) -> None:
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue and self._queues.get(client) is queue:
+            del self._queues[client]
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next client in round-robin order
+        if not self._queues:
+            self.inflight -= 1
+            return
+        client, queue = next(iter(self._queues.items()))
+        waiter = queue.popleft()
+        if queue:
+            self._queues.move_to_end(client)
+        else:
+            del self._queues[client]
+        self.queued -= 1
+        waiter.granted = True
+        waiter.event.set()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason = await self._acquire(self.client_id(scope))
+        if reason is not None:
+            await self._reject(scope, receive, send, reason)
+            return
+        self.admitted += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._avg_s = 0.9 * self._avg_s + 0.1 * (time.perf_counter() - t0)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "clients_waiting": len(self._queues),
+            "max_inflight": self.max_inflight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_request_ms": round(self._avg_s * 1000, 3),
+        }
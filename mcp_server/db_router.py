@@ -0,0 +1,193 @@
+"""
+Routing of tool calls to one of several read-only DuckDB databases.
+
+One deployment can serve several dataset versions or augmentation rounds. Tool calls
+select a database with a "database" key in their arguments. Omitting it means the
+default database (DB_PATH). The keys are configured with
+
+    DATABASES=v1=data/v1.db,v2=data/v2.db     explicit key=path pairs
+    DB_DIR=data/versions                      every *.db / *.duckdb file, keyed by file stem
+
+Only the default database is opened at startup. Every other database gets its own
+QueryEngine, opened read-only the first time a request names it (off the event loop,
+and once even if several requests name it at the same time). Open engines are kept in
+LRU order. Beyond `max_open` engines, or beyond `max_memory` bytes of DuckDB memory in
+use across them, the least recently used idle engine is closed. Engines held by a
+request, and the default engine, are never closed. A closed database is reopened
+transparently on its next use.
+"""
+import os
+import glob
+import contextlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Optional
+
+import anyio
+
+if TYPE_CHECKING:
+    from query_engine import QueryEngine
+
+
+DEFAULT_KEY = "default"
+
+
+def parse_size(value: str) -> int:
+    """
+    "512MB" / "2GB" / "1048576" -> bytes.
+    """
+    units = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40, "B": 1}
+    text = value.strip().upper().replace("IB", "B")
+    for suffix, mult in units.items():
+        if text.endswith(suffix):
+            return int(float(text[: -len(suffix)]) * mult)
+    return int(text)
+
+
+def databases_from_env(default_path: str) -> Dict[str, str]:
+    """
+    {key: path} from DATABASES and DB_DIR, plus DEFAULT_KEY -> `default_path`.
+    """
+    databases: Dict[str, str] = {DEFAULT_KEY: default_path}
+    db_dir = os.environ.get("DB_DIR")
+    if db_dir:
+        for path in sorted(glob.glob(os.path.join(db_dir, "*.db")) + glob.glob(os.path.join(db_dir, "*.duckdb"))):
+            databases[os.path.splitext(os.path.basename(path))[0]] = path
+    for item in filter(None, (s.strip() for s in os.environ.get("DATABASES", "").split(","))):
+        key, sep, path = item.partition("=")
+        if not sep or not key.strip() or not path.strip():
+            raise ValueError(f"DATABASES entry {item!r} is not key=path")
+        databases[key.strip()] = path.strip()
+    return databases
+
+
+class UnknownDatabase(ValueError):
+    pass
+
+
+class DatabaseRouter:
+    """
+    Lazily opened, LRU-bounded QueryEngines, one per configured database key.
+    """
+
+    def __init__(
+        self,
+        databases: Dict[str, str],
+        factory: Callable[[str], "QueryEngine"],
+        default: str = DEFAULT_KEY,
+        max_open: int = 4,
+        max_memory: Optional[int] = None,
+    ):
+        if default not in databases:
+            raise ValueError(f"default database {default!r} is not configured")
+        self.databases = dict(databases)
+        self.factory = factory
+        self.default_key = default
+        self.max_open = max(1, max_open)
+        self.max_memory = max_memory
+        self.default = factory(databases[default])
+        self._open: "OrderedDict[str, QueryEngine]" = OrderedDict({default: self.default})
+        self._users: Dict[str, int] = {}
+        self._opening: Dict[str, anyio.Lock] = {}
+        self.opens = 0
+        self.evictions = 0
+
+    @classmethod
+    def single(cls, engine: "QueryEngine") -> "DatabaseRouter":
+        """
+        A router that only knows `engine`, as the default database.
+        """
+        return cls({DEFAULT_KEY: engine.db_path}, lambda path: engine)
+
+    @classmethod
+    def from_env(cls, default_path: str, factory: Callable[[str], "QueryEngine"]) -> "DatabaseRouter":
+        """
+        DATABASES / DB_DIR name the databases (see module docstring); DB_MAX_OPEN (default 4)
+        and DB_MAX_MEMORY (e.g. 4GB; unset = no bound) limit the open ones.
+        """
+        max_memory = os.environ.get("DB_MAX_MEMORY")
+        return cls(
+            databases_from_env(default_path),
+            factory,
+            default=os.environ.get("DEFAULT_DATABASE", DEFAULT_KEY),
+            max_open=int(os.environ.get("DB_MAX_OPEN", "4")),
+            max_memory=parse_size(max_memory) if max_memory else None,
+        )
+
+    def engines(self) -> Dict[str, "QueryEngine"]:
+        return dict(self._open)
+
+    @contextlib.asynccontextmanager
+    async def lease(self, key: Optional[str] = None) -> AsyncIterator["QueryEngine"]:
+        """
+        The engine for database `key` (default if None), held open for the duration of the block.
+        """
+        key = key or self.default_key
+        if key not in self.databases:
+            raise UnknownDatabase(f"unknown database {key!r}; available: {', '.join(sorted(self.databases))}")
+        opened = False
+        while key not in self._open:
+            await self._open_engine(key)
+            opened = True
+        # no await from here until the engine is marked as held, so it cannot be evicted in between
+        engine = self._open[key]
+        self._open.move_to_end(key)
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            if opened:
+                await self._evict()
+            yield engine
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                if len(self._open) > self.max_open:
+                    await self._evict()
+
+    async def _open_engine(self, key: str) -> None:
+        # Router state is only touched on the event loop; opening (and a snapshot copy) runs in a thread
+        lock = self._opening.setdefault(key, anyio.Lock())
+        async with lock:
+            if key in self._open:
+                return
+            self._open[key] = await anyio.to_thread.run_sync(self.factory, self.databases[key])
+            self.opens += 1
+        if self._opening.get(key) is lock:
+            del self._opening[key]
+
+    async def _evict(self) -> None:
+        # Close least recently used engines that nobody holds until both bounds are met
+        memory = await anyio.to_thread.run_sync(self._memory_usage) if self.max_memory else {}
+        for key in list(self._open):
+            over_count = len(self._open) > self.max_open
+            over_memory = self.max_memory is not None and sum(memory.values()) > self.max_memory
+            if not (over_count or over_memory):
+                break
+            if key == self.default_key or key in self._users or key not in self._open:
+                continue
+            engine = self._open.pop(key)
+            memory.pop(key, None)
+            self.evictions += 1
+            await anyio.to_thread.run_sync(engine.close)
+
+    def _memory_usage(self) -> Dict[str, int]:
+        usage = {}
+        for key, engine in list(self._open.items()):
+            try:
+                usage[key] = engine.memory_usage()
+            except Exception:
+                usage[key] = 0  # closed by a concurrent eviction
+        return usage
+
+    def close(self) -> None:
+        while self._open:
+            self._open.popitem()[1].close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default_key,
+            "configured": sorted(self.databases),
+            "open": list(self._open),
+            "max_open": self.max_open,
+            "opens": self.opens,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,257 @@
+"""
+Low-overhead server metrics, exposed as Prometheus text on GET /metrics.
+
+ServerMetrics is updated inline by the tools and the query engine. Each update is a
+few dict operations under one lock, and no background thread runs. The collected
+metrics are:
+
+    mcp_tool_duration_seconds{tool}        histogram of tool call latency
+    mcp_tool_calls_total{tool,status}      tool calls, ok / error
+    mcp_query_duration_seconds             histogram of single SQL executions (batch items included)
+    mcp_query_rows_total                   rows returned by those executions
+    mcp_query_errors_total{class}          failed executions by error class (limit_timeout, parser, ...)
+    mcp_response_bytes_total               HTTP response body bytes sent from /mcp
+    mcp_http_responses_total{status}       /mcp responses by status code (429 = admission)
+    mcp_slow_query_seconds{rank,fingerprint}  the `top_n` slowest normalized queries seen
+
+The hot path does no SQL parsing: the slow-query table is keyed by whitespace-normalized
+text, and variants are merged by parse-tree fingerprint only when it is scraped.
+
+Gauges such as in-flight and queued requests, running queries and open cursors, and
+counters owned elsewhere such as the result cache's hits, are read from their owners at
+scrape time and passed to `render`. Slow queries are identified by fingerprint only: query
+text would make label values unbounded and publish user SQL on an unauthenticated endpoint.
+
+All values are per worker process. `GET /metrics?format=json` returns the same data as
+JSON, for a quick look without a collector.
+"""
+import time
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+
+from query_cache import sql_fingerprint
+
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def error_class(e: BaseException) -> str:
+    """
+    Short label for a query failure: limit_<limit>, a DuckDB error kind (parser, binder, catalog, ...) or the type name.
+    """
+    limit = getattr(e, "limit", None)
+    if isinstance(limit, str):
+        return f"limit_{limit}"
+    cause = e if isinstance(e, duckdb.Error) else (e.__cause__ or e.__context__)
+    if isinstance(cause, duckdb.Error):
+        name = type(cause).__name__
+        return (name[: -len("Exception")] if name.endswith("Exception") else name).lower() or "duckdb"
+    return type(e).__name__
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        # caller holds the lock
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, total = [], 0
+        for le, n in zip([*(f"{b:g}" for b in BUCKETS), "+Inf"], self.counts):
+            total += n
+            out.append((le, total))
+        return out
+
+
+class ServerMetrics:
+    """
+    Counters, histograms and the slow-query table of one server process.
+    """
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Histogram] = {}
+        self._tool_calls: Dict[Tuple[str, str], int] = {}
+        self._queries = Histogram()
+        self._rows = 0
+        self._errors: Dict[str, int] = {}
+        self._bytes = 0
+        self._statuses: Dict[int, int] = {}
+        # normalized sql -> [max_s, sum_s, count]; twice top_n, as variants merge when reported
+        self._slow: Dict[str, List[float]] = {}
+        self._slow_floor = 0.0
+
+    def observe_tool(self, tool: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            hist = self._tools.get(tool)
+            if hist is None:
+                hist = self._tools[tool] = Histogram()
+            hist.observe(seconds)
+            key = (tool, "ok" if ok else "error")
+            self._tool_calls[key] = self._tool_calls.get(key, 0) + 1
+
+    def observe_query(self, sql: str, seconds: float, rows: int) -> None:
+        with self._lock:
+            self._queries.observe(seconds)
+            self._rows += rows
+            slow = self._slow
+            if len(slow) >= 2 * self.top_n and seconds <= self._slow_floor:
+                return
+            # Keyed by whitespace-normalized text here; variants are merged by fingerprint at scrape time
+            key = " ".join(sql.split())
+            entry = slow.get(key)
+            if entry is not None:
+                entry[0] = max(entry[0], seconds)
+                entry[1] += seconds
+                entry[2] += 1
+                return
+            slow[key] = [seconds, seconds, 1]
+            if len(slow) > 2 * self.top_n:
+                del slow[min(slow, key=lambda k: slow[k][0])]
+            if len(slow) >= 2 * self.top_n:
+                self._slow_floor = min(e[0] for e in slow.values())
+
+    def query_error(self, e: BaseException) -> None:
+        cls = error_class(e)
+        with self._lock:
+            self._errors[cls] = self._errors.get(cls, 0) + 1
+
+    def observe_response(self, status: int, nbytes: int) -> None:
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            self._bytes += nbytes
+
+    def wrap(self, app: Any) -> Any:
+        """
+        ASGI wrapper that counts response status codes and body bytes.
+        """
+
+        async def counted(scope: Dict[str, Any], receive: Any, send: Any) -> None:
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+            state = {"status": 0, "bytes": 0}
+
+            async def counting_send(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    state["status"] = message["status"]
+                elif message["type"] == "http.response.body":
+                    state["bytes"] += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await app(scope, receive, counting_send)
+            finally:
+                self.observe_response(state["status"], state["bytes"])
+
+        return counted
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [(sql, list(e)) for sql, e in self._slow.items()]
+        merged: Dict[str, List[Any]] = {}
+        for sql, (peak, total, count) in entries:
+            key = sql_fingerprint(sql)
+            m = merged.get(key)
+            if m is None:
+                merged[key] = [peak, total, count, sql]
+            else:
+                m[0], m[1], m[2] = max(m[0], peak), m[1] + total, m[2] + count
+        top = sorted(merged.items(), key=lambda kv: kv[1][0], reverse=True)[: self.top_n]
+        return [
+            {"fingerprint": k[:12], "max_ms": round(m[0] * 1000, 3), "mean_ms": round(m[1] / m[2] * 1000, 3),
+             "count": m[2]}
+            for k, m in top
+        ]
+
+    def snapshot(
+        self, gauges: Optional[Dict[str, float]] = None, counters: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            tools = {
+                t: {"count": h.count, "sum_s": round(h.sum, 6), "buckets": dict(h.cumulative())}
+                for t, h in sorted(self._tools.items())
+            }
+            out = {
+                "uptime_s": round(time.time() - self.started, 3),
+                "tools": tools,
+                "tool_calls": {f"{t}:{s}": n for (t, s), n in sorted(self._tool_calls.items())},
+                "queries": {"count": self._queries.count, "sum_s": round(self._queries.sum, 6),
+                            "buckets": dict(self._queries.cumulative())},
+                "rows_total": self._rows,
+                "response_bytes_total": self._bytes,
+                "http_responses": {str(k): v for k, v in sorted(self._statuses.items())},
+                "errors": dict(sorted(self._errors.items())),
+            }
+        out["gauges"] = dict(gauges or {})
+        out["counters"] = dict(counters or {})
+        out["slow_queries"] = self.slow_queries()
+        return out
+
+    def render(self, gauges: Optional[Dict[str, float]] = None, counters: Optional[Dict[str, float]] = None) -> str:
+        """
+        Prometheus text exposition; `gauges` ({name: value}) are emitted as mcp_<name>, and
+        `counters` as mcp_<name>_total.
+        """
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, hist: Histogram, labels: str = "") -> None:
+            sep = "," if labels else ""
+            for le, n in hist.cumulative():
+                lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {n}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {hist.sum:.6f}")
+            lines.append(f"{name}_count{suffix} {hist.count}")
+
+        def counter(name: str, help_text: str, samples: Iterable[Tuple[str, float]]) -> None:
+            header(name, "counter", help_text)
+            for labels, v in samples:
+                lines.append(f"{name}{{{labels}}} {v}" if labels else f"{name} {v}")
+
+        with self._lock:
+            header("mcp_tool_duration_seconds", "histogram", "MCP tool call latency.")
+            for tool, hist in sorted(self._tools.items()):
+                histogram("mcp_tool_duration_seconds", hist, f'tool="{tool}"')
+            counter("mcp_tool_calls_total", "MCP tool calls by outcome.", [
+                (f'tool="{t}",status="{s}"', n) for (t, s), n in sorted(self._tool_calls.items())
+            ])
+            header("mcp_query_duration_seconds", "histogram", "Single SQL execution latency, cache hits included.")
+            histogram("mcp_query_duration_seconds", self._queries)
+            counter("mcp_query_rows_total", "Rows returned by SQL executions.", [("", self._rows)])
+            counter("mcp_query_errors_total", "Failed SQL executions by error class.", [
+                (f'class="{c}"', n) for c, n in sorted(self._errors.items())
+            ])
+            counter("mcp_response_bytes_total", "HTTP response body bytes sent from /mcp.", [("", self._bytes)])
+            counter("mcp_http_responses_total", "/mcp responses by status code.", [
+                (f'status="{s}"', n) for s, n in sorted(self._statuses.items())
+            ])
+        for name, value in sorted((gauges or {}).items()):
+            header(f"mcp_{name}", "gauge", f"{name.replace('_', ' ').capitalize()}.")
+            lines.append(f"mcp_{name} {value}")
+        for name, value in sorted((counters or {}).items()):
+            counter(f"mcp_{name}_total", f"{name.replace('_', ' ').capitalize()}.", [("", value)])
+        header("mcp_slow_query_seconds", "gauge", f"Max latency of the {self.top_n} slowest normalized queries.")
+        for rank, q in enumerate(self.slow_queries(), 1):
+            lines.append(
+                f'mcp_slow_query_seconds{{rank="{rank}",fingerprint="{q["fingerprint"]}"}} {q["max_ms"] / 1000:.6f}'
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,198 @@
+"""
+In-server result cache for the MCP server's query tools.
+
+Evaluator processes and benchmark runs send the same SQL again and again, and the
+database is opened read-only, so results are reusable across requests. Entries are keyed
+by a fingerprint of DuckDB's parse tree (json_serialize_sql without source positions),
+so variants that differ only in whitespace, comments or keyword case share one entry.
+The cache is a thread-safe LRU bounded by entry count and approximate bytes, entries
+expire after `ttl_s`, and everything is dropped as soon as the database file's
+mtime/size changes.
+
+A result fetched with a row limit can serve any smaller limit; only successful results
+are cached (limit failures such as timeouts depend on load, not on the SQL).
+"""
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+
+
+_COMMENT_OR_LITERAL = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_QUERY_LOCATION = re.compile(r'"query_location":\d+,?')
+
+_parser = threading.local()
+
+
+def sql_fingerprint(sql: str) -> str:
+    """
+    Hash of the DuckDB parse tree of `sql`, or of its comment-stripped text if it does not parse.
+    """
+    out = _COMMENT_OR_LITERAL.sub(lambda m: m.group(0) if m.group(0)[0] in "'\"" else " ", sql)
+    text = " ".join(out.split()).rstrip(";").strip()
+    con = getattr(_parser, "con", None)
+    if con is None:
+        con = _parser.con = duckdb.connect(":memory:")
+    try:
+        # Inlined as a literal: binding a Python parameter makes DuckDB import pandas and numpy
+        # (over half a second on the first query of a fresh process)
+        tree = con.execute("SELECT json_serialize_sql('" + text.replace("'", "''") + "')").fetchone()[0]
+        if not tree.startswith('{"error":true'):
+            text = _QUERY_LOCATION.sub("", tree)
+    except duckdb.Error:
+        pass
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def file_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _approx_size(rows: List[tuple]) -> int:
+    size = 64
+    for r in rows:
+        size += 56 + 8 * len(r)
+        for v in r:
+            size += len(v) + 49 if isinstance(v, str) else 24
+    return size
+
+
+@dataclass(frozen=True)
+class CachedQuery:
+    columns: List[str]
+    types: List[str]
+    rows: List[tuple]
+    truncated: bool
+    nbytes: int
+    expires_at: float
+
+    def serve(self, max_rows: int) -> Optional[Tuple[List[str], List[str], List[tuple], bool]]:
+        """
+        (columns, types, rows, truncated) for a fetch of at most `max_rows`, or None if this entry has too few rows.
+        """
+        if self.truncated and max_rows > len(self.rows):
+            return None
+        if len(self.rows) <= max_rows:
+            return self.columns, self.types, self.rows, self.truncated
+        return self.columns, self.types, self.rows[:max_rows], True
+
+
+class QueryCache:
+    """
+    Thread-safe LRU of query results bounded by entry count, approximate bytes and age.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_entries: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_s: float = 600.0,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, CachedQuery]" = OrderedDict()
+        self._bytes = 0
+        self._version = file_version(db_path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, db_path: str) -> Optional["QueryCache"]:
+        """
+        QUERY_CACHE=0 disables the cache (None); QUERY_CACHE_ENTRIES / _BYTES / _TTL_S bound it.
+        """
+        if os.environ.get("QUERY_CACHE", "1") == "0":
+            return None
+        return cls(
+            db_path,
+            max_entries=int(os.environ.get("QUERY_CACHE_ENTRIES", "4096")),
+            max_bytes=int(os.environ.get("QUERY_CACHE_BYTES", str(64 * 1024 * 1024))),
+            ttl_s=float(os.environ.get("QUERY_CACHE_TTL_S", "600")),
+        )
+
+    def _check_version(self) -> None:
+        # caller holds the lock
+        version = file_version(self.db_path)
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def get(self, key: str, max_rows: int) -> Optional[Tuple[List[str], List[str], List[tuple], bool]]:
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            hit = entry.serve(max_rows) if entry is not None else None
+            if hit is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit
+
+    def put(self, key: str, columns: List[str], types: List[str], rows: List[tuple], truncated: bool) -> None:
+        nbytes = _approx_size(rows) + 32 * len(columns)
+        if nbytes > self.max_bytes:
+            return
+        entry = CachedQuery(columns, types, rows, truncated, nbytes, time.monotonic() + self.ttl_s)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                # keep the live entry if it already answers every limit the new one does
+                covers = not old.truncated or (truncated and len(old.rows) >= len(rows))
+                if covers and old.expires_at > time.monotonic():
+                    return
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,767 @@
+"""
+Typed query execution for the MCP server.
+
+The `query` tool inherited from mcp_server_motherduck renders results as an ASCII table,
+which clients then have to split and re-type. The `query_rows` tool registered here runs
+the SQL on a read-only DuckDB handle and returns columnar JSON in `structuredContent`:
+
+    {"columns": [...], "types": [...], "data": [[col0...], [col1...]],
+     "row_count": n, "truncated": bool, "elapsed_ms": float}
+
+`elapsed_ms` is the server-side execution and fetch time, so clients can tell it apart
+from transport overhead.
+
+`query_page` pages through a result of any size: each call returns at most `page_size`
+rows (the same payload, plus "offset" and "cursor"), and the client passes the returned
+cursor back, with the same query, to get the next page; "cursor" is null on the last
+page. Between calls the result stays open on the server as a streaming DuckDB result,
+so neither side ever holds more than one page. Open results are bounded
+(`max_cursors`, least recently used closed first) and expire after `cursor_ttl_s`
+idle seconds. A cursor that is no longer open here (expired, evicted, or opened by
+another worker process) is resumed by re-running the query and skipping the rows
+already returned, which is exact for queries whose row order is deterministic.
+
+`query_batch` takes {"queries": [{"query": ..., "max_rows": ...}, ...]}, runs them
+concurrently and returns {"results": [...]}, one such payload or {"error": message} per
+query, in order, so a group of rollouts costs one round-trip.
+
+Every query runs under QueryLimits (wall-clock timeout with a real interrupt, memory
+limit, thread cap, row cap), read from the QUERY_* environment variables. A query cut
+off by a limit fails with a message starting "Query limit exceeded (<limit>)".
+
+Both tools (`query` is re-implemented here with the same table output) execute on
+cursors of one read-only database instance, handed out by a pool, from worker threads,
+so the event loop never waits on DuckDB and a long aggregation does not hold up small
+queries. At most `pool_size` queries execute at once and at most `queue_size` more wait
+for a cursor; beyond that a query fails immediately with "Query limit exceeded (queue)".
+Successful results are reused across requests through an optional QueryCache (see query_cache.py),
+and latency, rows and errors are recorded in an optional ServerMetrics (see metrics.py).
+
+With `snapshot=True` the database file is copied into an in-memory instance at startup,
+so no query pays for paging the file in; the copy is writable, so in that mode only
+SELECT statements are accepted. With `lazy=True` the database is only opened (or copied)
+by the warm-up or the first query, so a server can start listening before it is loaded.
+`warm_up` runs a query set (by default a full scan of every table) and then sets `ready`,
+which the server's /readyz endpoint reports.
+"""
+import os
+import time
+import queue
+import decimal
+import datetime
+import functools
+import secrets
+import threading
+import contextlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import anyio
+import duckdb
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from tabulate import tabulate
+
+from db_router import DatabaseRouter
+from metrics import ServerMetrics
+from query_cache import QueryCache, sql_fingerprint
+
+
+@dataclass(frozen=True)
+class QueryLimits:
+    timeout_s: float = 10.0
+    memory_limit: str = "1GB"
+    threads: int = 2
+    max_rows: int = 1024
+    pool_size: int = 4
+    queue_size: int = 64
+    max_batch: int = 256
+    max_cursors: int = 16
+    cursor_ttl_s: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "QueryLimits":
+        return cls(
+            timeout_s=float(os.environ.get("QUERY_TIMEOUT_S", cls.timeout_s)),
+            memory_limit=os.environ.get("QUERY_MEMORY_LIMIT", cls.memory_limit),
+            threads=int(os.environ.get("QUERY_THREADS", cls.threads)),
+            max_rows=int(os.environ.get("QUERY_MAX_ROWS", cls.max_rows)),
+            pool_size=int(os.environ.get("QUERY_POOL_SIZE", cls.pool_size)),
+            queue_size=int(os.environ.get("QUERY_QUEUE_SIZE", cls.queue_size)),
+            max_batch=int(os.environ.get("QUERY_MAX_BATCH", cls.max_batch)),
+            max_cursors=int(os.environ.get("QUERY_MAX_CURSORS", cls.max_cursors)),
+            cursor_ttl_s=float(os.environ.get("QUERY_CURSOR_TTL_S", cls.cursor_ttl_s)),
+        )
+
+    def duckdb_config(self) -> Dict[str, Any]:
+        # Locked once applied, so the SQL being governed cannot SET its way out of the limits
+        return {"memory_limit": self.memory_limit, "threads": self.threads, "lock_configuration": True}
+
+
+class QueryLimitExceeded(Exception):
+    def __init__(self, limit: str, message: str):
+        super().__init__(f"Query limit exceeded ({limit}): {message}")
+        self.limit = limit
+
+
+# Same definition as mcp_server_motherduck's tool, so existing clients see no difference
+QUERY_TOOL = types.Tool(
+    name="query",
+    description="Use this to execute a query on the MotherDuck or DuckDB database",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "SQL query to execute that is a dialect of DuckDB SQL"},
+        },
+        "required": ["query"],
+    },
+)
+
+QUERY_ROWS_TOOL = types.Tool(
+    name="query_rows",
+    description="Execute a DuckDB SQL query and return typed, columnar JSON results",
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "SQL query to execute that is a dialect of DuckDB SQL"},
+            "max_rows": {"type": "integer", "minimum": 0, "description": "Maximum number of rows to return"},
+            "database": {"type": "string", "description": "Key of the database to query; omit for the default"},
+        },
+        "required": ["query"],
+    },
+)
+
+QUERY_PAGE_TOOL = types.Tool(
+    name="query_page",
+    description=(
+        "Page through the result of a DuckDB SQL query: returns up to page_size rows as typed, columnar "
+        "JSON and a cursor; call again with the same query and that cursor for the next page"
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "SQL query to execute that is a dialect of DuckDB SQL"},
+            "cursor": {"type": "string", "description": "Cursor returned by the previous page; omit for the first page"},
+            "page_size": {"type": "integer", "minimum": 1, "description": "Maximum number of rows in this page"},
+            "close": {"type": "boolean", "description": "Release the cursor instead of fetching"},
+            "database": {"type": "string", "description": "Key of the database to query; omit for the default"},
+        },
+        "required": ["query"],
+    },
+)
+
+QUERY_BATCH_TOOL = types.Tool(
+    name="query_batch",
+    description=(
+        "Execute several DuckDB SQL queries concurrently and return, in order, each one's "
+        "typed, columnar JSON result or its error"
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "queries": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string", "description": "SQL query that is a dialect of DuckDB SQL"},
+                        "max_rows": {"type": "integer", "minimum": 0, "description": "Maximum rows for this query"},
+                    },
+                    "required": ["query"],
+                },
+            },
+            "database": {"type": "string", "description": "Key of the database all queries run on; omit for the default"},
+        },
+        "required": ["queries"],
+    },
+)
+
+# DuckDB types whose Python values are already JSON-native
+_PASSTHROUGH = {
+    "BOOLEAN", "TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT",
+    "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT", "UHUGEINT",
+    "FLOAT", "DOUBLE", "VARCHAR",
+}
+
+
+def encode_value(v: Any) -> Any:
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, decimal.Decimal):
+        return float(v)
+    if isinstance(v, (datetime.date, datetime.time)):
+        return v.isoformat()
+    if isinstance(v, (list, tuple)):
+        return [encode_value(x) for x in v]
+    if isinstance(v, dict):
+        return {str(k): encode_value(x) for k, x in v.items()}
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return bytes(v).hex()
+    return str(v)
+
+
+def _column_encoder(type_name: str) -> Optional[Callable[[Any], Any]]:
+    if type_name in _PASSTHROUGH:
+        return None
+    if type_name.startswith("DECIMAL"):
+        return lambda v: None if v is None else float(v)
+    return encode_value
+
+
+def to_columnar(cols: List[str], type_names: List[str], rows: List[tuple], truncated: bool) -> Dict[str, Any]:
+    data: List[List[Any]] = [list(c) for c in zip(*rows)] if rows else [[] for _ in cols]
+    for i, t in enumerate(type_names):
+        enc = _column_encoder(t)
+        if enc is not None:
+            data[i] = [enc(v) for v in data[i]]
+    return {"columns": cols, "types": type_names, "data": data, "row_count": len(rows), "truncated": truncated}
+
+
+def render_table(
+    cols: List[str], type_names: List[str], rows: List[tuple], truncated: bool, max_chars: int = 50000
+) -> str:
+    """
+    The `query` tool's text output, as rendered by mcp_server_motherduck.
+    """
+    out = tabulate(rows, headers=[f"{c}\n{t}" for c, t in zip(cols, type_names)], tablefmt="pretty")
+    char_truncated = len(out) > max_chars
+    if char_truncated:
+        out = out[:max_chars]
+    if truncated:
+        out += f"\n\n⚠️  Showing first {len(rows)} rows."
+    elif char_truncated:
+        out += f"\n\n⚠️  Output truncated at {max_chars:,} characters."
+    return out
+
+
+class _OpenResult:
+    """
+    A streaming result parked between `query_page` calls, on its own cursor.
+    """
+
+    def __init__(self, cur: duckdb.DuckDBPyConnection, res: duckdb.DuckDBPyConnection, fingerprint: str):
+        self.id = secrets.token_hex(8)
+        self.fingerprint = fingerprint  # sql_fingerprint of the query the result belongs to
+        self.cur = cur
+        self.res = res
+        self.columns = [d[0] for d in res.description] if res.description else []
+        self.types = [str(d[1]) for d in res.description] if res.description else []
+        self.offset = 0
+        self.lookahead: List[tuple] = []
+        self.last_used = time.monotonic()
+
+    def fetch(self, n: int) -> Tuple[List[tuple], bool]:
+        """
+        Next `n` rows, and whether more remain (one row is read ahead to know).
+        """
+        if not self.columns:
+            return [], False
+        rows, self.lookahead = self.lookahead[:n], self.lookahead[n:]
+        if len(rows) < n:
+            rows += self.res.fetchmany(n - len(rows))
+        if not self.lookahead:
+            nxt = self.res.fetchone()
+            self.lookahead = [] if nxt is None else [nxt]
+        self.offset += len(rows)
+        return rows, bool(self.lookahead)
+
+    def skip(self, n: int, chunk: int) -> None:
+        while n > 0:
+            got = len(self.res.fetchmany(min(n, chunk)))
+            if got == 0:
+                break
+            n -= got
+            self.offset += got
+
+    def close(self) -> None:
+        self.cur.close()
+
+
+class QueryEngine:
+    """
+    Read-only DuckDB database that executes each query on a pooled cursor, under `limits`.
+
+    `run` / `run_table` block the calling thread; `run_async` / `run_table_async` execute
+    them on a worker thread, bounded by `limits.pool_size` and `limits.queue_size`.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        limits: Optional[QueryLimits] = None,
+        cache: Optional[QueryCache] = None,
+        snapshot: bool = False,
+        metrics: Optional[ServerMetrics] = None,
+        lazy: bool = False,
+    ):
+        self.db_path = db_path
+        self.limits = limits or QueryLimits.from_env()
+        self.cache = cache
+        self.snapshot = snapshot
+        self.metrics = metrics
+        self.snapshot_load_s = 0.0
+        self.ready = threading.Event()
+        self.warmup_stats: Dict[str, Any] = {}
+        self._con: Optional[duckdb.DuckDBPyConnection] = None
+        self._open: "OrderedDict[str, _OpenResult]" = OrderedDict()
+        self._idle: "queue.LifoQueue[duckdb.DuckDBPyConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+        self._pending = 0
+        if not lazy:
+            self.open()
+
+    @property
+    def opened(self) -> bool:
+        return self._con is not None
+
+    def open(self) -> duckdb.DuckDBPyConnection:
+        """
+        The database handle, opened (or snapshotted) on first call. With `lazy=True` that is
+        the warm-up or the first query, whichever comes first; other callers wait for it.
+        """
+        con = self._con
+        if con is None:
+            with self._lock:
+                if self._con is None:
+                    if self.snapshot:
+                        self._con = self._load_snapshot(self.db_path)
+                    else:
+                        self._con = duckdb.connect(self.db_path, read_only=True, config=self.limits.duckdb_config())
+                con = self._con
+        return con
+
+    def _load_snapshot(self, db_path: str) -> duckdb.DuckDBPyConnection:
+        t0 = time.perf_counter()
+        con = duckdb.connect(":memory:", config=self.limits.duckdb_config())
+        path = db_path.replace("'", "''")
+        con.execute(f"ATTACH '{path}' AS snapshot_src (READ_ONLY)")
+        con.execute("COPY FROM DATABASE snapshot_src TO memory")
+        con.execute("DETACH snapshot_src")
+        self.snapshot_load_s = time.perf_counter() - t0
+        return con
+
+    @contextlib.contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        try:
+            cur = self._idle.get_nowait()
+        except queue.Empty:
+            con = self.open()
+            with self._lock:
+                cur = con.cursor()
+        try:
+            yield cur
+        finally:
+            if self._idle.qsize() < self.limits.pool_size:
+                self._idle.put(cur)
+            else:
+                cur.close()
+
+    def _execute(self, sql: str, max_rows: Optional[int]) -> Tuple[List[str], List[str], List[tuple], bool, float]:
+        if self.metrics is None:
+            return self._execute_cached(sql, max_rows)
+        t0 = time.perf_counter()
+        try:
+            out = self._execute_cached(sql, max_rows)
+        except Exception as e:
+            self.metrics.query_error(e)
+            raise
+        self.metrics.observe_query(sql, time.perf_counter() - t0, len(out[2]))
+        return out
+
+    def _execute_cached(
+        self, sql: str, max_rows: Optional[int]
+    ) -> Tuple[List[str], List[str], List[tuple], bool, float]:
+        max_rows = self.limits.max_rows if max_rows is None else min(max_rows, self.limits.max_rows)
+        if self.cache is None:
+            return self._execute_uncached(sql, max_rows)
+        t0 = time.perf_counter()
+        key = sql_fingerprint(sql)
+        hit = self.cache.get(key, max_rows)
+        if hit is not None:
+            return (*hit, time.perf_counter() - t0)
+        cols, type_names, rows, truncated, elapsed = self._execute_uncached(sql, max_rows)
+        if cols:
+            self.cache.put(key, cols, type_names, rows, truncated)
+        return cols, type_names, rows, truncated, elapsed
+
+    @contextlib.contextmanager
+    def _governed(self, cur: duckdb.DuckDBPyConnection) -> Iterator[None]:
+        # Interrupt `cur` after timeout_s and report limit failures as QueryLimitExceeded
+        timer = None
+        if self.limits.timeout_s > 0:
+            timer = threading.Timer(self.limits.timeout_s, cur.interrupt)
+            timer.start()
+        try:
+            yield
+        except duckdb.InterruptException:
+            raise QueryLimitExceeded("timeout", f"interrupted after {self.limits.timeout_s:g}s")
+        except duckdb.OutOfMemoryException as e:
+            raise QueryLimitExceeded("memory", str(e))
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def _execute_uncached(self, sql: str, max_rows: int) -> Tuple[List[str], List[str], List[tuple], bool, float]:
+        with self.cursor() as cur, self._governed(cur):
+            t0 = time.perf_counter()
+            if self.snapshot:
+                self._check_read_only(cur, sql)
+            res = cur.execute(sql)
+            if res.description is None:
+                return [], [], [], False, time.perf_counter() - t0
+            cols = [d[0] for d in res.description]
+            type_names = [str(d[1]) for d in res.description]
+            rows = res.fetchmany(max_rows)
+            truncated = res.fetchone() is not None
+            return cols, type_names, rows, truncated, time.perf_counter() - t0
+
+    @staticmethod
+    def _check_read_only(cur: duckdb.DuckDBPyConnection, sql: str) -> None:
+        for stmt in cur.extract_statements(sql):
+            # Statements the parser adds itself (PIVOT creates an enum type first) have no text
+            if stmt.type != duckdb.StatementType.SELECT and stmt.query.strip():
+                raise duckdb.InvalidInputException(
+                    f'Cannot execute statement of type "{stmt.type.name}": the in-memory snapshot is read-only'
+                )
+
+    def run(self, sql: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+        cols, type_names, rows, truncated, elapsed = self._execute(sql, max_rows)
+        payload = to_columnar(cols, type_names, rows, truncated)
+        payload["elapsed_ms"] = round(elapsed * 1000, 3)
+        return payload
+
+    def run_table(self, sql: str) -> str:
+        cols, type_names, rows, truncated, _ = self._execute(sql, None)
+        return render_table(cols, type_names, rows, truncated)
+
+    def _park(self, state: _OpenResult) -> None:
+        with self._lock:
+            state.last_used = time.monotonic()
+            self._open[state.id] = state
+            while len(self._open) > self.limits.max_cursors:
+                self._open.popitem(last=False)[1].close()
+
+    def _take(self, result_id: str) -> Optional[_OpenResult]:
+        # Also closes results idle for longer than cursor_ttl_s
+        with self._lock:
+            expired = time.monotonic() - self.limits.cursor_ttl_s
+            while self._open:
+                oldest = next(iter(self._open.values()))
+                if oldest.last_used > expired:
+                    break
+                self._open.popitem(last=False)[1].close()
+            return self._open.pop(result_id, None)
+
+    def _open_result(self, sql: str, fingerprint: str, skip: int) -> _OpenResult:
+        con = self.open()
+        with self._lock:
+            cur = con.cursor()
+        try:
+            with self._governed(cur):
+                if self.snapshot:
+                    self._check_read_only(cur, sql)
+                state = _OpenResult(cur, cur.execute(sql), fingerprint)
+                state.skip(skip, max(self.limits.max_rows, 1))
+        except BaseException:
+            cur.close()
+            raise
+        return state
+
+    def page(
+        self, sql: str, cursor: Optional[str] = None, page_size: Optional[int] = None, close: bool = False
+    ) -> Dict[str, Any]:
+        """
+        One `query_page` call: the page after `cursor` (or the first page) of `sql`'s result.
+        """
+        if self.metrics is None or close:
+            return self._page(sql, cursor, page_size, close)
+        t0 = time.perf_counter()
+        try:
+            payload = self._page(sql, cursor, page_size, close)
+        except Exception as e:
+            self.metrics.query_error(e)
+            raise
+        self.metrics.observe_query(sql, time.perf_counter() - t0, payload["row_count"])
+        return payload
+
+    def _page(self, sql: str, cursor: Optional[str], page_size: Optional[int], close: bool) -> Dict[str, Any]:
+        page_size = self.limits.max_rows if page_size is None else max(1, min(page_size, self.limits.max_rows))
+        fingerprint = sql_fingerprint(sql)
+        result_id, offset = None, 0
+        if cursor:
+            try:
+                _, result_id, off, query = cursor.split("-")
+                offset = int(off)
+            except ValueError:
+                raise ValueError(f"malformed cursor: {cursor!r}")
+            # A cursor only continues the query it was issued for (also when resumed elsewhere)
+            if query != fingerprint[:16]:
+                raise ValueError("cursor was issued for a different query")
+        state = self._take(result_id) if result_id else None
+        if state is not None and state.fingerprint != fingerprint:
+            self._park(state)
+            raise ValueError("cursor was issued for a different query")
+        if state is not None and state.offset != offset:
+            # a page was asked for again (e.g. a retried request): re-run from that offset
+            state.close()
+            state = None
+        if close:
+            if state is not None:
+                state.close()
+            payload = to_columnar([], [], [], False)
+            payload.update(offset=offset, cursor=None)
+            return payload
+        t0 = time.perf_counter()
+        # A first page that holds the whole result can come from (and go to) the result cache
+        key = fingerprint if self.cache is not None and state is None and offset == 0 else None
+        if key is not None:
+            hit = self.cache.get(key, page_size)
+            if hit is not None and not hit[3]:
+                payload = to_columnar(*hit)
+                payload.update(offset=0, cursor=None, elapsed_ms=round((time.perf_counter() - t0) * 1000, 3))
+                return payload
+        if state is None:
+            state = self._open_result(sql, fingerprint, offset)
+        start = state.offset
+        try:
+            with self._governed(state.cur):
+                rows, more = state.fetch(page_size)
+        except BaseException:
+            state.close()
+            raise
+        if more:
+            self._park(state)
+        else:
+            state.close()
+            if key is not None and state.columns:
+                self.cache.put(key, state.columns, state.types, rows, False)
+        payload = to_columnar(state.columns, state.types, rows, more)
+        payload.update(
+            offset=start,
+            cursor=f"{os.getpid()}-{state.id}-{state.offset}-{fingerprint[:16]}" if more else None,
+            elapsed_ms=round((time.perf_counter() - t0) * 1000, 3),
+        )
+        return payload
+
+    @contextlib.contextmanager
+    def _admit(self) -> Iterator[anyio.CapacityLimiter]:
+        # _pending is only touched from the event loop thread, so it needs no lock
+        if self._pending >= self.limits.pool_size + self.limits.queue_size:
+            exc = QueryLimitExceeded("queue", f"{self._pending} queries already running or waiting")
+            if self.metrics is not None:
+                self.metrics.query_error(exc)
+            raise exc
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.limits.pool_size)
+        self._pending += 1
+        try:
+            yield self._limiter
+        finally:
+            self._pending -= 1
+
+    async def _offload(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._admit() as limiter:
+            return await anyio.to_thread.run_sync(functools.partial(fn, *args), limiter=limiter)
+
+    async def run_async(self, sql: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+        return await self._offload(self.run, sql, max_rows)
+
+    async def run_table_async(self, sql: str) -> str:
+        return await self._offload(self.run_table, sql)
+
+    async def page_async(
+        self, sql: str, cursor: Optional[str] = None, page_size: Optional[int] = None, close: bool = False
+    ) -> Dict[str, Any]:
+        return await self._offload(self.page, sql, cursor, page_size, close)
+
+    async def run_batch_async(self, items: List[Tuple[str, Optional[int]]]) -> List[Dict[str, Any]]:
+        """
+        Run (sql, max_rows) items concurrently and return, in order, each payload or {"error": message}.
+
+        The batch takes one admission slot; its items share the cursor pool with every other
+        request, and identical items execute once.
+        """
+        if len(items) > self.limits.max_batch:
+            exc = QueryLimitExceeded("batch", f"{len(items)} queries exceeds the limit of {self.limits.max_batch}")
+            if self.metrics is not None:
+                self.metrics.query_error(exc)
+            raise exc
+        unique: Dict[Tuple[str, Optional[int]], List[int]] = {}
+        for i, item in enumerate(items):
+            unique.setdefault(item, []).append(i)
+        results: List[Dict[str, Any]] = [{} for _ in items]
+
+        async def run_one(item: Tuple[str, Optional[int]], positions: List[int], limiter: Any) -> None:
+            try:
+                payload = await anyio.to_thread.run_sync(functools.partial(self.run, *item), limiter=limiter)
+            except Exception as e:
+                payload = {"error": str(e)}
+            for i in positions:
+                results[i] = payload
+
+        with self._admit() as limiter:
+            async with anyio.create_task_group() as tg:
+                for item, positions in unique.items():
+                    tg.start_soon(run_one, item, positions, limiter)
+        return results
+
+    def default_warmup_queries(self) -> List[str]:
+        """
+        One query per base table that reads every column, so all of the data is paged in once.
+        """
+        with self.cursor() as cur:
+            columns = cur.execute(
+                "SELECT schema_name, table_name, list(column_name ORDER BY column_index) "
+                "FROM duckdb_columns() WHERE database_name = current_database() AND NOT internal "
+                "AND table_name IN (SELECT table_name FROM duckdb_tables() WHERE database_name = current_database()) "
+                "GROUP BY ALL ORDER BY ALL"
+            ).fetchall()
+
+        def quote(name: str) -> str:
+            return '"' + name.replace('"', '""') + '"'
+
+        return [
+            f"SELECT COUNT(*), {', '.join(f'BIT_XOR(hash({quote(c)}))' for c in cols)} FROM {quote(schema)}.{quote(table)}"
+            for schema, table, cols in columns
+        ]
+
+    def warm_up(self, queries: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run `queries` (default: `default_warmup_queries()`) uncached, then mark the engine ready.
+
+        A failing warm-up query is counted, not raised: the engine can still serve.
+        """
+        t0 = time.perf_counter()
+        if queries is None:
+            queries = self.default_warmup_queries()
+        failed: List[str] = []
+        for sql in queries:
+            try:
+                self._execute_uncached(sql, 1)
+            except Exception as e:
+                failed.append(f"{sql[:80]}: {e}")
+        self.warmup_stats = {"queries": len(queries), "failed": failed, "seconds": round(time.perf_counter() - t0, 3)}
+        self.ready.set()
+        return self.warmup_stats
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Point-in-time load: queries executing, queries waiting for a cursor, open `query_page` results.
+        """
+        running = int(self._limiter.borrowed_tokens) if self._limiter is not None else 0
+        return {
+            "queries_running": running,
+            "queries_waiting": max(0, self._pending - running),
+            "open_cursors": len(self._open),
+        }
+
+    def memory_usage(self) -> int:
+        """
+        Bytes DuckDB currently holds for this engine (buffer pool, snapshot tables, open results).
+        """
+        if not self.opened:
+            return 0
+        with self.cursor() as cur:
+            return int(cur.execute("SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()").fetchone()[0])
+
+    def ping(self) -> None:
+        """
+        Raise if this engine's database handle can no longer run queries.
+        """
+        with self.cursor() as cur:
+            cur.execute("SELECT 1").fetchone()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            while self._open:
+                self._open.popitem()[1].close()
+            con, self._con = self._con, None
+        if con is not None:
+            con.close()
+
+
+async def _call_tool(engine: QueryEngine, name: str, arguments: dict) -> Any:
+    if name == QUERY_TOOL.name:
+        try:
+            text = await engine.run_table_async(arguments["query"])
+        except QueryLimitExceeded:
+            raise
+        except Exception as e:
+            raise ValueError(f"❌ Error executing query: {e}")
+        return [types.TextContent(type="text", text=text)]
+    if name == QUERY_BATCH_TOOL.name:
+        items = [
+            (q["query"], None if q.get("max_rows") is None else int(q["max_rows"])) for q in arguments["queries"]
+        ]
+        results = await engine.run_batch_async(items)
+        failed = sum(1 for r in results if "error" in r)
+        summary = f"{len(results)} queries: {len(results) - failed} ok, {failed} failed"
+        return [types.TextContent(type="text", text=summary)], {"results": results}
+    if name == QUERY_PAGE_TOOL.name:
+        page_size = arguments.get("page_size")
+        payload = await engine.page_async(
+            arguments["query"],
+            arguments.get("cursor"),
+            None if page_size is None else int(page_size),
+            bool(arguments.get("close", False)),
+        )
+        more = "more rows follow" if payload["cursor"] else "last page"
+        summary = f"rows {payload['offset']}-{payload['offset'] + payload['row_count']} ({more})"
+        return [types.TextContent(type="text", text=summary)], payload
+    max_rows = arguments.get("max_rows")
+    payload = await engine.run_async(arguments["query"], None if max_rows is None else int(max_rows))
+    summary = f"{payload['row_count']} rows x {len(payload['columns'])} columns"
+    return [types.TextContent(type="text", text=summary)], payload
+
+
+def register_tools(server: Server, engines: Union[QueryEngine, DatabaseRouter]) -> None:
+    """
+    Add `query_rows`, `query_page` and `query_batch` to `server` and take over its `query` tool, leaving its other tools in place.
+
+    With a DatabaseRouter, each call runs on the database named by its "database" argument.
+    """
+    router = engines if isinstance(engines, DatabaseRouter) else DatabaseRouter.single(engines)
+    metrics = router.default.metrics
+    tools = Server("sql-rft-tools")
+
+    @tools.list_tools()
+    async def list_tools() -> list[types.Tool]:
+        return [QUERY_TOOL, QUERY_ROWS_TOOL, QUERY_PAGE_TOOL, QUERY_BATCH_TOOL]
+
+    @tools.call_tool()
+    async def call_tool(name: str, arguments: dict) -> Any:
+        async with router.lease(arguments.get("database")) as engine:
+            return await _call_tool(engine, name, arguments)
+
+    # `tools` keeps its own handlers (and argument validation); route by tool name
+    base_list = server.request_handlers[types.ListToolsRequest]
+    base_call = server.request_handlers[types.CallToolRequest]
+    own_call = tools.request_handlers[types.CallToolRequest]
+
+    own_tools = [QUERY_TOOL, QUERY_ROWS_TOOL, QUERY_PAGE_TOOL, QUERY_BATCH_TOOL]
+    own_names = {t.name for t in own_tools}
+
+    async def handle_list_tools(req: Any) -> types.ServerResult:
+        base = [t for t in (await base_list(req)).root.tools if t.name not in own_names]
+        return types.ServerResult(types.ListToolsResult(tools=[*base, *own_tools]))
+
+    async def handle_call_tool(req: types.CallToolRequest) -> types.ServerResult:
+        handler = own_call if req.params.name in own_names else base_call
+        if metrics is None:
+            return await handler(req)
+        t0 = time.perf_counter()
+        result = await handler(req)
+        # Only this server's tools get their own label: the name is client input
+        tool = req.params.name if req.params.name in own_names else "other"
+        metrics.observe_tool(tool, time.perf_counter() - t0, not getattr(result.root, "isError", False))
+        return result
+
+    server.request_handlers[types.ListToolsRequest] = handle_list_tools
+    server.request_handlers[types.CallToolRequest] = handle_call_tool
@@ -1,32 +1,261 @@
+"""
+MCP server entry point: `python run_mcp_server.py` starts uvicorn with WORKERS worker
+processes, each of which builds its own app with `create_app`.
+
+Startup is kept short because a cold start delays the first query of an RFT job. Only the
+standard library is imported at module level, so the uvicorn master process that spawns the
+workers never loads mcp, DuckDB or Starlette (about a second of imports). Each worker imports
+them in `create_app`. With LAZY_START=1 (the default), the worker also opens its database in
+the background warm-up thread, or on the first query, instead of before it starts listening,
+and the mcp_server_motherduck server that provides the prompt and resource handlers is only
+built the first time one of them is called. `scripts/bench_startup.py` measures the import
+time and the time to the first query.
+"""
 import os
+import math
+import threading
 import contextlib
-import uvicorn
-from starlette.applications import Starlette
-from starlette.routing import Mount
-from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
-from mcp_server_motherduck import build_application
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from starlette.applications import Starlette
+    from query_engine import QueryEngine
 
 
 DB = os.environ.get("DB_PATH", "data/synthetic_openflights.db")
 PORT = int(os.environ.get("PORT", "8080"))
+# WORKERS=auto (or 0) uses one worker process per core
+WORKERS = os.environ.get("WORKERS", "1")
+GRACEFUL_SHUTDOWN_S = float(os.environ.get("GRACEFUL_SHUTDOWN_S", "20"))
+# DB_SNAPSHOT=1 copies the database into memory at startup
+SNAPSHOT = os.environ.get("DB_SNAPSHOT", "0") == "1"
+# WARMUP=0 skips the warm-up; WARMUP_SQL names a file of ;-separated queries to run instead of the default set
+WARMUP = os.environ.get("WARMUP", "1") != "0"
+WARMUP_SQL = os.environ.get("WARMUP_SQL")
+# METRICS=0 turns off /metrics and the per-query bookkeeping behind it
+METRICS = os.environ.get("METRICS", "1") != "0"
+SLOW_QUERIES = int(os.environ.get("METRICS_SLOW_QUERIES", "20"))
+# LAZY_START=0 opens the database and builds the motherduck server before listening
+LAZY_START = os.environ.get("LAZY_START", "1") != "0"
+
+
+def worker_count(value: str = WORKERS) -> int:
+    if value.strip().lower() in ("auto", "0", ""):
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def warmup_queries(engine: "QueryEngine", path: Optional[str] = WARMUP_SQL) -> Optional[List[str]]:
+    if not path:
+        return None
+    with open(path) as f:
+        text = f.read()
+    with engine.cursor() as cur:
+        return [stmt.query for stmt in cur.extract_statements(text)]
+
+
+def lazy_base_server(build: Callable[[], Any]) -> Any:
+    """
+    An MCP server that answers the request types of the server returned by `build` (tools,
+    prompts, resources) by delegating to it, and only calls `build` when the first one arrives.
+    """
+    import anyio
+    import mcp.types as types
+    from mcp.server.lowlevel import Server
+
+    server = Server("mcp-server-motherduck")
+    built: List[Any] = []
+    lock = threading.Lock()
+
+    def base() -> Any:
+        with lock:
+            if not built:
+                built.append(build())
+        return built[0]
+
+    def delegate(request_type: type) -> Callable[[Any], Any]:
+        async def handler(req: Any) -> Any:
+            target = built[0] if built else await anyio.to_thread.run_sync(base)
+            return await target.request_handlers[request_type](req)
+
+        return handler
+
+    for request_type in (
+        types.ListToolsRequest,
+        types.CallToolRequest,
+        types.ListPromptsRequest,
+        types.GetPromptRequest,
+        types.ListResourcesRequest,
+        types.ReadResourceRequest,
+    ):
+        server.request_handlers[request_type] = delegate(request_type)
+    return server
 
-server, _ = build_application(db_path=DB, read_only=True)
-sess = StreamableHTTPSessionManager(app=server, event_store=None, stateless=True)
 
+def create_app() -> "Starlette":
+    """
+    Build one worker's application. Every worker process calls this itself, so each has its
+    own read-only DuckDB handles and MCP session manager; nothing is shared across processes.
+    """
+    import anyio
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, PlainTextResponse
+    from starlette.routing import Mount, Route
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from admission import AdmissionControl
+    from db_router import DatabaseRouter
+    from metrics import ServerMetrics
+    from query_cache import QueryCache
+    from query_engine import QueryEngine, QueryLimits, register_tools
 
-async def handler(scope, receive, send):
-    await sess.handle_request(scope, receive, send)
+    limits = QueryLimits.from_env()
 
+    def build_base(db_path: str = DB) -> Any:
+        from mcp_server_motherduck import build_application
 
-@contextlib.asynccontextmanager
-async def lifespan(app):
-    async with sess.run():
-        yield
+        server, _ = build_application(
+            db_path=db_path,
+            read_only=db_path != ":memory:",
+            max_rows=limits.max_rows,
+            query_timeout=math.ceil(limits.timeout_s) or -1,
+        )
+        return server
 
+    # Built late, the motherduck server cannot open DB_PATH next to our differently configured
+    # handle; it only serves prompts and resources (its `query` tool is replaced), so it gets
+    # an empty in-memory database instead
+    server = lazy_base_server(lambda: build_base(":memory:")) if LAZY_START else build_base()
+    metrics = ServerMetrics(top_n=SLOW_QUERIES) if METRICS else None
 
-app = Starlette(routes=[Mount("/mcp", app=handler)], lifespan=lifespan)
+    def open_engine(path: str) -> QueryEngine:
+        return QueryEngine(path, limits, QueryCache.from_env(path), snapshot=SNAPSHOT, metrics=metrics, lazy=LAZY_START)
+
+    # DB_PATH is the default database, opened by the warm-up (or now, with LAZY_START=0); others
+    # (DATABASES / DB_DIR) open on first use
+    router = DatabaseRouter.from_env(DB, open_engine)
+    engine = router.default
+    register_tools(server, router)
+    sess = StreamableHTTPSessionManager(app=server, event_store=None, stateless=True)
+
+    async def handler(scope, receive, send):
+        await sess.handle_request(scope, receive, send)
+
+    # Bounded, per-client fair admission; overload is answered with 429 + Retry-After
+    mcp_app = AdmissionControl.from_env(handler, limits.pool_size)
+    admission = mcp_app if isinstance(mcp_app, AdmissionControl) else None
+
+    async def healthz(request):
+        # Answered by whichever worker accepted the connection, using that worker's own DB handle
+        # (once it is open: liveness must not wait for a lazy open or snapshot copy)
+        if not engine.opened:
+            return JSONResponse({"status": "ok", "pid": os.getpid(), "database": "opening"})
+        try:
+            engine.ping()
+        except Exception as e:
+            return JSONResponse({"status": "error", "pid": os.getpid(), "error": str(e)}, status_code=503)
+        return JSONResponse({"status": "ok", "pid": os.getpid()})
+
+    async def readyz(request):
+        # Ready once this worker has finished its warm-up and its DB handle answers
+        if not engine.ready.is_set():
+            return JSONResponse({"status": "warming", "pid": os.getpid()}, status_code=503)
+        try:
+            await anyio.to_thread.run_sync(engine.ping)  # opens the database if WARMUP=0 left it closed
+        except Exception as e:
+            return JSONResponse({"status": "error", "pid": os.getpid(), "error": str(e)}, status_code=503)
+        return JSONResponse({
+            "status": "ready",
+            "pid": os.getpid(),
+            "snapshot": engine.snapshot,
+            "snapshot_load_s": round(engine.snapshot_load_s, 3),
+            "warmup": engine.warmup_stats,
+        })
+
+    async def stats(request):
+        # Per worker: each process has its own cache
+        return JSONResponse({
+            "pid": os.getpid(),
+            "cache": engine.cache.stats() if engine.cache else None,
+            "admission": admission.stats() if admission else None,
+            "databases": router.stats(),
+        })
+
+    def scrape():
+        # (gauges, counters) summed over this worker's open databases
+        engines = router.engines().values()
+        values = {"worker_pid": os.getpid(), "databases_open": len(engines)}
+        counters = {}
+        for e in engines:
+            for k, v in e.stats().items():
+                values[k] = values.get(k, 0) + v
+            if e.cache is not None:
+                cache = e.cache.stats()
+                for k in ("entries", "bytes"):
+                    values[f"cache_{k}"] = values.get(f"cache_{k}", 0) + cache[k]
+                for k in ("hits", "misses", "evictions"):
+                    counters[f"cache_{k}"] = counters.get(f"cache_{k}", 0) + cache[k]
+        if "cache_hits" in counters:
+            lookups = counters["cache_hits"] + counters["cache_misses"]
+            values["cache_hit_ratio"] = round(counters["cache_hits"] / lookups, 4) if lookups else 0.0
+        if admission is not None:
+            values.update(requests_inflight=admission.inflight, requests_queued=admission.queued)
+        return values, counters
+
+    async def metrics_endpoint(request):
+        # Per worker, like /stats
+        if metrics is None:
+            return PlainTextResponse("metrics disabled (METRICS=0)\n", status_code=404)
+        if request.query_params.get("format") == "json":
+            return JSONResponse(metrics.snapshot(*scrape()))
+        return PlainTextResponse(metrics.render(*scrape()), media_type="text/plain; version=0.0.4")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if WARMUP:
+            # In the background, so /healthz answers (and reports liveness) while the database
+            # is opened and warmed up
+            def warm() -> None:
+                try:
+                    engine.warm_up(warmup_queries(engine))
+                except Exception as e:
+                    # e.g. the database cannot be opened: /readyz reports the error from its ping
+                    engine.warmup_stats = {"queries": 0, "failed": [str(e)], "seconds": 0.0}
+                    engine.ready.set()
+
+            warming = threading.Thread(target=warm, name="warm-up", daemon=True)
+            warming.start()
+        else:
+            warming = None
+            engine.ready.set()
+        async with sess.run():
+            yield
+        # uvicorn only gets here after in-flight requests have drained (or GRACEFUL_SHUTDOWN_S passed);
+        # the warm-up may still be using the database (its queries are bounded by QUERY_TIMEOUT_S)
+        if warming is not None:
+            await anyio.to_thread.run_sync(warming.join)
+        router.close()
+
+    routes = [
+        Route("/healthz", healthz),
+        Route("/readyz", readyz),
+        Route("/stats", stats),
+        Route("/metrics", metrics_endpoint),
+        Mount("/mcp", app=metrics.wrap(mcp_app) if metrics else mcp_app),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
 
 
 if __name__ == "__main__":
-    print(f"MCP endpoint → http://0.0.0.0:{PORT}/mcp")
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    import uvicorn
+
+    workers = worker_count()
+    print(f"MCP endpoint → http://0.0.0.0:{PORT}/mcp ({workers} worker{'s' if workers > 1 else ''})")
+    uvicorn.run(
+        "run_mcp_server:create_app",
+        factory=True,
+        host="0.0.0.0",
+        port=PORT,
+        workers=workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_S,
+    )
@@ -1,63 +1,189 @@
+"""
+Simulate the "production" database: download the OpenFlights data files and load them into
+data/prod_openflights.db.
+
+The five files are fetched concurrently. Their SHA-256 and HTTP ETag are kept in
+data/openflights_manifest.json, so a rerun only sends conditional requests and skips every file
+the server reports unchanged. OPENFLIGHTS_MIRROR names a local directory holding the same files
+to copy from instead, and OPENFLIGHTS_OFFLINE=1 uses the files already in data/ (or the mirror)
+without touching the network.
+
+Each table is built by DuckDB's own parallel CSV reader with explicit column types. The table
+comment records the SHA-256 of the file it was built from (and the loader version), and a table
+whose file has not changed is left as it is. Besides OpenFlights' \\N, the strings pandas reads as
+missing by default ("NA", "N/A", "null", ...) load as NULL.
+"""
+import os
+import json
+import shutil
+import hashlib
 import pathlib
+import urllib.error
 import urllib.request
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
 import duckdb
 
 
+DATA_DIR = pathlib.Path(__file__).resolve().parents[1] / "data"
+BASE_URL = os.environ.get("OPENFLIGHTS_BASE_URL", "https://raw.githubusercontent.com/jpatokal/openflights/master/data/")
+MIRROR = os.environ.get("OPENFLIGHTS_MIRROR")
+OFFLINE = os.environ.get("OPENFLIGHTS_OFFLINE", "0") == "1"
+MANIFEST_PATH = DATA_DIR / "openflights_manifest.json"
+PROD_DB_PATH = str(DATA_DIR / "prod_openflights.db")
+FILES_TO_DOWNLOAD = {
+    "airports": "airports.dat",
+    "airlines": "airlines.dat",
+    "routes": "routes.dat",
+    "countries": "countries.dat",
+    "planes": "planes.dat",
+}
+# Column order of each headerless .dat file, with the type DuckDB loads it as
+COLUMNS = {
+    "airports": {
+        "airport_id": "INTEGER",
+        "name": "VARCHAR",
+        "city": "VARCHAR",
+        "country": "VARCHAR",
+        "iata": "VARCHAR",
+        "icao": "VARCHAR",
+        "latitude": "DOUBLE",
+        "longitude": "DOUBLE",
+        "altitude": "INTEGER",
+        "timezone": "DOUBLE",
+        "dst": "VARCHAR",
+        "tz_db": "VARCHAR",
+        "type": "VARCHAR",
+        "source": "VARCHAR",
+    },
+    "airlines": {
+        "airline_id": "INTEGER",
+        "name": "VARCHAR",
+        "alias": "VARCHAR",
+        "iata": "VARCHAR",
+        "icao": "VARCHAR",
+        "callsign": "VARCHAR",
+        "country": "VARCHAR",
+        "active": "VARCHAR",
+    },
+    "routes": {
+        "airline": "VARCHAR",
+        "airline_id": "INTEGER",
+        "source_airport": "VARCHAR",
+        "source_airport_id": "INTEGER",
+        "destination_airport": "VARCHAR",
+        "destination_airport_id": "INTEGER",
+        "codeshare": "VARCHAR",
+        "stops": "INTEGER",
+        "equipment": "VARCHAR",
+    },
+    "countries": {"name": "VARCHAR", "iso_code": "VARCHAR", "dafif_code": "VARCHAR"},
+    "planes": {"name": "VARCHAR", "iata": "VARCHAR", "icao": "VARCHAR"},
+}
+# OpenFlights' \N marker plus the strings pandas.read_csv reads as NaN by default, which the
+# tables were loaded with before
+NULL_STRINGS = [
+    "\\N", "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+# Bumped whenever load_table reads a file differently, so tables built by an older version reload
+LOADER_VERSION = 2
+
+
+def sha256_of(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fetch(filename: str, cached: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Bring data/<filename> up to date and return what happened ("downloaded", "copied",
+    "unchanged") with its new manifest entry. `cached` is the entry from the previous run.
+    """
+    path = DATA_DIR / filename
+    # A file edited or truncated since the last run no longer matches its entry: fetch it again
+    local = sha256_of(path) if path.exists() else None
+    if local is None or local != cached.get("sha256"):
+        cached = {}
+
+    if MIRROR:
+        source = pathlib.Path(MIRROR) / filename
+        digest = sha256_of(source)
+        if digest == local:
+            return "unchanged", {"sha256": digest}
+        tmp = path.with_suffix(path.suffix + ".part")
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, path)
+        return "copied", {"sha256": digest}
+
+    if OFFLINE:
+        if local is None:
+            raise FileNotFoundError(f"{path} is missing and OPENFLIGHTS_OFFLINE=1 (set OPENFLIGHTS_MIRROR to copy it)")
+        return "unchanged", {"sha256": local}
+
+    request = urllib.request.Request(f"{BASE_URL}{filename}")
+    if cached.get("etag"):
+        request.add_header("If-None-Match", cached["etag"])
+    tmp = path.with_suffix(path.suffix + ".part")
+    try:
+        with urllib.request.urlopen(request, timeout=60) as resp, open(tmp, "wb") as f:
+            shutil.copyfileobj(resp, f)
+            etag = resp.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        tmp.unlink(missing_ok=True)
+        if e.code == 304:
+            return "unchanged", cached
+        raise
+    digest = sha256_of(tmp)
+    os.replace(tmp, path)
+    entry = {"sha256": digest, **({"etag": etag} if etag else {})}
+    return ("unchanged" if digest == local else "downloaded"), entry
+
+
+def load_table(con: duckdb.DuckDBPyConnection, name: str, path: pathlib.Path, digest: str) -> bool:
+    """
+    (Re)build table `name` from `path` unless it was already built from a file with this
+    SHA-256 by this LOADER_VERSION. Returns whether it was rebuilt.
+    """
+    row = con.execute(
+        "SELECT comment FROM duckdb_tables() WHERE schema_name = 'main' AND table_name = ?", [name]
+    ).fetchone()
+    marker = f"sha256:{digest} loader:{LOADER_VERSION}"
+    if row is not None and row[0] == marker:
+        return False
+    columns = "{" + ", ".join(f"'{col}': '{typ}'" for col, typ in COLUMNS[name].items()) + "}"
+    nullstr = "[" + ", ".join("'" + v.replace("'", "''") + "'" for v in NULL_STRINGS) + "]"
+    source = str(path).replace("'", "''")
+    con.execute(
+        f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM read_csv(\'{source}\', '
+        f"header = false, delim = ',', quote = '\"', nullstr = {nullstr}, columns = {columns})"
+    )
+    con.execute(f"COMMENT ON TABLE \"{name}\" IS '{marker}'")
+    return True
+
+
 def main() -> None:
-    DATA_DIR = pathlib.Path(__file__).resolve().parents[1] / "data"
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    BASE_URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data/"
-    FILES_TO_DOWNLOAD = {
-        "airports": "airports.dat",
-        "airlines": "airlines.dat",
-        "routes": "routes.dat",
-        "countries": "countries.dat",
-        "planes": "planes.dat",
-    }
-    COLUMN_NAMES = {
-        "airports": [
-            "airport_id",
-            "name",
-            "city",
-            "country",
-            "iata",
-            "icao",
-            "latitude",
-            "longitude",
-            "altitude",
-            "timezone",
-            "dst",
-            "tz_db",
-            "type",
-            "source",
-        ],
-        "airlines": ["airline_id", "name", "alias", "iata", "icao", "callsign", "country", "active"],
-        "routes": [
-            "airline",
-            "airline_id",
-            "source_airport",
-            "source_airport_id",
-            "destination_airport",
-            "destination_airport_id",
-            "codeshare",
-            "stops",
-            "equipment",
-        ],
-        "countries": ["name", "iso_code", "dafif_code"],
-        "planes": ["name", "iata", "icao"],
-    }
-    PROD_DB_PATH = str(DATA_DIR / "prod_openflights.db")
+    manifest: Dict[str, Dict[str, str]] = json.loads(MANIFEST_PATH.read_text()) if MANIFEST_PATH.exists() else {}
+
+    with ThreadPoolExecutor(max_workers=len(FILES_TO_DOWNLOAD)) as pool:
+        futures = {
+            name: pool.submit(fetch, filename, manifest.get(filename, {}))
+            for name, filename in FILES_TO_DOWNLOAD.items()
+        }
+        for name, filename in FILES_TO_DOWNLOAD.items():
+            status, manifest[filename] = futures[name].result()
+            print(f"{status.capitalize()}: {DATA_DIR / filename}")
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True))
 
     with duckdb.connect(PROD_DB_PATH) as con:
         for name, filename in FILES_TO_DOWNLOAD.items():
-            url = f"{BASE_URL}{filename}"
-            path = DATA_DIR / filename
-            if not path.exists():
-                urllib.request.urlretrieve(url, path)
-                print(f"Downloaded: {path}")
-            df = pd.read_csv(path, header=None, names=COLUMN_NAMES[name], na_values=["\\N"])
-            con.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM df')
+            rebuilt = load_table(con, name, DATA_DIR / filename, manifest[filename]["sha256"])
+            print(f"{'Loaded' if rebuilt else 'Up to date'}: {name}")
         print(f"\n'Production' database simulated at: {PROD_DB_PATH}")
         print("Tables created:", con.sql("SHOW TABLES;").fetchall())
 
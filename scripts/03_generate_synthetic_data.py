@@ -1,3 +1,4 @@
+import io
 import os
 import random
 from datetime import datetime, timedelta
@@ -19,11 +20,15 @@ conn = psycopg2.connect(
 cur = conn.cursor()
 
 # Configuration
-NUM_USERS = 50
+NUM_USERS = int(os.environ.get("SYNTH_NUM_USERS", "50"))
 NUM_TERMS = 3
 NUM_COURSES_PER_TERM = 10
 NUM_ENROLLMENTS_PER_USER = 3
+NUM_TAS = 5
 ROOT_ACCOUNT_ID = 1
+# SYNTH_BULK=1 writes every table with COPY instead of one INSERT per row (see bulk_load)
+BULK = os.environ.get("SYNTH_BULK", "0") == "1"
+COPY_ROWS = int(os.environ.get("SYNTH_COPY_ROWS", "100000"))
 role_map = {
     "StudentEnrollment": 3,
     "TeacherEnrollment": 4,
@@ -40,216 +45,397 @@ single_access_token = secrets.token_hex(16)
 perishable_token = secrets.token_hex(16)
 reset_password_token = secrets.token_hex(16)
 
-# --- Generate Users with Login Credentials ---
-user_ids = []
-for _ in range(NUM_USERS):
-    created_at = fake.date_time_between(start_date="-2y", end_date="now")
-    workflow_state = "active"
-    name = fake.name()
-    first_name = name.split()[0] if name.split() else fake.first_name()
-    last_name = name.split()[-1] if len(name.split()) > 1 else fake.last_name()
-    email = fake.email()
-    sortable_name = f"{last_name}, {first_name}"
-    username = email.split('@')[0] + str(random.randint(100, 999))
-    
-    # Insert into users
-    cur.execute("""
-        INSERT INTO users (workflow_state, created_at, updated_at, root_account_ids, 
-                          name, short_name, sortable_name)
-        VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id
-    """, [workflow_state, created_at, created_at, [ROOT_ACCOUNT_ID], 
-          name, first_name, sortable_name])
-    user_id = cur.fetchone()[0]
-    user_ids.append(user_id)
-    unique_id_normalized = username.lower()  # Normalize to lowercase
-    
-    # Insert into pseudonyms (login credentials)
-    cur.execute("""
-    INSERT INTO pseudonyms (
-        user_id, account_id, workflow_state, unique_id, 
-        unique_id_normalized,
-        crypted_password, password_salt, 
-        persistence_token, single_access_token, perishable_token,
-        login_count, failed_login_count,
-        created_at, updated_at, sis_user_id,
-        reset_password_token
-    )
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-""", [user_id, ROOT_ACCOUNT_ID, "active", username, 
-      unique_id_normalized,
-      crypted_password, password_salt,
-      persistence_token, single_access_token, perishable_token,
-      0, 0,  # login_count, failed_login_count
-      created_at, created_at, f"SIS_{user_id}",
-      reset_password_token])
-
-# --- Generate Terms ---
-term_ids = []
-for _ in range(NUM_TERMS):
-    t = fake.date_time_between(start_date="-1y", end_date="now")
-    name = f"Fall {t.year}"
-    start_at = t
-    end_at = t + timedelta(days=120)
-    cur.execute("""
-        INSERT INTO enrollment_terms (root_account_id, created_at, name, start_at, updated_at)
-        VALUES (%s,%s,%s,%s,%s) RETURNING id
-    """, [ROOT_ACCOUNT_ID, t, name, start_at, end_at])
-    term_ids.append(cur.fetchone()[0])
-
-# --- Generate Courses ---
-course_ids = []
-for term_id in term_ids:
-    for _ in range(NUM_COURSES_PER_TERM):
-        created_at = fake.date_time_between(start_date="-1y", end_date="now")
-        name = f"{fake.word().title()} {fake.word().title()} {random.randint(100, 999)}"
-        course_code = f"{fake.random_uppercase_letter()}{fake.random_uppercase_letter()}{random.randint(100, 999)}"
-        
-        # Assign a teacher
-        teacher_id = random.choice(user_ids)
-        
+# --- Row-by-row insert (default) ---
+def insert_row_by_row():
+    # --- Generate Users with Login Credentials ---
+    user_ids = []
+    for _ in range(NUM_USERS):
+        created_at = fake.date_time_between(start_date="-2y", end_date="now")
+        workflow_state = "active"
+        name = fake.name()
+        first_name = name.split()[0] if name.split() else fake.first_name()
+        last_name = name.split()[-1] if len(name.split()) > 1 else fake.last_name()
+        email = fake.email()
+        sortable_name = f"{last_name}, {first_name}"
+        username = email.split('@')[0] + str(random.randint(100, 999))
+
+        # Insert into users
         cur.execute("""
-            INSERT INTO courses (
-                account_id, root_account_id, enrollment_term_id, created_at, updated_at,
-                name, course_code, workflow_state, is_public
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id
-        """, [ROOT_ACCOUNT_ID, ROOT_ACCOUNT_ID, term_id, created_at, created_at, 
-              name, course_code, "available", False])
-        
-        course_id = cur.fetchone()[0]
-        course_ids.append(course_id)
-
-# --- Generate Course Sections ---
-section_ids_by_course = {}
-course_default_section_ids = {}  # Track default section for each course
-
-for course_id in course_ids:
-    # Create 1-3 sections per course
-    num_sections = random.randint(1, 3)
-    section_ids = []
-    
-    for i in range(num_sections):
-        created_at = fake.date_time_between(start_date="-1y", end_date="now")
-        section_name = f"Section {fake.random_uppercase_letter()}" if i == 0 else f"Section {i+1}"
-        section_sis_id = f"SECT_{course_id}_{random.randint(100,999)}"
-        
+            INSERT INTO users (workflow_state, created_at, updated_at, root_account_ids, 
+                              name, short_name, sortable_name)
+            VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id
+        """, [workflow_state, created_at, created_at, [ROOT_ACCOUNT_ID], 
+              name, first_name, sortable_name])
+        user_id = cur.fetchone()[0]
+        user_ids.append(user_id)
+        unique_id_normalized = username.lower()  # Normalize to lowercase
+
+        # Insert into pseudonyms (login credentials)
         cur.execute("""
-            INSERT INTO course_sections (
-                course_id, name, root_account_id, 
-                created_at, updated_at, sis_source_id,
-                workflow_state, default_section, accepting_enrollments
-            )
-            VALUES (%s, %s, %s, %s,%s, %s, %s, %s, %s)
-            RETURNING id
-        """, [
-            course_id, section_name, ROOT_ACCOUNT_ID,
-            created_at, created_at, section_sis_id,
-            "active", (i == 0), True  # First section is default
-        ])
-        
-        section_id = cur.fetchone()[0]
-        section_ids.append(section_id)
-        
-        if i == 0:  # Store the default section ID
-            course_default_section_ids[course_id] = section_id
-    
-    section_ids_by_course[course_id] = section_ids
-
-# --- Generate Teacher Enrollments (AFTER sections are created) ---
-# Get teacher for each course and enroll them
-for course_id in course_ids:
-    # Get the default section for this course
-    default_section_id = course_default_section_ids.get(course_id)
-    
-    if not default_section_id:
-        # Fallback to first section if no default found
-        default_section_id = section_ids_by_course[course_id][0]
-    
-    # Find or assign a teacher for this course
-    # (We need to track which user is teacher for each course)
-    # For simplicity, we'll assign a random teacher
-    teacher_id = random.choice(user_ids)
-    
-    created_at = fake.date_time_between(start_date="-1y", end_date="now")
-    
-    # Check if this teacher is already enrolled in this course
-    cur.execute("""
-        SELECT COUNT(*) FROM enrollments 
-        WHERE user_id = %s AND course_id = %s
-    """, [teacher_id, course_id])
-    
-    if cur.fetchone()[0] == 0:
+        INSERT INTO pseudonyms (
+            user_id, account_id, workflow_state, unique_id, 
+            unique_id_normalized,
+            crypted_password, password_salt, 
+            persistence_token, single_access_token, perishable_token,
+            login_count, failed_login_count,
+            created_at, updated_at, sis_user_id,
+            reset_password_token
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [user_id, ROOT_ACCOUNT_ID, "active", username, 
+          unique_id_normalized,
+          crypted_password, password_salt,
+          persistence_token, single_access_token, perishable_token,
+          0, 0,  # login_count, failed_login_count
+          created_at, created_at, f"SIS_{user_id}",
+          reset_password_token])
+
+    # --- Generate Terms ---
+    term_ids = []
+    for _ in range(NUM_TERMS):
+        t = fake.date_time_between(start_date="-1y", end_date="now")
+        name = f"Fall {t.year}"
+        start_at = t
+        end_at = t + timedelta(days=120)
         cur.execute("""
-            INSERT INTO enrollments (
-                user_id, course_id, type, workflow_state, created_at, updated_at,
-                course_section_id, root_account_id, limit_privileges_to_course_section, role_id
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, [
-            teacher_id, course_id, "TeacherEnrollment", "active",
-            created_at, created_at, default_section_id, ROOT_ACCOUNT_ID, False, role_map["TeacherEnrollment"]
-        ])
-
-# --- Generate Student Enrollments ---
-for user_id in user_ids:
-    # Each user enrolls in 1-5 courses
-    num_enrollments = random.randint(1, min(5, len(course_ids)))
-    enrolled_courses = random.sample(course_ids, num_enrollments)
-    
-    for course_id in enrolled_courses:
-        # Skip if user is already teacher of this course
+            INSERT INTO enrollment_terms (root_account_id, created_at, name, start_at, updated_at)
+            VALUES (%s,%s,%s,%s,%s) RETURNING id
+        """, [ROOT_ACCOUNT_ID, t, name, start_at, end_at])
+        term_ids.append(cur.fetchone()[0])
+
+    # --- Generate Courses ---
+    course_ids = []
+    for term_id in term_ids:
+        for _ in range(NUM_COURSES_PER_TERM):
+            created_at = fake.date_time_between(start_date="-1y", end_date="now")
+            name = f"{fake.word().title()} {fake.word().title()} {random.randint(100, 999)}"
+            course_code = f"{fake.random_uppercase_letter()}{fake.random_uppercase_letter()}{random.randint(100, 999)}"
+
+            # Assign a teacher
+            teacher_id = random.choice(user_ids)
+
+            cur.execute("""
+                INSERT INTO courses (
+                    account_id, root_account_id, enrollment_term_id, created_at, updated_at,
+                    name, course_code, workflow_state, is_public
+                )
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s) RETURNING id
+            """, [ROOT_ACCOUNT_ID, ROOT_ACCOUNT_ID, term_id, created_at, created_at, 
+                  name, course_code, "available", False])
+
+            course_id = cur.fetchone()[0]
+            course_ids.append(course_id)
+
+    # --- Generate Course Sections ---
+    section_ids_by_course = {}
+    course_default_section_ids = {}  # Track default section for each course
+
+    for course_id in course_ids:
+        # Create 1-3 sections per course
+        num_sections = random.randint(1, 3)
+        section_ids = []
+
+        for i in range(num_sections):
+            created_at = fake.date_time_between(start_date="-1y", end_date="now")
+            section_name = f"Section {fake.random_uppercase_letter()}" if i == 0 else f"Section {i+1}"
+            section_sis_id = f"SECT_{course_id}_{random.randint(100,999)}"
+
+            cur.execute("""
+                INSERT INTO course_sections (
+                    course_id, name, root_account_id, 
+                    created_at, updated_at, sis_source_id,
+                    workflow_state, default_section, accepting_enrollments
+                )
+                VALUES (%s, %s, %s, %s,%s, %s, %s, %s, %s)
+                RETURNING id
+            """, [
+                course_id, section_name, ROOT_ACCOUNT_ID,
+                created_at, created_at, section_sis_id,
+                "active", (i == 0), True  # First section is default
+            ])
+
+            section_id = cur.fetchone()[0]
+            section_ids.append(section_id)
+
+            if i == 0:  # Store the default section ID
+                course_default_section_ids[course_id] = section_id
+
+        section_ids_by_course[course_id] = section_ids
+
+    # --- Generate Teacher Enrollments (AFTER sections are created) ---
+    # Get teacher for each course and enroll them
+    for course_id in course_ids:
+        # Get the default section for this course
+        default_section_id = course_default_section_ids.get(course_id)
+
+        if not default_section_id:
+            # Fallback to first section if no default found
+            default_section_id = section_ids_by_course[course_id][0]
+
+        # Find or assign a teacher for this course
+        # (We need to track which user is teacher for each course)
+        # For simplicity, we'll assign a random teacher
+        teacher_id = random.choice(user_ids)
+
+        created_at = fake.date_time_between(start_date="-1y", end_date="now")
+
+        # Check if this teacher is already enrolled in this course
+        cur.execute("""
+            SELECT COUNT(*) FROM enrollments 
+            WHERE user_id = %s AND course_id = %s
+        """, [teacher_id, course_id])
+
+        if cur.fetchone()[0] == 0:
+            cur.execute("""
+                INSERT INTO enrollments (
+                    user_id, course_id, type, workflow_state, created_at, updated_at,
+                    course_section_id, root_account_id, limit_privileges_to_course_section, role_id
+                )
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            """, [
+                teacher_id, course_id, "TeacherEnrollment", "active",
+                created_at, created_at, default_section_id, ROOT_ACCOUNT_ID, False, role_map["TeacherEnrollment"]
+            ])
+
+    # --- Generate Student Enrollments ---
+    for user_id in user_ids:
+        # Each user enrolls in 1-5 courses
+        num_enrollments = random.randint(1, min(5, len(course_ids)))
+        enrolled_courses = random.sample(course_ids, num_enrollments)
+
+        for course_id in enrolled_courses:
+            # Skip if user is already teacher of this course
+            cur.execute("""
+                SELECT COUNT(*) FROM enrollments 
+                WHERE user_id = %s AND course_id = %s AND type = 'TeacherEnrollment'
+            """, [user_id, course_id])
+
+            if cur.fetchone()[0] > 0:
+                continue  # Skip, user is already a teacher in this course
+
+            # Choose a section for this enrollment
+            section_ids = section_ids_by_course[course_id]
+            section_id = random.choice(section_ids)
+
+            created_at = fake.date_time_between(start_date="-1y", end_date="now")
+            enrollment_type = "StudentEnrollment"
+
+            cur.execute("""
+                INSERT INTO enrollments (
+                    user_id, course_id, type, workflow_state, created_at, updated_at,
+                    course_section_id, root_account_id, limit_privileges_to_course_section, role_id
+                )
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            """, [
+                user_id, course_id, enrollment_type, "active",
+                created_at, created_at, section_id, ROOT_ACCOUNT_ID, False, role_map[enrollment_type]
+            ])
+
+    # --- Add Some TAs ---
+    for _ in range(NUM_TAS):
+        course_id = random.choice(course_ids)
+        user_id = random.choice(user_ids)
+
+        # Check if user is already enrolled in this course
         cur.execute("""
             SELECT COUNT(*) FROM enrollments 
-            WHERE user_id = %s AND course_id = %s AND type = 'TeacherEnrollment'
+            WHERE user_id = %s AND course_id = %s AND type IN ('TeacherEnrollment', 'TaEnrollment')
         """, [user_id, course_id])
-        
-        if cur.fetchone()[0] > 0:
-            continue  # Skip, user is already a teacher in this course
-        
-        # Choose a section for this enrollment
-        section_ids = section_ids_by_course[course_id]
-        section_id = random.choice(section_ids)
-        
+
+        if cur.fetchone()[0] == 0:
+            section_ids = section_ids_by_course[course_id]
+            section_id = random.choice(section_ids)
+            created_at = fake.date_time_between(start_date="-1y", end_date="now")
+
+            cur.execute("""
+                INSERT INTO enrollments (
+                    user_id, course_id, type, workflow_state, created_at, updated_at,
+                    course_section_id, root_account_id, limit_privileges_to_course_section, role_id
+                )
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            """, [
+                user_id, course_id, "TaEnrollment", "active",
+                created_at, created_at, section_id, ROOT_ACCOUNT_ID, False, role_map["TaEnrollment"]
+            ])
+
+    return course_ids, section_ids_by_course
+
+
+# --- Bulk load (SYNTH_BULK=1) ---
+# IDs are reserved from each table's sequence in one round-trip, enrollment uniqueness is
+# tracked in memory, and every table is written with COPY, all in the one transaction that is
+# committed at the end
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, list):
+        return "{" + ",".join(str(v) for v in value) + "}"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def copy_rows(table, columns, rows):
+    """
+    Write `rows` (tuples in `columns` order) to `table` with COPY, COPY_ROWS rows per statement.
+    """
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    for i in range(0, len(rows), COPY_ROWS):
+        buf = io.StringIO()
+        for row in rows[i:i + COPY_ROWS]:
+            buf.write("\t".join(copy_value(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert(sql, buf)
+
+
+def reserve_ids(table, n):
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [table, n]
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+ENROLLMENT_COLUMNS = (
+    "user_id", "course_id", "type", "workflow_state", "created_at", "updated_at",
+    "course_section_id", "root_account_id", "limit_privileges_to_course_section", "role_id",
+)
+
+
+def bulk_load():
+    # --- Users and pseudonyms, COPY_ROWS users at a time ---
+    user_ids = reserve_ids("users", NUM_USERS)
+    usernames = set()
+    # fake.name() and fake.email() take ~0.4 ms per user; names drawn from pools of Faker's
+    # output are ~100x cheaper, which is most of the time at millions of users
+    first_names = [fake.first_name() for _ in range(1000)]
+    last_names = [fake.last_name() for _ in range(1000)]
+    for i in range(0, len(user_ids), COPY_ROWS):
+        users, pseudonyms = [], []
+        for user_id in user_ids[i:i + COPY_ROWS]:
+            created_at = fake.date_time_between(start_date="-2y", end_date="now")
+            first_name = random.choice(first_names)
+            last_name = random.choice(last_names)
+            name = f"{first_name} {last_name}"
+            local_part = f"{first_name}.{last_name}".lower().replace(" ", "")
+            username = local_part + str(random.randint(100, 999))
+            # The user ID alone can still match a drawn suffix (user 456 vs. a random 456)
+            attempt = 0
+            while username.lower() in usernames:
+                attempt += 1
+                username = f"{local_part}{user_id}" + (f"_{attempt}" if attempt > 1 else "")
+            usernames.add(username.lower())
+            users.append((
+                user_id, "active", created_at, created_at, [ROOT_ACCOUNT_ID],
+                name, first_name, f"{last_name}, {first_name}",
+            ))
+            pseudonyms.append((
+                user_id, ROOT_ACCOUNT_ID, "active", username, username.lower(),
+                crypted_password, password_salt,
+                persistence_token, single_access_token, perishable_token,
+                0, 0, created_at, created_at, f"SIS_{user_id}", reset_password_token,
+            ))
+        copy_rows("users", (
+            "id", "workflow_state", "created_at", "updated_at", "root_account_ids",
+            "name", "short_name", "sortable_name",
+        ), users)
+        copy_rows("pseudonyms", (
+            "user_id", "account_id", "workflow_state", "unique_id", "unique_id_normalized",
+            "crypted_password", "password_salt",
+            "persistence_token", "single_access_token", "perishable_token",
+            "login_count", "failed_login_count", "created_at", "updated_at", "sis_user_id",
+            "reset_password_token",
+        ), pseudonyms)
+
+    # --- Terms ---
+    term_ids = reserve_ids("enrollment_terms", NUM_TERMS)
+    terms = []
+    for term_id in term_ids:
+        t = fake.date_time_between(start_date="-1y", end_date="now")
+        terms.append((term_id, ROOT_ACCOUNT_ID, t, f"Fall {t.year}", t, t + timedelta(days=120)))
+    copy_rows("enrollment_terms", ("id", "root_account_id", "created_at", "name", "start_at", "updated_at"), terms)
+
+    # --- Courses ---
+    course_ids = reserve_ids("courses", NUM_TERMS * NUM_COURSES_PER_TERM)
+    courses = []
+    for n, course_id in enumerate(course_ids):
         created_at = fake.date_time_between(start_date="-1y", end_date="now")
-        enrollment_type = "StudentEnrollment"
-        
-        cur.execute("""
-            INSERT INTO enrollments (
-                user_id, course_id, type, workflow_state, created_at, updated_at,
-                course_section_id, root_account_id, limit_privileges_to_course_section, role_id
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, [
-            user_id, course_id, enrollment_type, "active",
-            created_at, created_at, section_id, ROOT_ACCOUNT_ID, False, role_map[enrollment_type]
-        ])
-
-# --- Add Some TAs ---
-for _ in range(5):
-    course_id = random.choice(course_ids)
-    user_id = random.choice(user_ids)
-    
-    # Check if user is already enrolled in this course
-    cur.execute("""
-        SELECT COUNT(*) FROM enrollments 
-        WHERE user_id = %s AND course_id = %s AND type IN ('TeacherEnrollment', 'TaEnrollment')
-    """, [user_id, course_id])
-    
-    if cur.fetchone()[0] == 0:
-        section_ids = section_ids_by_course[course_id]
-        section_id = random.choice(section_ids)
+        name = f"{fake.word().title()} {fake.word().title()} {random.randint(100, 999)}"
+        course_code = f"{fake.random_uppercase_letter()}{fake.random_uppercase_letter()}{random.randint(100, 999)}"
+        courses.append((
+            course_id, ROOT_ACCOUNT_ID, ROOT_ACCOUNT_ID, term_ids[n // NUM_COURSES_PER_TERM],
+            created_at, created_at, name, course_code, "available", False,
+        ))
+    copy_rows("courses", (
+        "id", "account_id", "root_account_id", "enrollment_term_id", "created_at", "updated_at",
+        "name", "course_code", "workflow_state", "is_public",
+    ), courses)
+
+    # --- Course sections: 1-3 per course, the first one is the default ---
+    section_counts = [random.randint(1, 3) for _ in course_ids]
+    section_ids = iter(reserve_ids("course_sections", sum(section_counts)))
+    section_ids_by_course = {}
+    sections = []
+    for course_id, num_sections in zip(course_ids, section_counts):
+        section_ids_by_course[course_id] = []
+        for i in range(num_sections):
+            section_id = next(section_ids)
+            section_ids_by_course[course_id].append(section_id)
+            created_at = fake.date_time_between(start_date="-1y", end_date="now")
+            section_name = f"Section {fake.random_uppercase_letter()}" if i == 0 else f"Section {i+1}"
+            sections.append((
+                section_id, course_id, section_name, ROOT_ACCOUNT_ID, created_at, created_at,
+                f"SECT_{course_id}_{random.randint(100,999)}", "active", i == 0, True,
+            ))
+    copy_rows("course_sections", (
+        "id", "course_id", "name", "root_account_id", "created_at", "updated_at",
+        "sis_source_id", "workflow_state", "default_section", "accepting_enrollments",
+    ), sections)
+
+    # --- Enrollments: the same rules as the row-by-row path, checked against these sets ---
+    teachers = set()  # (user_id, course_id)
+    tas = set()
+    enrollments = []
+
+    def enroll(user_id, course_id, enrollment_type, section_id):
         created_at = fake.date_time_between(start_date="-1y", end_date="now")
-        
-        cur.execute("""
-            INSERT INTO enrollments (
-                user_id, course_id, type, workflow_state, created_at, updated_at,
-                course_section_id, root_account_id, limit_privileges_to_course_section, role_id
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, [
-            user_id, course_id, "TaEnrollment", "active",
-            created_at, created_at, section_id, ROOT_ACCOUNT_ID, False, role_map["TaEnrollment"]
-        ])
+        enrollments.append((
+            user_id, course_id, enrollment_type, "active", created_at, created_at,
+            section_id, ROOT_ACCOUNT_ID, False, role_map[enrollment_type],
+        ))
+
+    for course_id in course_ids:
+        teacher_id = random.choice(user_ids)
+        teachers.add((teacher_id, course_id))
+        enroll(teacher_id, course_id, "TeacherEnrollment", section_ids_by_course[course_id][0])
+
+    for user_id in user_ids:
+        num_enrollments = random.randint(1, min(5, len(course_ids)))
+        for course_id in random.sample(course_ids, num_enrollments):
+            if (user_id, course_id) in teachers:
+                continue
+            enroll(user_id, course_id, "StudentEnrollment", random.choice(section_ids_by_course[course_id]))
+        if len(enrollments) >= COPY_ROWS:
+            copy_rows("enrollments", ENROLLMENT_COLUMNS, enrollments)
+            enrollments.clear()
+
+    for _ in range(NUM_TAS):
+        course_id = random.choice(course_ids)
+        user_id = random.choice(user_ids)
+        if (user_id, course_id) in teachers or (user_id, course_id) in tas:
+            continue
+        tas.add((user_id, course_id))
+        enroll(user_id, course_id, "TaEnrollment", random.choice(section_ids_by_course[course_id]))
+    copy_rows("enrollments", ENROLLMENT_COLUMNS, enrollments)
+
+    return course_ids, section_ids_by_course
+
+
+course_ids, section_ids_by_course = bulk_load() if BULK else insert_row_by_row()
 
 # --- Commit and close ---
 conn.commit()
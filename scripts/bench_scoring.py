@@ -0,0 +1,263 @@
+"""
+Micro and end-to-end benchmarks for the scoring path.
+
+    python scripts/bench_scoring.py                 # or: make bench
+
+Runs offline against data/synthetic_openflights.db:
+
+    parse_ascii/<n>           _parse_duckdb_ascii on an n-row table
+    compare/<case>/<n>        canonicalize + results_match on synthetic n-row results
+    evaluate/local/<case>     evaluate() with EVAL_BACKEND=local
+    evaluate/mcp/<case>       evaluate() against a local MCP server, started the way conftest.py does
+                              (and waited on until /readyz reports it warmed up) but with QUERY_CACHE=0,
+                              so every uncached call executes its SQL
+
+Results (per-call median / min / p95 in microseconds) are written as JSON to BENCH_OUT
+(default bench_results.json). Set BENCH_BASELINE to a previous results file to compare:
+any benchmark whose median slowed down by more than BENCH_THRESHOLD (default 0.25 = 25%)
+is reported and the script exits 1. BENCH_SERVER=0 skips the MCP benchmarks,
+BENCH_QUICK=1 shortens every measurement (smoke runs).
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import platform
+import pathlib
+import statistics
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List
+
+import duckdb
+import requests
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "evaluator"))
+
+QUICK = os.getenv("BENCH_QUICK", "0") == "1"
+ROUNDS = 3 if QUICK else 7
+ROUND_SECONDS = 0.02 if QUICK else 0.2
+SIZES = [1, 10, 100, 1000, 10000]
+
+
+def measure(fn: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Time `fn` in ROUNDS rounds of a calibrated number of calls each; per-call statistics in microseconds.
+    """
+    fn()  # warm-up
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= ROUND_SECONDS / 4 or loops >= 1 << 20:
+            break
+        loops *= 4
+    loops = max(1, int(loops * ROUND_SECONDS / max(elapsed, 1e-9)))
+    per_call = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - t0) / loops * 1e6)
+    per_call.sort()
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(per_call[0], 3),
+        "p95_us": round(per_call[min(len(per_call) - 1, int(0.95 * len(per_call)))], 3),
+        "loops": loops,
+        "rounds": ROUNDS,
+    }
+
+
+def synthetic_rows(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "airport_id": i,
+            "name": f"Airport {rng.randrange(10**6)}",
+            "country": rng.choice(["US", "DE", "FR", "JP", "BR"]),
+            "latitude": rng.uniform(-90, 90),
+            "altitude": rng.choice([None, rng.randrange(5000)]),
+        }
+        for i in range(n)
+    ]
+
+
+def ascii_table(rows: List[Dict[str, Any]]) -> str:
+    # Same layout as the `query` tool's output: +---+ rules around a | separated header and body
+    cols = list(rows[0])
+    cells = [[("NULL" if r[c] is None else str(r[c])) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(cols)]
+    rule = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+    def line(vals: List[str]) -> str:
+        return "| " + " | ".join(v.ljust(w) for v, w in zip(vals, widths)) + " |"
+
+    return "\n".join([rule, line(cols), rule, *(line(r) for r in cells), rule])
+
+
+def bench_parse_ascii(results: Dict[str, Any]) -> None:
+    from sql_rft_evaluator import _parse_duckdb_ascii
+
+    for n in SIZES:
+        table = ascii_table(synthetic_rows(n))
+        results[f"parse_ascii/{n}"] = measure(lambda: _parse_duckdb_ascii(table))
+
+
+def bench_compare(results: Dict[str, Any]) -> None:
+    from result_compare import canonicalize, results_match
+
+    for n in SIZES:
+        gt = synthetic_rows(n)
+        expected = canonicalize(gt)
+        shuffled = gt[:]
+        random.Random(1).shuffle(shuffled)
+        renamed = [{k.upper(): v for k, v in r.items()} for r in shuffled]
+        last_differs = gt[:-1] + [{**gt[-1], "name": "different"}]
+        cases = {
+            "equal_unordered": shuffled,
+            "equal_renamed": renamed,
+            "mismatch_last_row": last_differs,
+        }
+        for case, pred in cases.items():
+            results[f"compare/{case}/{n}"] = measure(lambda: results_match(expected, canonicalize(pred)))
+
+
+EVAL_QUERIES = {
+    "point": "SELECT name, city FROM airports WHERE airport_id = 42",
+    "aggregate": "SELECT country, COUNT(*) AS n FROM airports GROUP BY country ORDER BY n DESC",
+    "join": (
+        "SELECT a.name, COUNT(*) AS routes FROM routes r JOIN airports a ON a.airport_id = r.source_airport_id "
+        "GROUP BY a.name ORDER BY routes DESC, a.name LIMIT 100"
+    ),
+    "scan_1000": "SELECT airport_id, name, latitude, longitude FROM airports ORDER BY airport_id LIMIT 1000",
+}
+
+
+def bench_evaluate(results: Dict[str, Any], backend: str) -> None:
+    import sql_rft_evaluator as ev
+    from result_compare import canonicalize
+
+    os.environ["EVAL_BACKEND"] = backend
+    for case, sql in EVAL_QUERIES.items():
+        gt = ev._execute_local(sql)[0]
+        compiled = canonicalize(gt)
+        msgs = [{"role": "assistant", "content": sql}]
+
+        def run() -> None:
+            res = ev.evaluate(msgs, ground_truth=gt, compiled_ground_truth=compiled)
+            assert res["score"] == 1, res["reason"]
+
+        os.environ["EVAL_CACHE"] = "0"
+        results[f"evaluate/{backend}/{case}"] = measure(run)
+        os.environ["EVAL_CACHE"] = "1"
+        results[f"evaluate/{backend}/{case}/cached"] = measure(run)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mcp_server(db_path: str) -> "tuple[subprocess.Popen, str]":
+    port = _free_port()
+    # Without the server's result cache, the EVAL_CACHE=0 cases measure a real execution each call
+    env = {**os.environ, "PORT": str(port), "DB_PATH": db_path, "QUERY_CACHE": "0"}
+    # Logs go to a file: a pipe nobody drains would eventually block the server
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "mcp_server" / "run_mcp_server.py")],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        # /readyz turns 200 only after the server's warm-up, so no benchmark measures a cold start
+        try:
+            if requests.get(f"{url}/readyz", timeout=2).status_code == 200:
+                return proc, url
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.1)
+    proc.kill()
+    log.seek(0)
+    raise RuntimeError(f"MCP server failed to start: {log.read().decode(errors='replace')}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = cur["median_us"] / max(base["median_us"], 1e-9)
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:<44} {base['median_us']:>12.1f} -> {cur['median_us']:>12.1f} us  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    db_path = os.getenv("DB_PATH") or str(ROOT / "data" / "synthetic_openflights.db")
+    if not pathlib.Path(db_path).exists():
+        print(f"Database not found: {db_path}. Run the generation scripts first.")
+        sys.exit(2)
+    os.environ["DB_PATH"] = db_path
+    os.environ.pop("EVAL_TIMINGS", None)
+
+    results: Dict[str, Any] = {}
+    bench_parse_ascii(results)
+    bench_compare(results)
+    bench_evaluate(results, "local")
+    if os.getenv("BENCH_SERVER", "1") != "0":
+        proc, url = start_mcp_server(db_path)
+        try:
+            os.environ["MCP_SERVER_URL"] = url
+            bench_evaluate(results, "mcp")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    out = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "machine": platform.machine(),
+            "quick": QUICK,
+        },
+        "results": results,
+    }
+    out_path = pathlib.Path(os.getenv("BENCH_OUT", "bench_results.json"))
+    out_path.write_text(json.dumps(out, indent=2))
+    for name, r in results.items():
+        print(f"{name:<44} {r['median_us']:>12.1f} us")
+    print(f"Wrote {out_path}")
+
+    baseline_path = os.getenv("BENCH_BASELINE")
+    if baseline_path:
+        baseline = json.loads(pathlib.Path(baseline_path).read_text())
+        regressions = compare(out, baseline, float(os.getenv("BENCH_THRESHOLD", "0.25")))
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed beyond the threshold")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
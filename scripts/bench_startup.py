@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark for the MCP server.
+
+    python scripts/bench_startup.py                 # or: make bench-startup
+
+Starts run_mcp_server.py from scratch BENCH_STARTUP_RUNS times (default 5) per mode in
+BENCH_STARTUP_MODES (default "lazy,eager", i.e. LAZY_START=1 / LAZY_START=0) against
+data/synthetic_openflights.db (or DB_PATH) and reports, in seconds since the process was spawned:
+
+    listening       first 200 from /healthz
+    first_query     first successful query_rows result, sent as soon as the port is open
+    ready           first 200 from /readyz (warm-up finished)
+
+plus `import`, the time a fresh interpreter takes to import run_mcp_server (what the uvicorn
+master pays before spawning its workers). Medians, min and max are printed and written as
+JSON to BENCH_OUT (default bench_results.startup.json).
+
+The script exits 1 if the median import time exceeds STARTUP_IMPORT_BUDGET_S (default 0.1)
+or, when BENCH_FIRST_QUERY_BUDGET_S is set, if the median time to first query of any mode
+exceeds it.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import pathlib
+import platform
+import statistics
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+import requests
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+SERVER = ROOT / "mcp_server" / "run_mcp_server.py"
+RUNS = int(os.getenv("BENCH_STARTUP_RUNS", "5"))
+MODES = [m.strip() for m in os.getenv("BENCH_STARTUP_MODES", "lazy,eager").split(",") if m.strip()]
+IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "0.1"))
+FIRST_QUERY_BUDGET_S = float(os.getenv("BENCH_FIRST_QUERY_BUDGET_S", "0") or 0)
+TIMEOUT_S = 60.0
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time() -> float:
+    """
+    Seconds a fresh interpreter spends importing run_mcp_server (interpreter start-up excluded).
+    """
+    code = "import time; t0 = time.perf_counter(); import run_mcp_server; print(time.perf_counter() - t0)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=SERVER.parent, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _query(url: str) -> bool:
+    body = {
+        "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+        "params": {"name": "query_rows", "arguments": {"query": "SELECT 1 AS x"}},
+    }
+    text = requests.post(f"{url}/mcp/", json=body, headers=HEADERS, timeout=TIMEOUT_S).text
+    result = json.loads(text[text.index("{"):]).get("result") or {}
+    return not result.get("isError") and result.get("structuredContent", {}).get("data") == [[1]]
+
+
+def _wait(proc: subprocess.Popen, t0: float, check: Any) -> float:
+    while time.perf_counter() - t0 < TIMEOUT_S:
+        try:
+            if check():
+                return time.perf_counter() - t0
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError("server exited")
+        time.sleep(0.005)
+    raise RuntimeError(f"no answer within {TIMEOUT_S:g}s")
+
+
+def cold_start(db_path: str, lazy: bool) -> Dict[str, float]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "PORT": str(port), "DB_PATH": db_path, "LAZY_START": "1" if lazy else "0"}
+    # Logs go to a file: a pipe nobody drains would eventually block the server
+    log = tempfile.TemporaryFile()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, str(SERVER)], env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        listening = _wait(proc, t0, lambda: requests.get(f"{url}/healthz", timeout=2).status_code == 200)
+        first_query = _wait(proc, t0, lambda: _query(url))
+        ready = _wait(proc, t0, lambda: requests.get(f"{url}/readyz", timeout=2).status_code == 200)
+    except RuntimeError as e:
+        log.seek(0)
+        raise RuntimeError(f"MCP server failed to start ({e}): {log.read().decode(errors='replace')}")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return {"listening": listening, "first_query": first_query, "ready": ready}
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median_s": round(statistics.median(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def main() -> None:
+    db_path = os.getenv("DB_PATH") or str(ROOT / "data" / "synthetic_openflights.db")
+    if not pathlib.Path(db_path).exists():
+        print(f"Database not found: {db_path}. Run the generation scripts first.")
+        sys.exit(2)
+
+    results: Dict[str, Any] = {"import": summarize([import_time() for _ in range(RUNS)])}
+    for mode in MODES:
+        runs = [cold_start(db_path, lazy=mode == "lazy") for _ in range(RUNS)]
+        for stage in ("listening", "first_query", "ready"):
+            results[f"{mode}/{stage}"] = summarize([r[stage] for r in runs])
+
+    for name, r in results.items():
+        print(f"{name:<24} median {r['median_s']:8.3f}s  min {r['min_s']:8.3f}s  max {r['max_s']:8.3f}s")
+    out_path = pathlib.Path(os.getenv("BENCH_OUT", "bench_results.startup.json"))
+    meta = {"python": platform.python_version(), "cpus": os.cpu_count(), "runs": RUNS, "db": db_path}
+    out_path.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"Wrote {out_path}")
+
+    failures = []
+    if results["import"]["median_s"] > IMPORT_BUDGET_S:
+        failures.append(f"import {results['import']['median_s']:.3f}s > STARTUP_IMPORT_BUDGET_S={IMPORT_BUDGET_S:g}")
+    for mode in MODES if FIRST_QUERY_BUDGET_S else []:
+        median = results[f"{mode}/first_query"]["median_s"]
+        if median > FIRST_QUERY_BUDGET_S:
+            failures.append(f"{mode}/first_query {median:.3f}s > BENCH_FIRST_QUERY_BUDGET_S={FIRST_QUERY_BUDGET_S:g}")
+    if failures:
+        print("Over budget:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
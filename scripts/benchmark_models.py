@@ -1,77 +1,35 @@
 import os
-import json
+import sys
 import time
 import pathlib
 from typing import List, Dict, Any
 
-import requests
 from dotenv import load_dotenv
 from fireworks import LLM
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "evaluator"))
+from eval_dataset import JsonlDataset  # noqa: E402
+from mcp_client import McpClient, McpError, rows_from_columnar  # noqa: E402
+from result_compare import results_match  # noqa: E402
 
-def parse_duckdb_ascii(table_string: str) -> List[Dict[str, Any]]:
-    lines = [ln for ln in table_string.strip().split("\n") if ln.strip() and not ln.startswith("+")]
-    if len(lines) < 2:
-        return []
-    headers = [h.strip() for h in lines[0].split("|")[1:-1]]
-    data_lines = lines[1:]
-    out: List[Dict[str, Any]] = []
-    for ln in data_lines:
-        vals = [v.strip() for v in ln.split("|")[1:-1]]
-        if len(vals) != len(headers):
-            continue
-        row: Dict[str, Any] = {}
-        for k, v in zip(headers, vals):
-            if v.upper() == "NULL" or v == "":
-                row[k] = None
-                continue
-            try:
-                if "." in v:
-                    row[k] = float(v)
-                else:
-                    row[k] = int(v)
-            except Exception:
-                row[k] = v
-        out.append(row)
-    return out
 
-
-def are_equal(a: List[Dict[str, Any]], b: List[Dict[str, Any]]) -> bool:
-    def norm(v: Any) -> str:
-        return "None" if v is None else str(v)
-
-    av = sorted([sorted(map(norm, r.values())) for r in a])
-    bv = sorted([sorted(map(norm, r.values())) for r in b])
-    return av == bv
-
-
-def run_eval(llm: LLM, mcp_url: str, system_prompt: str, user_prompt: str, ground_truth: List[Dict[str, Any]]) -> int:
+def generate_sql(llm: LLM, system_prompt: str, user_prompt: str) -> str:
     resp = llm.chat.completions.create(
         messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
         temperature=0.0,
     )
-    sql = (resp.choices[0].message.content or "").strip()
-    headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
-    payload = {
-        "id": "eval",
-        "jsonrpc": "2.0",
-        "method": "tools/call",
-        "params": {"session": {"id": "bench"}, "name": "query", "arguments": {"query": sql}},
-    }
-    with requests.post(f"{mcp_url}/mcp/", headers=headers, json=payload, timeout=30, stream=True) as r:
-        r.raise_for_status()
-        ev = None
-        for line in r.iter_lines():
-            if line and line.decode("utf-8").startswith("data:"):
-                js = line.decode("utf-8")[5:].strip()
-                if js:
-                    ev = json.loads(js)
-                    break
-    if not ev or "error" in ev:
-        return 0
-    ascii_table = ev["result"]["content"][0]["text"]
-    pred = parse_duckdb_ascii(ascii_table)
-    return 1 if are_equal(pred, ground_truth) else 0
+    return (resp.choices[0].message.content or "").strip()
+
+
+def score_sqls(mcp: McpClient, sqls: List[str], ground_truth: List[Dict[str, Any]]) -> List[int]:
+    """
+    Score every model's SQL for one example with a single query_batch round-trip.
+    """
+    try:
+        results = mcp.query_batch([(sql, None) for sql in sqls])
+    except McpError:
+        return [0] * len(sqls)
+    return [0 if "error" in r else int(results_match(ground_truth, rows_from_columnar(r))) for r in results]
 
 
 def main() -> None:
@@ -95,12 +53,16 @@ def main() -> None:
     llm_base = LLM(model=BASE, deployment_type="auto", api_key=api_key)
     llm_large = LLM(model=LARGE, deployment_type="auto", api_key=api_key)
     llm_tuned = LLM(model=TUNED, deployment_type="auto", api_key=api_key)
-
-    # Load dataset
-    rows: List[Dict[str, Any]] = []
-    with open(ds_path, "r") as f:
-        for ln in f:
-            rows.append(json.loads(ln))
+    mcp = McpClient(mcp_url, read_timeout=30, session_id="bench")
+
+    # Index the dataset; rows are parsed one at a time as they are benchmarked
+    rows = JsonlDataset(ds_path).view()
+    shard = os.getenv("BENCH_SHARD")  # "i/k": run only the i-th (0-based) of k slices
+    if shard:
+        i, k = (int(x) for x in shard.split("/"))
+        rows = rows.shard(i, k)
+    if os.getenv("BENCH_SAMPLE"):
+        rows = rows.sample(int(os.getenv("BENCH_SAMPLE")), seed=0)
     total = len(rows)
     print(f"Loaded {total} examples.")
 
@@ -109,12 +71,12 @@ def main() -> None:
         system_prompt = item["messages"][0]["content"]
         user_prompt = item["messages"][1]["content"]
         gt = item["ground_truth"]
-        scores["base"] += run_eval(llm_base, mcp_url, system_prompt, user_prompt, gt)
-        time.sleep(0.5)
-        scores["large"] += run_eval(llm_large, mcp_url, system_prompt, user_prompt, gt)
-        time.sleep(0.5)
-        scores["tuned"] += run_eval(llm_tuned, mcp_url, system_prompt, user_prompt, gt)
-        time.sleep(0.5)
+        sqls = {}
+        for name, llm in (("base", llm_base), ("large", llm_large), ("tuned", llm_tuned)):
+            sqls[name] = generate_sql(llm, system_prompt, user_prompt)
+            time.sleep(0.5)
+        for name, score in zip(sqls, score_sqls(mcp, list(sqls.values()), gt)):
+            scores[name] += score
         if (i + 1) % 10 == 0:
             print(f"Progress {i + 1}/{total}")
 
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+import anyio
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "mcp_server"))
+
+from admission import AdmissionControl  # noqa: E402
+
+
+def scope(client_id):
+    return {"type": "http", "method": "POST", "path": "/", "headers": [(b"x-client-id", client_id.encode())]}
+
+
+def test_queued_requests_are_admitted_round_robin_and_overflow_gets_429():
+    order, responses = [], {}
+    gate = anyio.Event()
+
+    async def app(scope, receive, send):
+        name = dict(scope["headers"])[b"x-name"].decode()
+        order.append(name)
+        if name == "a1":
+            await gate.wait()
+
+    admission = AdmissionControl(app, max_inflight=1, max_queue=4, max_client_queue=2, max_wait_s=5)
+
+    async def call(client_id, name):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        s = scope(client_id)
+        s["headers"].append((b"x-name", name.encode()))
+        await admission(s, receive, send)
+        start = next((m for m in sent if m["type"] == "http.response.start"), None)
+        responses[name] = (start["status"], dict(start["headers"])) if start else (200, {})
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            for client_id, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("a", "a4"), ("b", "b1"), ("c", "c1")]:
+                tg.start_soon(call, client_id, name)
+                await anyio.sleep(0.01)
+            assert admission.stats()["queued"] == 4
+            gate.set()
+
+    anyio.run(main)
+    # client a's burst does not hold back b and c
+    assert order == ["a1", "a2", "b1", "c1", "a3"]
+    status, headers = responses["a4"]
+    assert status == 429 and int(headers[b"retry-after"]) >= 1
+    assert admission.stats()["inflight"] == 0 and admission.stats()["rejected"] == 1
+
+
+def test_requests_waiting_too_long_are_turned_away():
+    async def slow(scope, receive, send):
+        await anyio.sleep(0.3)
+
+    admission = AdmissionControl(slow, max_inflight=1, max_wait_s=0.05)
+    statuses = []
+
+    async def call():
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        await admission(scope("a"), receive, send)
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(call)
+            await anyio.sleep(0.01)
+            tg.start_soon(call)
+
+    anyio.run(main)
+    assert statuses == [429]
+    assert admission.stats()["timed_out"] == 1 and admission.queued == 0
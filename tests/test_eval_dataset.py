@@ -0,0 +1,63 @@
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+
+def _load_module():
+    root = Path(__file__).resolve().parents[1]
+    spec = importlib.util.spec_from_file_location("eval_dataset", root / "evaluator" / "eval_dataset.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)  # type: ignore
+    return mod
+
+
+def _write(path: Path, objs, blank_every: int = 0) -> None:
+    with open(path, "w") as f:
+        for i, o in enumerate(objs):
+            f.write(json.dumps(o) + "\n")
+            if blank_every and i % blank_every == 0:
+                f.write("\n")
+
+
+def test_index_is_cached_and_rebuilt_when_file_changes(tmp_path):
+    mod = _load_module()
+    path = tmp_path / "rows.jsonl"
+    _write(path, [{"i": i} for i in range(50)], blank_every=7)
+
+    ds = mod.JsonlDataset(path)
+    assert len(ds) == 50
+    assert ds[0] == {"i": 0} and ds[49] == {"i": 49}
+    assert [o["i"] for o in ds] == list(range(50))
+    idx = Path(str(path) + ".idx")
+    assert idx.exists()
+
+    # A second open reads the cached offsets instead of scanning
+    mtime = idx.stat().st_mtime_ns
+    assert mod.JsonlDataset(path)[17] == {"i": 17}
+    assert idx.stat().st_mtime_ns == mtime
+
+    _write(path, [{"j": j} for j in range(3)])
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    ds = mod.JsonlDataset(path)
+    assert len(ds) == 3 and ds[2] == {"j": 2}
+
+
+def test_shards_partition_and_sample_is_reproducible(tmp_path):
+    mod = _load_module()
+    path = tmp_path / "rows.jsonl"
+    _write(path, [{"i": i} for i in range(103)])
+    ds = mod.JsonlDataset(path)
+
+    shards = [ds.shard(i, 4) for i in range(4)]
+    seen = [o["i"] for s in shards for o in s]
+    assert seen == list(range(103))
+    assert max(len(s) for s in shards) - min(len(s) for s in shards) <= 1
+
+    a = [o["i"] for o in ds.sample(10, seed=3)]
+    assert a == [o["i"] for o in ds.sample(10, seed=3)]
+    assert len(set(a)) == 10 and a == sorted(a)
+
+    # Views compose, and map() hands back the raw line alongside the parsed row
+    sub = ds.shard(1, 2).head(2)
+    assert list(sub.map(lambda raw, obj: (json.loads(raw), obj["i"]))) == [({"i": 51}, 51), ({"i": 52}, 52)]
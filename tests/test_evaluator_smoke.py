@@ -4,6 +4,8 @@ import types
 import importlib.util
 from pathlib import Path
 
+import pytest
+
 
 def load_evaluator():
     root = Path(__file__).resolve().parents[1]
@@ -15,6 +17,14 @@ def load_evaluator():
     return mod
 
 
+def make_rows(mod, sqls, ground_truths):
+    # one row per predicted SQL, scored against the ground truth at the same position
+    return [
+        mod.EvaluationRow(messages=[{"role": "user", "content": "q"}, {"role": "assistant", "content": q}], ground_truth=gt)
+        for q, gt in zip(sqls, ground_truths)
+    ]
+
+
 def test_ascii_parser_basic():
     mod = load_evaluator()
     parser = getattr(mod, "_parse_duckdb_ascii")
@@ -38,3 +48,225 @@ def test_evaluate_missing_env_returns_safe_error(monkeypatch):
     res = evaluate(msgs, ground_truth=[{"1": 1}])
     assert res["score"] == 0
     assert "MCP_SERVER_URL" in res.get("reason", "") or res.get("is_score_valid") is False
+
+
+def test_local_backend_matches_mcp(monkeypatch):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.setenv("DB_PATH", str(root / "data" / "synthetic_openflights.db"))
+    sql = "SELECT country, COUNT(*) AS cnt FROM airports GROUP BY country"
+    msgs = [{"role": "assistant", "content": sql}]
+    gt = mod._execute_local(sql)[0]
+    wrong = [{"country": "nowhere", "cnt": 1}]
+    for backend in ("mcp", "local"):
+        monkeypatch.setenv("EVAL_BACKEND", backend)
+        assert evaluate(msgs, ground_truth=gt)["score"] == 1
+        assert evaluate(msgs, ground_truth=wrong)["score"] == 0
+        bad = evaluate([{"role": "assistant", "content": "SELECT nope FROM airports"}], ground_truth=[])
+        assert bad["score"] == 0
+
+
+def test_result_cache_normalizes_sql_and_counts_hits(monkeypatch):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    root = Path(__file__).resolve().parents[1]
+    monkeypatch.setenv("EVAL_BACKEND", "local")
+    monkeypatch.setenv("DB_PATH", str(root / "data" / "synthetic_openflights.db"))
+    gt = mod._execute_local("SELECT COUNT(*) AS n FROM countries")[0]
+    variants = [
+        "SELECT COUNT(*) AS n FROM countries",
+        "select count(*)   as n\nfrom countries -- same query",
+        "/* again */ SELECT COUNT(*) AS n FROM countries;",
+    ]
+    for sql in variants:
+        assert evaluate([{"role": "assistant", "content": sql}], ground_truth=gt)["score"] == 1
+    for _ in range(2):
+        res = evaluate([{"role": "assistant", "content": "SELECT nope FROM countries"}], ground_truth=gt)
+        assert res["score"] == 0 and "nope" in res["reason"]
+    stats = mod.cache_stats()
+    assert stats["misses"] == 2 and stats["hits"] == 3
+
+
+def test_compiled_ground_truth_is_reused_across_row_copies():
+    mod = load_evaluator()
+    row = mod.EvaluationRow(messages=[], ground_truth=[{"a": 1}, {"a": 2}])
+    row.input_metadata.row_id = "row-1"
+    compiled = mod._compiled_ground_truth(row)
+    assert mod._compiled_ground_truth(row.model_copy(deep=True)) is compiled
+    other = mod.EvaluationRow(messages=[], ground_truth=[{"a": 3}, {"a": 4}])
+    other.input_metadata.row_id = "row-1"
+    assert mod._compiled_ground_truth(other) is not compiled
+
+
+def test_evaluate_batch_matches_sequential_and_keeps_order(monkeypatch):
+    import asyncio
+
+    mod = load_evaluator()
+    monkeypatch.setenv("EVAL_CACHE", "0")
+    sqls = [f"SELECT airport_id FROM airports WHERE airport_id < {n}" for n in range(1, 9)] + ["SELECT nope"]
+    gts = [mod._execute_local(sqls[3])[0]] * len(sqls)
+
+    expected = [mod._score_row(r).evaluation_result for r in make_rows(mod, sqls, gts)]
+    rows = make_rows(mod, sqls, gts)
+    out = asyncio.run(mod.evaluate_batch(rows, concurrency=4))
+    assert [r.evaluation_result for r in out] == expected
+    assert [r.messages[-1].content for r in out] == sqls
+    assert out[3].evaluation_result.score == 1 and out[-1].evaluation_result.score == 0
+
+
+def test_bounded_fetch_short_circuits_oversized_predictions(monkeypatch):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    monkeypatch.setenv("EVAL_BACKEND", "local")
+    sql = "SELECT airport_id FROM airports ORDER BY airport_id LIMIT 10"
+    msgs = [{"role": "assistant", "content": sql}]
+    rows = mod._execute_local(sql)[0]
+    res = evaluate(msgs, ground_truth=rows[:3])
+    assert res["score"] == 0 and "more than 3 rows" in res["reason"]
+    # the cached overflow rules out smaller ground truths but not larger ones
+    assert "more than 2 rows" in evaluate(msgs, ground_truth=rows[:2])["reason"]
+    assert evaluate(msgs, ground_truth=rows)["score"] == 1
+
+
+def test_stage_timings_are_reported_per_row_and_aggregated(monkeypatch):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    monkeypatch.setenv("EVAL_BACKEND", "local")
+    sql = "SELECT COUNT(*) AS n FROM airports"
+    msgs = [{"role": "assistant", "content": sql}]
+    gt = mod._execute_local(sql)[0]
+
+    monkeypatch.setenv("EVAL_TIMINGS", "0")
+    assert "timings" not in evaluate(msgs, ground_truth=gt)
+
+    monkeypatch.setenv("EVAL_TIMINGS", "1")
+    monkeypatch.setenv("EVAL_CACHE", "0")
+    mod._TIMINGS.reset()
+    res = evaluate(msgs, ground_truth=gt)
+    assert res["score"] == 1
+    assert {"preflight", "execute", "canonicalize", "compare", "total"} <= set(res["timings"])
+    assert res["timings"]["total"] >= res["timings"]["execute"]
+    evaluate(msgs, ground_truth=gt)
+    stats = mod.timing_stats()
+    assert stats["total"]["count"] == 2
+    assert stats["execute"]["p50_ms"] <= stats["execute"]["p99_ms"] <= stats["execute"]["max_ms"]
+
+
+def test_evaluate_batch_sends_one_query_batch_round_trip(monkeypatch):
+    import asyncio
+
+    mod = load_evaluator()
+    monkeypatch.setenv("EVAL_BACKEND", "mcp")
+    monkeypatch.setenv("EVAL_CACHE", "0")
+    monkeypatch.setenv("EVAL_PREFLIGHT", "0")
+    sqls = [f"SELECT airport_id FROM airports WHERE airport_id < {n} ORDER BY 1" for n in (2, 3, 3, 5)] + ["SELECT nope"]
+    gts = [mod._execute_local(sqls[1])[0]] * len(sqls)
+
+    monkeypatch.setenv("EVAL_MCP_BATCH", "0")
+    expected = [r.evaluation_result for r in asyncio.run(mod.evaluate_batch(make_rows(mod, sqls, gts)))]
+
+    client = mod._mcp_client(os.environ["MCP_SERVER_URL"])
+    calls = {"query_rows": 0, "query_batch": []}
+    real_batch = client.query_batch
+
+    def query_rows(*a, **k):
+        calls["query_rows"] += 1
+        raise AssertionError("per-row request in batch mode")
+
+    def query_batch(queries, **kwargs):
+        calls["query_batch"].append(len(queries))
+        return real_batch(queries, **kwargs)
+
+    monkeypatch.setattr(client, "query_rows", query_rows)
+    monkeypatch.setattr(client, "query_batch", query_batch)
+    monkeypatch.setenv("EVAL_MCP_BATCH", "1")
+    out = asyncio.run(mod.evaluate_batch(make_rows(mod, sqls, gts)))
+    assert [r.evaluation_result for r in out] == expected
+    assert [r.evaluation_result.score for r in out] == [0, 1, 1, 0, 0]
+    assert "MCP error" in out[-1].evaluation_result.reason
+    # one round-trip, with the duplicate query sent once
+    assert calls == {"query_rows": 0, "query_batch": [4]}
+
+
+def test_large_fetches_are_paged_through_query_page(monkeypatch):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    monkeypatch.setenv("EVAL_BACKEND", "mcp")
+    monkeypatch.setenv("EVAL_CACHE", "0")
+    monkeypatch.setenv("EVAL_MCP_PAGE_ROWS", "4")
+    sql = "SELECT airport_id FROM airports ORDER BY airport_id LIMIT 10"
+    msgs = [{"role": "assistant", "content": sql}]
+    gt = mod._execute_local(sql)[0]
+
+    client = mod._mcp_client(os.environ["MCP_SERVER_URL"])
+    calls = []
+    real_call = client.call_tool
+
+    def call_tool(name, arguments):
+        calls.append((name, arguments.get("page_size"), bool(arguments.get("close"))))
+        return real_call(name, arguments)
+
+    monkeypatch.setattr(client, "call_tool", call_tool)
+    assert evaluate(msgs, ground_truth=gt)["score"] == 1
+    # up to 11 rows (ground truth + 1) in pages of 4; the result ends inside the third page
+    assert calls == [("query_page", 4, False), ("query_page", 4, False), ("query_page", 3, False)]
+    calls.clear()
+    # a longer result stops at 6 rows and releases the server-side cursor
+    assert evaluate(msgs, ground_truth=gt[:5])["score"] == 0
+    assert calls == [("query_page", 4, False), ("query_page", 2, False), ("query_page", None, True)]
+
+
+@pytest.mark.parametrize("limit, valid", [("queue", False), ("timeout", True)])
+def test_load_dependent_limit_failures_are_not_cached(monkeypatch, limit, valid):
+    mod = load_evaluator()
+    evaluate = getattr(mod, "evaluate")
+    monkeypatch.setenv("EVAL_BACKEND", "mcp")
+    monkeypatch.setenv("EVAL_PREFLIGHT", "0")
+    sql = "SELECT COUNT(*) AS n FROM countries"
+    msgs = [{"role": "assistant", "content": sql}]
+    gt = mod._execute_local(sql)[0]
+
+    client = mod._mcp_client(os.environ["MCP_SERVER_URL"])
+    real_rows = client.query_rows
+    calls = []
+
+    def query_rows(*a, **k):
+        calls.append(a)
+        if len(calls) == 1:
+            raise mod.McpToolError(f"Query limit exceeded ({limit}): under load")
+        return real_rows(*a, **k)
+
+    monkeypatch.setattr(client, "query_rows", query_rows)
+    res = evaluate(msgs, ground_truth=gt)
+    assert res["score"] == 0 and res.get("is_score_valid", True) is valid and f"({limit})" in res["reason"]
+    assert evaluate(msgs, ground_truth=gt)["score"] == 1
+    assert len(calls) == 2
+
+
+def test_rejected_batch_falls_back_to_per_row_queries_and_misses_are_counted_once(monkeypatch):
+    import asyncio
+
+    mod = load_evaluator()
+    monkeypatch.setenv("EVAL_BACKEND", "mcp")
+    monkeypatch.setenv("EVAL_PREFLIGHT", "0")
+    sqls = ["SELECT COUNT(*) AS n FROM countries", "SELECT COUNT(*) AS n FROM airports"]
+    gts = [mod._execute_local(q)[0] for q in sqls]
+
+    client = mod._mcp_client(os.environ["MCP_SERVER_URL"])
+    batches = []
+
+    def query_batch(queries, **kwargs):
+        batches.append(len(queries))
+        raise mod.McpToolError("Query limit exceeded (queue): 68 queries already running or waiting")
+
+    monkeypatch.setattr(client, "query_batch", query_batch)
+    out = asyncio.run(mod.evaluate_batch(make_rows(mod, sqls, gts)))
+    assert [r.evaluation_result.score for r in out] == [1, 1]
+    assert batches == [2]
+    assert mod.cache_stats()["misses"] == 2
+
+    # answered from the cache the second time; the batch is not sent at all
+    out = asyncio.run(mod.evaluate_batch(make_rows(mod, sqls, gts)))
+    assert [r.evaluation_result.score for r in out] == [1, 1]
+    assert batches == [2] and mod.cache_stats()["hits"] == 2
@@ -0,0 +1,96 @@
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "evaluator"))
+
+from mcp_client import CircuitBreaker, McpClient, McpToolError, McpUnavailable, retry_after_seconds  # noqa: E402
+
+
+def serve(statuses):
+    """
+    Fake MCP endpoint: answers with the next status in `statuses` (200 = a query_rows SSE event).
+    """
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            body["client_id"] = self.headers.get("X-Client-Id")
+            calls.append(body)
+            status = statuses[min(len(calls), len(statuses)) - 1]
+            if status != 200:
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "0.05")
+                self.end_headers()
+                return
+            result = {"content": [{"type": "text", "text": "1 rows"}], "isError": False,
+                      "structuredContent": {"columns": ["a"], "types": ["INTEGER"], "data": [[1]]}}
+            if body["params"]["arguments"]["query"] == "bad":
+                result = {"content": [{"type": "text", "text": "Parser Error"}], "isError": True}
+            event = json.dumps({"jsonrpc": "2.0", "id": body["id"], "result": result})
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(f"event: message\ndata: {event}\n\n".encode())
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, calls
+
+
+def test_retries_transient_errors_then_succeeds():
+    httpd, calls = serve([503, 502, 200])
+    client = McpClient(f"http://127.0.0.1:{httpd.server_port}", retries=2, backoff=0.001)
+    assert client.query_rows("SELECT 1") == {"columns": ["a"], "types": ["INTEGER"], "data": [[1]]}
+    assert len(calls) == 3
+    with pytest.raises(McpToolError):
+        client.query_rows("bad")
+    httpd.shutdown()
+
+
+def test_circuit_breaker_stops_sending():
+    httpd, calls = serve([500])
+    client = McpClient(
+        f"http://127.0.0.1:{httpd.server_port}", retries=0, breaker=CircuitBreaker(threshold=2, cooldown=60)
+    )
+    for _ in range(4):
+        with pytest.raises(McpUnavailable):
+            client.query_rows("SELECT 1")
+    assert len(calls) == 2
+    httpd.shutdown()
+
+
+def test_busy_server_is_retried_after_its_retry_after_hint():
+    import time
+    import requests
+
+    httpd, calls = serve([429, 429, 200])
+    client = McpClient(f"http://127.0.0.1:{httpd.server_port}", retries=0, client_id="job-7")
+    t0 = time.monotonic()
+    assert client.query_rows("SELECT 1")["data"] == [[1]]
+    # two waits of at least Retry-After each; a 429 does not use up the retry budget
+    assert time.monotonic() - t0 >= 0.1
+    assert [c["client_id"] for c in calls] == ["job-7"] * 3
+
+    busy, busy_calls = serve([429])
+    impatient = McpClient(f"http://127.0.0.1:{busy.server_port}", max_busy_wait=0.2)
+    with pytest.raises(McpUnavailable, match="server busy"):
+        impatient.query_rows("SELECT 1")
+    assert 2 <= len(busy_calls) <= 5
+    # giving up on a busy server does not count towards opening the circuit
+    assert impatient.breaker.allow()
+
+    resp = requests.Response()
+    resp.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert retry_after_seconds(resp) == 0.0
+    httpd.shutdown()
+    busy.shutdown()
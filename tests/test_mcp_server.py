@@ -0,0 +1,172 @@
+import sys
+import json
+import time
+import subprocess
+import importlib.util
+from pathlib import Path
+
+import duckdb
+import pytest
+from starlette.testclient import TestClient
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_server(monkeypatch, db_path):
+    monkeypatch.setenv("DB_PATH", str(db_path))
+    monkeypatch.syspath_prepend(str(ROOT / "mcp_server"))
+    spec = importlib.util.spec_from_file_location("run_mcp_server", ROOT / "mcp_server" / "run_mcp_server.py")
+    mod = importlib.util.module_from_spec(spec)  # type: ignore
+    assert spec and spec.loader
+    spec.loader.exec_module(mod)  # type: ignore
+    return mod
+
+
+def test_worker_count_and_per_worker_health(monkeypatch, tmp_path):
+    # A private DB file: DuckDB refuses a second in-process handle with a different config
+    db = tmp_path / "t.db"
+    with duckdb.connect(str(db)) as con:
+        con.execute("CREATE TABLE t AS SELECT 1 AS x")
+    mod = load_server(monkeypatch, db)
+    assert mod.worker_count("3") == 3
+    assert mod.worker_count("auto") >= 1
+    with TestClient(mod.create_app()) as client:
+        body = client.get("/healthz").json()
+        assert body["status"] == "ok" and isinstance(body["pid"], int)
+
+
+def test_snapshot_mode_readiness_after_warmup(monkeypatch, tmp_path):
+    db = tmp_path / "t.db"
+    with duckdb.connect(str(db)) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS x, range::VARCHAR AS s FROM range(1000)")
+    warmup = tmp_path / "warmup.sql"
+    warmup.write_text("SELECT COUNT(*) FROM t;\nSELECT MAX(s) FROM t;")
+    monkeypatch.setenv("DB_SNAPSHOT", "1")
+    monkeypatch.setenv("WARMUP_SQL", str(warmup))
+    mod = load_server(monkeypatch, db)
+    app = mod.create_app()
+    with TestClient(app) as client:
+        for _ in range(100):
+            resp = client.get("/readyz")
+            if resp.status_code == 200:
+                break
+            assert resp.json()["status"] == "warming"
+            time.sleep(0.05)
+        body = resp.json()
+        assert body["status"] == "ready" and body["snapshot"] is True
+        assert body["warmup"]["queries"] == 2 and body["warmup"]["failed"] == []
+        assert client.get("/healthz").json()["status"] == "ok"
+
+    from query_engine import QueryEngine, QueryLimits
+
+    engine = QueryEngine(str(db), QueryLimits(), snapshot=True)
+    assert engine.run("SELECT SUM(x) AS total FROM t")["data"] == [[499500]]
+    with pytest.raises(duckdb.Error, match="read-only"):
+        engine.run("DROP TABLE t")
+    assert len(engine.default_warmup_queries()) == 1
+    assert engine.warm_up()["failed"] == [] and engine.ready.is_set()
+    engine.close()
+
+
+def test_metrics_endpoint_reports_latency_errors_and_slow_queries(monkeypatch, tmp_path):
+    db = tmp_path / "t.db"
+    with duckdb.connect(str(db)) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS x FROM range(100)")
+    mod = load_server(monkeypatch, db)
+    headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+    def call(client, name, arguments, i):
+        body = {"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+        assert client.post("/mcp/", json=body, headers=headers).status_code == 200
+
+    with TestClient(mod.create_app()) as client:
+        call(client, "query_rows", {"query": "SELECT x FROM t WHERE x < 7"}, 1)
+        call(client, "query_rows", {"query": "SELECT nope FROM t"}, 2)
+        call(client, "query_batch", {"queries": [{"query": "SELECT COUNT(*) FROM t"}]}, 3)
+        call(client, 'no_such_tool"}\n', {}, 4)
+        text = client.get("/metrics").text
+        snapshot = client.get("/metrics?format=json").json()
+
+    assert 'mcp_tool_calls_total{tool="query_rows",status="ok"} 1' in text
+    assert 'mcp_tool_calls_total{tool="query_rows",status="error"} 1' in text
+    assert 'mcp_tool_duration_seconds_bucket{tool="query_batch",le="+Inf"} 1' in text
+    assert 'mcp_tool_calls_total{tool="other",status="ok"} 1' in text and "no_such_tool" not in text
+    assert 'mcp_query_errors_total{class="binder"} 1' in text
+    assert "mcp_query_rows_total 8" in text
+    assert 'mcp_http_responses_total{status="200"} 4' in text
+    assert "mcp_queries_running 0" in text
+    assert snapshot["response_bytes_total"] > 0
+    from query_cache import sql_fingerprint
+
+    slow = {sql_fingerprint(q)[:12] for q in ("SELECT x FROM t WHERE x < 7", "SELECT COUNT(*) FROM t")}
+    assert {q["fingerprint"] for q in snapshot["slow_queries"]} == slow
+    # labelled by fingerprint only: no SQL text on the endpoint
+    assert "query=" not in text and "FROM t" not in text and "query" not in snapshot["slow_queries"][0]
+    assert "# TYPE mcp_cache_misses_total counter" in text and "mcp_cache_misses_total 3" in text
+    assert "mcp_cache_hits " not in text and snapshot["counters"]["cache_misses"] == 3
+
+
+def test_databases_are_routed_by_key_opened_lazily_and_evicted_lru(monkeypatch, tmp_path):
+    paths = {}
+    for key, n in [("default", 1), ("v1", 10), ("v2", 20), ("v3", 30)]:
+        paths[key] = tmp_path / f"{key}.db"
+        with duckdb.connect(str(paths[key])) as con:
+            con.execute(f"CREATE TABLE t AS SELECT range AS x FROM range({n})")
+    monkeypatch.setenv("DATABASES", ",".join(f"{k}={paths[k]}" for k in ("v1", "v2", "v3")))
+    monkeypatch.setenv("DB_MAX_OPEN", "2")
+    mod = load_server(monkeypatch, paths["default"])
+    headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+    def count(client, database=None):
+        args = {"query": "SELECT COUNT(*) FROM t", **({"database": database} if database else {})}
+        body = {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": "query_rows", "arguments": args}}
+        text = client.post("/mcp/", json=body, headers=headers).text
+        result = json.loads(text[text.index("{"):])["result"]
+        return result["content"][0]["text"] if result.get("isError") else result["structuredContent"]["data"][0][0]
+
+    with TestClient(mod.create_app()) as client:
+        assert client.get("/stats").json()["databases"]["open"] == ["default"]
+        assert count(client) == 1 and count(client, "v1") == 10
+        assert client.get("/stats").json()["databases"]["open"] == ["default", "v1"]
+        # a third database evicts the least recently used one, never the default
+        assert count(client, "v2") == 20
+        assert client.get("/stats").json()["databases"]["open"] == ["default", "v2"]
+        assert count(client, "v1") == 10 and count(client, "v3") == 30
+        stats = client.get("/stats").json()["databases"]
+        assert stats["open"] == ["default", "v3"] and stats["opens"] == 4 and stats["evictions"] == 3
+        assert "unknown database 'v9'" in count(client, "v9")
+
+
+def test_lazy_start_defers_imports_database_open_and_base_server(monkeypatch, tmp_path):
+    # The uvicorn master only imports the module: none of the heavy dependencies may load
+    probe = (
+        "import sys, run_mcp_server; "
+        "print(sorted(m for m in ('mcp', 'duckdb', 'starlette', 'uvicorn', 'mcp_server_motherduck') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT / "mcp_server", capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+    db = tmp_path / "t.db"
+    with duckdb.connect(str(db)) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS x FROM range(5)")
+    monkeypatch.setenv("WARMUP", "0")
+    mod = load_server(monkeypatch, db)
+    headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+    def rpc(client, method, params):
+        body = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        text = client.post("/mcp/", json=body, headers=headers).text
+        return json.loads(text[text.index("{"):])["result"]
+
+    app = mod.create_app()
+    with TestClient(app) as client:
+        assert client.get("/healthz").json()["database"] == "opening"
+        result = rpc(client, "tools/call", {"name": "query_rows", "arguments": {"query": "SELECT SUM(x) FROM t"}})
+        assert result["structuredContent"]["data"] == [[10]]
+        assert "database" not in client.get("/healthz").json()
+        # prompts come from the motherduck server, built on this first use
+        prompts = rpc(client, "prompts/list", {})["prompts"]
+        assert [p["name"] for p in prompts] == ["duckdb-motherduck-initial-prompt"]
+        tools = {t["name"] for t in rpc(client, "tools/list", {})["tools"]}
+        assert {"query", "query_rows", "query_page", "query_batch"} <= tools
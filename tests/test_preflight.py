@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "evaluator"))
+
+from preflight import Preflight  # noqa: E402
+
+
+def test_rejects_unparseable_non_select_and_unbound_queries():
+    pf = Preflight.for_schema([("main", "airports", "airport_id", "BIGINT"), ("main", "airports", "name", "VARCHAR")])
+    assert pf.check("SELECT name FROM airports WHERE airport_id > 3") is None
+    assert "Parser Error" in pf.check("SELEC name FROM airports")
+    assert "read-only SELECT" in pf.check("DELETE FROM airports")
+    assert "read-only SELECT" in pf.check("SELECT 1; DROP TABLE airports")
+    assert "Binder Error" in pf.check("SELECT city FROM airports")
+    assert "LINE 1: SELECT city FROM airports\n               ^" in pf.check("SELECT city FROM airports")
+    # read-only, but json_serialize_sql cannot represent it
+    assert pf.check("PIVOT airports ON name USING count(*)") is None
+    assert "Catalog Error" in pf.check("SELECT * FROM routes")
+
+
+def test_rejects_queries_estimated_too_large(tmp_path):
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(10000)")
+    pf = Preflight.for_db_file(db, max_estimated_rows=1_000_000)
+    assert pf.check("SELECT COUNT(*) FROM t WHERE id > 5") is None
+    reason = pf.check("SELECT * FROM t a, t b")
+    assert reason is not None and "exceeds limit" in reason
@@ -0,0 +1,227 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import duckdb
+
+
+def load_query_engine():
+    root = Path(__file__).resolve().parents[1]
+    if str(root / "mcp_server") not in sys.path:
+        sys.path.insert(0, str(root / "mcp_server"))
+    path = root / "mcp_server" / "query_engine.py"
+    spec = importlib.util.spec_from_file_location("query_engine", path)
+    mod = importlib.util.module_from_spec(spec)  # type: ignore
+    assert spec and spec.loader
+    spec.loader.exec_module(mod)  # type: ignore
+    return mod
+
+
+def test_query_rows_is_typed_and_columnar(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id, 'x' || range AS name, 1.5::DECIMAL(4,1) AS d FROM range(3)")
+    engine = mod.QueryEngine(db)
+    out = engine.run("SELECT id, name, d, DATE '2024-01-02' AS day FROM t ORDER BY id", max_rows=2)
+    assert out["columns"] == ["id", "name", "d", "day"]
+    assert out["types"] == ["BIGINT", "VARCHAR", "DECIMAL(4,1)", "DATE"]
+    assert out["data"] == [[0, 1], ["x0", "x1"], [1.5, 1.5], ["2024-01-02", "2024-01-02"]]
+    assert out["row_count"] == 2 and out["truncated"] is True
+    assert out["elapsed_ms"] >= 0
+
+
+def test_governor_interrupts_slow_queries_and_caps_rows(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(100)")
+    engine = mod.QueryEngine(db, mod.QueryLimits(timeout_s=0.2, max_rows=10))
+    try:
+        engine.run("SELECT SUM(a.range * b.range) FROM range(1000000000) a, range(1000) b")
+        raise AssertionError("expected a timeout")
+    except mod.QueryLimitExceeded as e:
+        assert e.limit == "timeout"
+        assert str(e).startswith("Query limit exceeded (timeout)")
+    out = engine.run("SELECT id FROM t", max_rows=50)
+    assert out["row_count"] == 10 and out["truncated"] is True
+
+
+def test_limits_cannot_be_changed_by_the_governed_sql(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    duckdb.connect(db).close()
+    for snapshot in (False, True):
+        engine = mod.QueryEngine(db, mod.QueryLimits(memory_limit="256MB", threads=1), snapshot=snapshot)
+        for sql in ("SET memory_limit='100GB'", "SET threads=64", "RESET memory_limit"):
+            try:
+                engine.run(sql)
+                raise AssertionError(f"{sql} was accepted")
+            except duckdb.Error:
+                pass
+        out = engine.run("SELECT current_setting('memory_limit') AS m, current_setting('threads') AS t")
+        assert out["data"] == [["244.1 MiB"], [1]]
+        engine.close()
+
+
+def test_small_queries_are_not_blocked_by_a_heavy_one_and_queue_is_bounded(tmp_path):
+    import time
+
+    import anyio
+
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(100)")
+    engine = mod.QueryEngine(db, mod.QueryLimits(timeout_s=1.5, pool_size=2, queue_size=0))
+    heavy = "SELECT SUM(a.range * b.range) FROM range(1000000000) a, range(1000) b"
+    small_latency = []
+    errors = []
+
+    async def run_heavy():
+        try:
+            await engine.run_async(heavy)
+        except mod.QueryLimitExceeded as e:
+            errors.append(e.limit)
+
+    async def run_small():
+        await anyio.sleep(0.2)
+        t0 = time.perf_counter()
+        out = await engine.run_async("SELECT COUNT(*) AS n FROM t")
+        small_latency.append(time.perf_counter() - t0)
+        assert out["data"] == [[100]]
+        # both cursors are busy and no queueing is allowed: rejected immediately
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(run_heavy)
+            await anyio.sleep(0.05)
+            try:
+                await engine.run_async("SELECT 1")
+            except mod.QueryLimitExceeded as e:
+                errors.append(e.limit)
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(run_heavy)
+            tg.start_soon(run_small)
+
+    anyio.run(main)
+    assert small_latency[0] < 0.5
+    assert sorted(errors) == ["queue", "timeout", "timeout"]
+    assert "42" in engine.run_table("SELECT 42 AS answer")
+
+
+def test_result_cache_serves_normalized_sql_and_drops_on_db_change(tmp_path):
+    import os
+
+    mod = load_query_engine()
+    from query_cache import QueryCache
+
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(20)")
+    cache = QueryCache(db, ttl_s=60)
+    engine = mod.QueryEngine(db, mod.QueryLimits(max_rows=100), cache)
+
+    first = engine.run("SELECT id FROM t ORDER BY id", max_rows=10)
+    again = engine.run("select  id\nfrom t -- same query\norder by id", max_rows=5)
+    assert again["data"] == [first["data"][0][:5]] and again["truncated"] is True
+    # a larger limit than was fetched cannot be answered from the entry
+    assert engine.run("SELECT id FROM t ORDER BY id", max_rows=15)["row_count"] == 15
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+    assert stats["bytes"] > 0 and 0 < stats["hit_ratio"] < 1
+
+    st = os.stat(db)
+    os.utime(db, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    engine.run("SELECT id FROM t ORDER BY id", max_rows=5)
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_batch_returns_results_and_errors_in_order(tmp_path):
+    import anyio
+
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(10)")
+    engine = mod.QueryEngine(db, mod.QueryLimits(pool_size=2, max_batch=4))
+    items = [("SELECT COUNT(*) AS n FROM t", None), ("SELECT nope FROM t", None), ("SELECT id FROM t ORDER BY id", 3)]
+    out = anyio.run(engine.run_batch_async, items)
+    assert out[0]["data"] == [[10]]
+    assert "nope" in out[1]["error"]
+    assert out[2]["data"] == [[0, 1, 2]] and out[2]["truncated"] is True
+    try:
+        anyio.run(engine.run_batch_async, items * 2)
+        raise AssertionError("expected the batch limit to apply")
+    except mod.QueryLimitExceeded as e:
+        assert e.limit == "batch"
+
+
+def test_pages_stream_a_result_through_cursors_and_resume_elsewhere(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(2500)")
+    engine = mod.QueryEngine(db, mod.QueryLimits(max_rows=1000, max_cursors=1))
+    sql = "SELECT id FROM t ORDER BY id"
+    ids, cursor, offsets = [], None, []
+    while True:
+        page = engine.page(sql, cursor, page_size=700)
+        offsets.append(page["offset"])
+        ids += page["data"][0]
+        cursor = page["cursor"]
+        if cursor is None:
+            break
+    assert ids == list(range(2500)) and offsets == [0, 700, 1400, 2100]
+    # page_size is capped by max_rows
+    first = engine.page(sql, page_size=5000)
+    assert first["row_count"] == 1000 and first["truncated"] is True
+    # a retried page, or a cursor this engine no longer holds, re-runs the query from its offset
+    assert engine.page(sql, first["cursor"], 10)["data"] == [list(range(1000, 1010))]
+    assert engine.page(sql, first["cursor"], 10)["data"] == [list(range(1000, 1010))]
+    other = mod.QueryEngine(db, mod.QueryLimits(max_rows=1000))
+    assert other.page(sql, first["cursor"], 10)["data"] == [list(range(1000, 1010))]
+    engine.page(sql, engine.page(sql, page_size=10)["cursor"], close=True)
+    assert not engine._open
+    engine.close()
+    other.close()
+
+
+def test_a_cursor_only_continues_its_own_query(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id FROM range(100)")
+    engine = mod.QueryEngine(db, mod.QueryLimits(max_rows=10))
+    a, b = "SELECT id FROM t ORDER BY id", "SELECT id * 2 FROM t ORDER BY 1"
+    cursor = engine.page(a, page_size=10)["cursor"]
+    other = mod.QueryEngine(db, mod.QueryLimits(max_rows=10))
+    for e in (engine, other):  # parked here, resumed by re-running there
+        try:
+            e.page(b, cursor, page_size=10)
+            raise AssertionError("a cursor of one query continued another")
+        except ValueError as err:
+            assert "different query" in str(err)
+    # the rejected request leaves query A's result open for its own next page
+    assert engine.page(a, cursor, page_size=10)["data"] == [list(range(10, 20))]
+    engine.close()
+    other.close()
+
+
+def test_snapshot_mode_accepts_read_only_pivot_and_rejects_writes(tmp_path):
+    mod = load_query_engine()
+    db = str(tmp_path / "t.db")
+    with duckdb.connect(db) as con:
+        con.execute("CREATE TABLE t AS SELECT range AS id, ['a', 'b', 'c'][range % 3 + 1] AS k FROM range(30)")
+    engine = mod.QueryEngine(db, snapshot=True)
+    # PIVOT parses as an internal CREATE TYPE followed by the SELECT
+    pivot = "PIVOT (SELECT k FROM t) ON k USING count(*)"
+    assert engine.run(pivot)["data"] == [[10], [10], [10]]
+    assert engine.page(pivot, page_size=5)["row_count"] == 1
+    for sql in ("DROP TABLE t", "CREATE TABLE u (x INTEGER)"):
+        try:
+            engine.run(sql)
+            raise AssertionError(f"{sql} was accepted")
+        except duckdb.Error as e:
+            assert "read-only" in str(e)
+    engine.close()
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "evaluator"))
+
+from result_compare import canonicalize, canonicalize_columnar, results_match  # noqa: E402
+
+
+def test_column_order_is_free_but_values_stay_in_their_column():
+    gt = [{"a": 1, "b": 2}, {"a": 2, "b": 1}]
+    assert results_match(gt, [{"b": 1, "a": 2}, {"b": 2, "a": 1}])
+    # sorting values inside each row used to make these equal
+    assert not results_match(gt, [{"a": 1, "b": 2}, {"a": 1, "b": 2}])
+
+
+def test_floats_nulls_and_ints():
+    gt = [{"x": 0.30000000000000004, "y": None, "n": 3}]
+    assert results_match(gt, [{"x": 0.3, "y": None, "n": 3.0}])
+    assert not results_match(gt, [{"x": 0.3, "y": 0, "n": 3}])
+    assert results_match([{"v": float("nan")}], [{"v": float("nan")}])
+
+
+def test_ordered_and_by_name_modes():
+    gt = [{"city": "A", "cnt": 2}, {"city": "B", "cnt": 1}]
+    rev = list(reversed(gt))
+    assert results_match(gt, rev)
+    assert not results_match(gt, rev, ordered=True)
+    assert results_match(gt, [{"CNT": 2, "City": "A"}, {"CNT": 1, "City": "B"}], by_name=True)
+    assert not results_match(gt, [{"n": 2, "city": "A"}, {"n": 1, "city": "B"}], by_name=True)
+
+
+def test_columnar_and_row_forms_agree():
+    rows = [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]
+    col = canonicalize_columnar(["a", "b"], [[1, 2], ["x", "y"]])
+    assert col == canonicalize(rows)
+    assert results_match(rows, col)
@@ -0,0 +1,35 @@
+import importlib.util
+from pathlib import Path
+
+
+def _load_module():
+    root = Path(__file__).resolve().parents[1]
+    spec = importlib.util.spec_from_file_location("stage_timer", root / "evaluator" / "stage_timer.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)  # type: ignore
+    return mod
+
+
+def test_recorder_percentiles_and_prometheus_export():
+    mod = _load_module()
+    rec = mod.TimingRecorder(max_samples=1000)
+    for i in range(1, 101):
+        timer = mod.StageTimer()
+        timer.add("transport", i / 1000)
+        timer.split("transport", "server", i / 4000)
+        rec.observe(timer.stages)
+
+    snap = rec.snapshot()
+    assert snap["transport"]["count"] == 100
+    assert snap["server"]["p50_ms"] == 12.5 and snap["server"]["p99_ms"] == 24.75
+    assert snap["transport"]["max_ms"] == 75.0
+
+    text = rec.to_prometheus()
+    assert '# TYPE sql_eval_stage_seconds summary' in text
+    assert 'sql_eval_stage_seconds{stage="server",quantile="0.95"} 0.023750' in text
+    assert 'sql_eval_stage_seconds_count{stage="transport"} 100' in text
+
+    # disabled timers are a shared no-op
+    with mod.NULL_TIMER.stage("x"):
+        pass
+    assert mod.NULL_TIMER.as_ms() == {}
@@ -0,0 +1,86 @@
+import re
+import runpy
+from pathlib import Path
+
+import psycopg2
+import faker.providers.person
+
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "03_generate_synthetic_data.py"
+
+
+class FakeCopyCursor:
+    """
+    The slice of a psycopg2 cursor bulk_load uses: sequence reservations and COPY ... FROM STDIN
+    in PostgreSQL's text format, decoded back into rows per table.
+    """
+
+    def __init__(self):
+        self.sequences = {}
+        self.tables = {}
+        self._result = []
+
+    def execute(self, sql, params=None):
+        assert "nextval" in sql, sql
+        table, n = params
+        start = self.sequences.get(table, 0)
+        self.sequences[table] = start + n
+        self._result = [(i,) for i in range(start + 1, start + n + 1)]
+
+    def fetchall(self):
+        return self._result
+
+    def copy_expert(self, sql, buf):
+        table, columns = re.match(r"COPY (\w+) \((.*)\) FROM STDIN$", sql).groups()
+        names = columns.split(", ")
+        unescape = {"\\\\": "\\", "\\t": "\t", "\\n": "\n", "\\r": "\r"}
+        for line in buf.read().splitlines():
+            values = [
+                None if v == "\\N" else re.sub(r"\\[\\tnr]", lambda m: unescape[m.group()], v)
+                for v in line.split("\t")
+            ]
+            assert len(values) == len(names)
+            self.tables.setdefault(table, []).append(dict(zip(names, values)))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_ = FakeCopyCursor()
+        self.committed = False
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+def test_bulk_load_copies_every_table_with_unique_usernames(monkeypatch):
+    conn = FakeConnection()
+    monkeypatch.setattr(psycopg2, "connect", lambda **kwargs: conn)
+    # One name for everyone: 1,500 users over 900 random suffixes forces the fallback, and
+    # user IDs 100-999 collide with the suffixes themselves
+    monkeypatch.setattr(faker.providers.person.Provider, "first_name", lambda self: "Ann")
+    monkeypatch.setattr(faker.providers.person.Provider, "last_name", lambda self: "Lee")
+    monkeypatch.setenv("SYNTH_BULK", "1")
+    monkeypatch.setenv("SYNTH_NUM_USERS", "1500")
+    monkeypatch.setenv("SYNTH_COPY_ROWS", "400")
+    runpy.run_path(str(SCRIPT))
+
+    tables = conn.cursor_.tables
+    assert conn.committed
+    assert [int(u["id"]) for u in tables["users"]] == list(range(1, 1501))
+    usernames = [p["unique_id_normalized"] for p in tables["pseudonyms"]]
+    assert len(usernames) == 1500 and len(set(usernames)) == 1500
+    assert all(p["unique_id"].lower() == p["unique_id_normalized"] for p in tables["pseudonyms"])
+    assert len(tables["courses"]) == 30 and len(tables["enrollment_terms"]) == 3
+    teachers = [e for e in tables["enrollments"] if e["type"] == "TeacherEnrollment"]
+    assert len(teachers) == 30
+    students = {(e["user_id"], e["course_id"]) for e in tables["enrollments"] if e["type"] == "StudentEnrollment"}
+    assert not students & {(e["user_id"], e["course_id"]) for e in teachers}